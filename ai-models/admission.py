@@ -0,0 +1,149 @@
+"""
+Admission Control
+Bounded concurrency plus a bounded wait queue per resource pool; work
+beyond the queue limit is rejected immediately instead of piling up threads
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Tuple
+
+
+class AdmissionRejected(Exception):
+    """Raised when a pool is saturated; the API turns it into 503 + Retry-After"""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"Server busy ({pool} queue full), retry in {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+    """At most max_concurrent holders, at most max_queue waiters, everyone else rejected"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float = 10.0):
+        """
+        Args:
+            name: Pool name (used in errors and metrics)
+            max_concurrent: Slots that can be held at once
+            max_queue: Callers allowed to wait for a slot
+            queue_timeout: Longest wait for a slot before rejecting, in seconds
+        """
+        self.name = name
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = queue_timeout
+
+        self._slots = threading.Semaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._avg_hold = 0.0
+
+    def _retry_after(self) -> int:
+        """Rough seconds until a slot frees up, from the average hold time"""
+        backlog = (self._waiting + 1) / self.max_concurrent
+        return max(1, math.ceil(self._avg_hold * backlog))
+
+    def _reject(self):
+        self._rejected += 1
+        raise AdmissionRejected(self.name, self._retry_after())
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if there is room; raises AdmissionRejected otherwise"""
+        with self._lock:
+            if self._slots.acquire(blocking=False):
+                self._in_flight += 1
+                self._admitted += 1
+                return
+            if self._waiting >= self.max_queue:
+                self._reject()
+            self._waiting += 1
+
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self._waiting -= 1
+            if not acquired:
+                self._reject()
+            self._in_flight += 1
+            self._admitted += 1
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now (never queues; a False is not counted as a rejection)"""
+        with self._lock:
+            if not self._slots.acquire(blocking=False):
+                return False
+            self._in_flight += 1
+            self._admitted += 1
+            return True
+
+    def release(self, held_seconds: float = None):
+        with self._lock:
+            self._in_flight -= 1
+            if held_seconds is not None:
+                # Exponentially weighted average of how long a slot is held
+                self._avg_hold = held_seconds if self._avg_hold == 0 else 0.8 * self._avg_hold + 0.2 * held_seconds
+        self._slots.release()
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for the duration of the with-block"""
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                'queue_depth': self._waiting,
+                'admitted': self._admitted,
+                'rejected': self._rejected,
+                'avg_hold_ms': round(self._avg_hold * 1000, 1)
+            }
+
+
+class AdmissionController:
+    """Named pools; pools without explicit limits are created with the defaults"""
+
+    def __init__(self, default_limits: Tuple[int, int] = (8, 16), queue_timeout: float = 10.0):
+        """
+        Args:
+            default_limits: (max_concurrent, max_queue) for pools not configured explicitly
+            queue_timeout: Longest wait for a slot before rejecting, in seconds
+        """
+        self.default_limits = default_limits
+        self.queue_timeout = queue_timeout
+        self._pools: Dict[str, AdmissionPool] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, name: str, max_concurrent: int, max_queue: int) -> AdmissionPool:
+        """Create (or replace) a pool with explicit limits"""
+        pool = AdmissionPool(name, max_concurrent, max_queue, self.queue_timeout)
+        with self._lock:
+            self._pools[name] = pool
+        return pool
+
+    def pool(self, name: str) -> AdmissionPool:
+        with self._lock:
+            if name not in self._pools:
+                self._pools[name] = AdmissionPool(name, *self.default_limits, self.queue_timeout)
+            return self._pools[name]
+
+    def slot(self, name: str):
+        """Context manager holding a slot in the named pool"""
+        return self.pool(name).slot()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            pools = list(self._pools.values())
+        return {pool.name: pool.stats() for pool in pools}
@@ -3,16 +3,25 @@ Flask API Bridge for AI Models
 Provides REST endpoints for food detection and glucose prediction
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 import os
 import sys
 from pathlib import Path
 import base64
-import io
-from PIL import Image
+import hashlib
+import hmac
+import json
+import math
+import time
+import threading
+import functools
+import contextlib
 import traceback
 import importlib.util
+import tempfile
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -21,7 +30,8 @@ load_dotenv()
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent))
 
-# Import using importlib for hyphenated folder names
+# Import using importlib for hyphenated folder names (ultralytics itself is
+# only imported when the detection service is created)
 food_rec_spec = importlib.util.spec_from_file_location(
     "food_detection_service", 
     Path(__file__).parent / "food-recognition" / "food_detection_service.py"
@@ -29,17 +39,18 @@ food_rec_spec = importlib.util.spec_from_file_location(
 food_rec_module = importlib.util.module_from_spec(food_rec_spec)
 food_rec_spec.loader.exec_module(food_rec_module)
 FoodDetectionService = food_rec_module.FoodDetectionService
+ImageContext = food_rec_module.ImageContext
+iter_video_frames = food_rec_module._load_sibling("stream_tracker").iter_video_frames
+parse_cascade_tiers = food_rec_module._load_sibling("inference_cascade").parse_tiers
 
 # Import Demo Food Mapper
 from demo_food_mapper import DemoFoodMapper
-
-glucose_spec = importlib.util.spec_from_file_location(
-    "glucose_prediction_model",
-    Path(__file__).parent / "glucose-prediction" / "glucose_prediction_model.py"
-)
-glucose_module = importlib.util.module_from_spec(glucose_spec)
-glucose_spec.loader.exec_module(glucose_module)
-GlucosePredictionModel = glucose_module.GlucosePredictionModel
+from job_store import JobStore
+from metrics import Metrics
+from request_profiler import RequestProfiler
+from upload_storage import UploadStorage
+from admission import AdmissionController, AdmissionRejected
+from single_flight import SingleFlight
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
@@ -50,35 +61,277 @@ NUTRITION_DB_PATH = os.getenv('NUTRITION_DB_PATH', 'food-recognition/nutrition_d
 GLUCOSE_MODEL_PATH = os.getenv('GLUCOSE_MODEL_PATH', 'models/glucose_prediction_model.pkl')
 UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', './uploads')
 
-# Create upload folder
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Detector runtime: pytorch (ultralytics), onnx (ONNX Runtime), openvino, or auto
+# (from FOOD_MODEL_PATH: .pt / .onnx / .xml); see scripts/export_detector.py
+FOOD_MODEL_BACKEND = os.getenv('FOOD_MODEL_BACKEND', 'auto')
+INFERENCE_NUM_THREADS = int(os.getenv('INFERENCE_NUM_THREADS', '0'))
+
+# In-memory mode decodes request bytes once and never re-reads them from disk;
+# uploads are then only written (in the background) when PERSIST_UPLOADS is on
+IN_MEMORY_UPLOADS = os.getenv('IN_MEMORY_UPLOADS', 'true').lower() == 'true'
+PERSIST_UPLOADS = os.getenv('PERSIST_UPLOADS', 'true').lower() == 'true'
+
+# Upload retention: files untouched for UPLOAD_MAX_AGE_HOURS are deleted, then
+# the oldest ones while the folder is over UPLOAD_MAX_TOTAL_MB (0 disables either)
+UPLOAD_MAX_AGE_HOURS = float(os.getenv('UPLOAD_MAX_AGE_HOURS', '168'))
+UPLOAD_MAX_TOTAL_MB = float(os.getenv('UPLOAD_MAX_TOTAL_MB', '2048'))
+
+# Micro-batching: concurrent scans share YOLO forward passes (1 = disabled)
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '1'))
+INFERENCE_MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', '10'))
+
+# Colour fallback started alongside YOLO on this many threads, merged or discarded afterwards (0 = disabled)
+SPECULATIVE_FALLBACK_WORKERS = int(os.getenv('SPECULATIVE_FALLBACK_WORKERS', '0'))
+
+# YOLO runs once at this confidence; higher conf/iou requests re-filter its boxes
+MIN_CONF_THRESHOLD = float(os.getenv('MIN_CONF_THRESHOLD', '0.05'))
+
+# Resolution cascade, cheapest tier first, e.g. "320,640" or "320,640,path/best_m.pt@640" (empty = disabled);
+# an image moves up a tier when its best box < MIN_CONFIDENCE, it has < MIN_BOXES boxes,
+# or its boxes leave > MAX_UNCOVERED of the image uncovered
+CASCADE_TIERS = parse_cascade_tiers(os.getenv('CASCADE_TIERS', ''))
+CASCADE_MIN_CONFIDENCE = float(os.getenv('CASCADE_MIN_CONFIDENCE', '0.5'))
+CASCADE_MIN_BOXES = int(os.getenv('CASCADE_MIN_BOXES', '1'))
+CASCADE_MAX_UNCOVERED = float(os.getenv('CASCADE_MAX_UNCOVERED', '0.8'))
+
+# Content-addressed result cache (0 entries = disabled; RESULT_CACHE_DIR adds a disk tier)
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '256'))
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR')
+RESULT_CACHE_TTL_SECONDS = float(os.getenv('RESULT_CACHE_TTL_SECONDS', '86400'))
+
+# Asynchronous scan jobs (SQLite store + background worker pool)
+JOB_DB_PATH = os.getenv('JOB_DB_PATH', 'jobs.db')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_RETENTION_HOURS = float(os.getenv('JOB_RETENTION_HOURS', '24'))
+# How often finished jobs and stored idempotent responses past retention are deleted
+JOB_PURGE_INTERVAL_SECONDS = float(os.getenv('JOB_PURGE_INTERVAL_SECONDS', '3600'))
+JOB_MAX_WAIT_SECONDS = float(os.getenv('JOB_MAX_WAIT_SECONDS', '25'))
+# Jobs waiting for a worker beyond the running ones; further submissions get 503
+JOB_MAX_QUEUE = int(os.getenv('JOB_MAX_QUEUE', '32'))
+
+# Largest number of images accepted by the /batch endpoints
+MAX_BATCH_IMAGES = int(os.getenv('MAX_BATCH_IMAGES', '32'))
+
+# Frames read from a video sent to /api/v1/food/detect/stream (900 = 30s at 30 fps)
+STREAM_MAX_FRAMES = int(os.getenv('STREAM_MAX_FRAMES', '900'))
+
+# On-demand profiling: "X-Profile: <PROFILE_TOKEN>" header and/or a sample rate
+PROFILE_DIR = os.getenv('PROFILE_DIR', './profiles')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '50'))
+
+# Content-addressed upload folder; one background thread does upload/annotation writes
+upload_storage = UploadStorage(UPLOAD_FOLDER, UPLOAD_MAX_AGE_HOURS, UPLOAD_MAX_TOTAL_MB)
+
+# Load models in a background thread so the server starts listening immediately;
+# /health reports per-model readiness and /ready turns 200 once loading is done
+BACKGROUND_MODEL_LOADING = os.getenv('BACKGROUND_MODEL_LOADING', 'false').lower() == 'true'
+
+# Synthetic warmup passes run before a model is marked ready (size is WIDTHxHEIGHT
+# of a typical upload, so YOLO warms at the letterboxed shape real photos get)
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() == 'true'
+WARMUP_RUNS = int(os.getenv('WARMUP_RUNS', '2'))
+WARMUP_IMAGE_SIZE = tuple(int(v) for v in os.getenv('WARMUP_IMAGE_SIZE', '1280x960').lower().split('x'))
+
+# Admission control: bounded concurrency and wait queues per resource pool
+# (YOLO inference, fallback detector, provider calls) and per endpoint.
+# Requests beyond a queue get 503 + Retry-After instead of piling up threads.
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+INFERENCE_MAX_CONCURRENT = int(os.getenv('INFERENCE_MAX_CONCURRENT', '2'))
+INFERENCE_MAX_QUEUE = int(os.getenv('INFERENCE_MAX_QUEUE', '8'))
+FALLBACK_MAX_CONCURRENT = int(os.getenv('FALLBACK_MAX_CONCURRENT', '2'))
+FALLBACK_MAX_QUEUE = int(os.getenv('FALLBACK_MAX_QUEUE', '8'))
+PROVIDER_MAX_CONCURRENT = int(os.getenv('PROVIDER_MAX_CONCURRENT', '4'))
+PROVIDER_MAX_QUEUE = int(os.getenv('PROVIDER_MAX_QUEUE', '8'))
+ENDPOINT_MAX_CONCURRENT = int(os.getenv('ENDPOINT_MAX_CONCURRENT', '8'))
+ENDPOINT_MAX_QUEUE = int(os.getenv('ENDPOINT_MAX_QUEUE', '16'))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_SECONDS', '10'))
+
+# Also serve the API on a Unix domain socket (for a co-located Node backend);
+# the TCP listener on port 5001 keeps running alongside it
+UNIX_SOCKET_PATH = os.getenv('UNIX_SOCKET_PATH', '')
+
+# Admin endpoints (hot model swap, provider reload) are disabled without a token.
+# A swapped-out detection service keeps serving requests already holding it
+# for MODEL_SWAP_DRAIN_SECONDS before its batching scheduler is stopped.
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+MODEL_SWAP_DRAIN_SECONDS = float(os.getenv('MODEL_SWAP_DRAIN_SECONDS', '60'))
+
+# Workers that run submitted scan jobs off the request threads
+job_workers = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='scan-job')
+job_store = None
+
+# Request, stage and event metrics (served at /metrics)
+metrics = Metrics()
+
+# Identical uploads analyzed concurrently share one computation
+single_flight = SingleFlight()
+
+# Profiled requests run their detections on their own thread so cProfile sees them
+RequestProfiler(
+    PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_TOKEN, PROFILE_KEEP,
+    on_start=lambda: FoodDetectionService.run_inline(True),
+    on_stop=lambda: FoodDetectionService.run_inline(False)
+).init_app(app)
+
+admission = None
+if ADMISSION_ENABLED:
+    admission = AdmissionController(
+        default_limits=(ENDPOINT_MAX_CONCURRENT, ENDPOINT_MAX_QUEUE),
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS
+    )
+    # Slots are held from submission to the scheduler until the batch returns,
+    # so with micro-batching a full batch needs INFERENCE_MAX_BATCH_SIZE of them
+    admission.configure('inference', max(INFERENCE_MAX_CONCURRENT, INFERENCE_MAX_BATCH_SIZE), INFERENCE_MAX_QUEUE)
+    # Submitted jobs hold a slot until they finish; no waiting, a full backlog is rejected
+    admission.configure('jobs', JOB_WORKERS + JOB_MAX_QUEUE, 0)
+    admission.configure('fallback', FALLBACK_MAX_CONCURRENT, FALLBACK_MAX_QUEUE)
+    admission.configure('provider', PROVIDER_MAX_CONCURRENT, PROVIDER_MAX_QUEUE)
+    
+    def _admission_series(field: str):
+        return lambda: {(('pool', name),): stats[field] for name, stats in admission.stats().items()}
+    
+    metrics.add_gauge('admission_in_flight', 'Slots held per admission pool', _admission_series('in_flight'))
+    metrics.add_gauge('admission_queue_depth', 'Requests waiting per admission pool', _admission_series('queue_depth'))
+    metrics.add_gauge(
+        'admission_rejected_total', 'Requests rejected with 503 per admission pool',
+        _admission_series('rejected'), metric_type='counter'
+    )
 
 # Global service instances
 food_service = None
 glucose_model = None
 demo_mapper = None
+logmeal_detector = None
+spoonacular_detector = None
+calorie_mama_detector = None
 
-def init_services():
-    """Initialize AI services"""
-    global food_service, glucose_model, demo_mapper
+def _cascade_series(field: str):
+    def collect():
+        cascade = food_service.cascade if food_service else None
+        if cascade is None:
+            return {}
+        return {(('tier', tier['tier']),): tier[field] for tier in cascade.stats()['tiers']}
+    return collect
+
+metrics.add_gauge('cascade_images_total', 'Images run per cascade tier', _cascade_series('images'), metric_type='counter')
+metrics.add_gauge(
+    'cascade_served_total', 'Images whose result came from each cascade tier',
+    _cascade_series('served'), metric_type='counter'
+)
+
+# Per-model readiness: pending → loading → warming → ready | failed
+model_status = {
+    'food_detection': {'status': 'pending'},
+    'glucose_prediction': {'status': 'pending'},
+    'demo_mapper': {'status': 'pending'}
+}
+models_loaded = threading.Event()
+
+def _create_food_service(model_path: str = FOOD_MODEL_PATH, result_cache=None):
+    """
+    Load the YOLO model and configure the detection service
+    
+    Args:
+        model_path: YOLO weights (.pt)
+        result_cache: Result cache of the service being replaced, kept on a hot
+            swap (keys include the model version, so old entries simply age out)
+    """
+    service = FoodDetectionService(
+        model_path=model_path,
+        nutrition_db_path=NUTRITION_DB_PATH,
+        use_fallback=True,  # Enable generic food detection
+        min_conf_threshold=MIN_CONF_THRESHOLD,
+        backend=FOOD_MODEL_BACKEND,
+        num_threads=INFERENCE_NUM_THREADS
+    )
+    service.observer = metrics
+    service.admission = admission
+    if IN_MEMORY_UPLOADS:
+        service.background_writer = upload_storage
+    if SPECULATIVE_FALLBACK_WORKERS > 0:
+        service.enable_speculative_fallback(SPECULATIVE_FALLBACK_WORKERS)
+    if CASCADE_TIERS:
+        service.enable_cascade(CASCADE_TIERS, CASCADE_MIN_CONFIDENCE, CASCADE_MIN_BOXES, CASCADE_MAX_UNCOVERED)
+    if INFERENCE_MAX_BATCH_SIZE > 1:
+        service.enable_batching(INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS)
+    if result_cache is not None:
+        service.result_cache = result_cache
+    elif RESULT_CACHE_SIZE > 0:
+        service.enable_cache(RESULT_CACHE_SIZE, RESULT_CACHE_DIR, RESULT_CACHE_TTL_SECONDS)
+    return service
+
+def _create_glucose_model(model_path: str = GLUCOSE_MODEL_PATH):
+    """Import the glucose module (pandas, xgboost via joblib) and load the model"""
+    glucose_spec = importlib.util.spec_from_file_location(
+        "glucose_prediction_model",
+        Path(__file__).parent / "glucose-prediction" / "glucose_prediction_model.py"
+    )
+    glucose_module = importlib.util.module_from_spec(glucose_spec)
+    glucose_spec.loader.exec_module(glucose_module)
+    return glucose_module.GlucosePredictionModel(model_path=model_path)
+
+def _warm_food_service(service) -> dict:
+    batch_sizes = sorted({1, INFERENCE_MAX_BATCH_SIZE})
+    return service.warmup(WARMUP_IMAGE_SIZE, WARMUP_RUNS, tuple(batch_sizes))
+
+def _warm_glucose_model(model) -> dict:
+    return {'predict': model.warmup(WARMUP_RUNS)}
+
+def _load_model(name: str, loader, warmup=None):
+    """
+    Run a model loader (then its warmup), recording status and timings in model_status
     
+    Args:
+        name: Key in model_status
+        loader: Returns the loaded model
+        warmup: Optional callable(model) returning per-run warmup timings (ms)
+    """
+    model_status[name] = {'status': 'loading'}
+    start = time.perf_counter()
     try:
-        print("🔧 Initializing AI services...")
+        model = loader()
+        status = {'load_seconds': round(time.perf_counter() - start, 2)}
+        if getattr(model, 'model_version', None):
+            status['model_version'] = model.model_version
         
-        food_service = FoodDetectionService(
-            model_path=FOOD_MODEL_PATH,
-            nutrition_db_path=NUTRITION_DB_PATH,
-            use_fallback=True  # Enable generic food detection
-        )
+        if warmup is not None and WARMUP_ENABLED:
+            model_status[name] = {'status': 'warming', **status}
+            warm_start = time.perf_counter()
+            status['warmup_ms'] = warmup(model)
+            status['warmup_seconds'] = round(time.perf_counter() - warm_start, 2)
+            print(f"🔥 {name} warmed up in {status['warmup_seconds']}s: {status['warmup_ms']}")
+    except Exception as e:
+        model_status[name] = {
+            'status': 'failed',
+            'error': str(e),
+            'load_seconds': round(time.perf_counter() - start, 2)
+        }
+        raise
+    model_status[name] = {'status': 'ready', **status}
+    return model
+
+def load_models() -> bool:
+    """
+    Load the detection service, demo mapper and glucose model
+    
+    Returns:
+        True when the food detection service (required) loaded
+    """
+    global food_service, glucose_model, demo_mapper
+    
+    try:
+        food_service = _load_model('food_detection', _create_food_service, _warm_food_service)
         print("✅ Food detection service initialized")
         
         # Initialize Demo Food Mapper
-        demo_mapper = DemoFoodMapper()
+        demo_mapper = _load_model('demo_mapper', DemoFoodMapper)
         print("✅ Demo food mapper initialized")
         
         # Try to load glucose model (optional)
         try:
-            glucose_model = GlucosePredictionModel(model_path=GLUCOSE_MODEL_PATH)
+            glucose_model = _load_model('glucose_prediction', _create_glucose_model, _warm_glucose_model)
             print("✅ Glucose prediction model initialized")
         except Exception as ge:
             print(f"⚠️  Glucose model not loaded: {ge}")
@@ -86,24 +339,694 @@ def init_services():
             glucose_model = None
         
         return True
+    except Exception as e:
+        print(f"❌ Error loading models: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        models_loaded.set()
+
+# Weights accepted by the hot swap endpoint, per model
+SWAPPABLE_MODELS = {
+    'food_detection': ('.pt', '.onnx', '.xml'),
+    'glucose_prediction': ('.pkl',)
+}
+_swap_lock = threading.Lock()
+_swaps_in_progress = set()
+
+def _swap_model(name: str, model_path: str):
+    """
+    Load and warm new weights, then atomically replace the live model
+    
+    Runs on a background thread while the current model keeps serving.
+    The swap itself is a reference assignment: requests that already hold
+    the old model finish on it, later requests get the new one.
+    
+    Args:
+        name: Key in SWAPPABLE_MODELS
+        model_path: New weights file
+    """
+    global food_service, glucose_model
+    
+    def report(**reload):
+        model_status[name] = {**model_status[name], 'reload': {'model_path': model_path, **reload}}
+    
+    start = time.perf_counter()
+    try:
+        report(status='loading')
+        if name == 'food_detection':
+            cache = food_service.result_cache if food_service else None
+            model = _create_food_service(model_path, cache)
+            warmup = _warm_food_service
+        else:
+            model = _create_glucose_model(model_path)
+            warmup = _warm_glucose_model
+        
+        status = {}
+        if WARMUP_ENABLED:
+            report(status='warming')
+            status['warmup_ms'] = warmup(model)
+        
+        with _swap_lock:
+            if name == 'food_detection':
+                old, food_service = food_service, model
+            else:
+                old, glucose_model = glucose_model, model
+        
+        seconds = round(time.perf_counter() - start, 2)
+        model_status[name] = {
+            'status': 'ready',
+            'model_version': model.model_version,
+            'load_seconds': seconds,
+            **status,
+            'reload': {
+                'status': 'swapped',
+                'model_path': model_path,
+                'previous_version': getattr(old, 'model_version', None)
+            }
+        }
+        print(f"🔁 {name} swapped to {model.model_version} in {seconds}s")
+        
+        # Stop the old batching scheduler once in-flight requests have drained
+        if name == 'food_detection' and old is not None:
+            retire = threading.Timer(MODEL_SWAP_DRAIN_SECONDS, old.close)
+            retire.daemon = True
+            retire.start()
+    except Exception as e:
+        print(f"❌ Hot swap of {name} failed: {e}")
+        traceback.print_exc()
+        report(status='failed', error=str(e))
+    finally:
+        with _swap_lock:
+            _swaps_in_progress.discard(name)
+
+def serve_unix_socket(path: str):
+    """
+    Serve the app on a Unix domain socket from a daemon thread
+    
+    Args:
+        path: Socket file (a stale file left by a previous run is replaced)
+    """
+    from werkzeug.serving import make_server
+    
+    server = make_server(f'unix://{path}', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='unix-socket-server', daemon=True).start()
+    print(f"🔌 Also listening on unix://{path}")
+    return server
+
+def init_providers():
+    """Create the optional third-party provider clients (only when keys are configured)"""
+    global logmeal_detector, spoonacular_detector, calorie_mama_detector
+    
+    if os.getenv('LOGMEAL_API_TOKEN'):
+        LogMealDetector = importlib.import_module('food-recognition.logmeal_api').LogMealDetector
+        logmeal_detector = LogMealDetector(os.getenv('LOGMEAL_API_TOKEN'))
+        print("✅ LogMeal detector initialized")
+    if os.getenv('SPOONACULAR_API_KEY'):
+        SpoonacularDetector = importlib.import_module('food-recognition.spoonacular_api').SpoonacularDetector
+        spoonacular_detector = SpoonacularDetector(os.getenv('SPOONACULAR_API_KEY'))
+        print("✅ Spoonacular detector initialized")
+    if os.getenv('CALORIE_MAMA_API_KEY'):
+        CalorieMamaDetector = importlib.import_module('food-recognition.calorie_mama_api').CalorieMamaDetector
+        calorie_mama_detector = CalorieMamaDetector(os.getenv('CALORIE_MAMA_API_KEY'))
+        print("✅ Calorie Mama detector initialized")
+
+def init_services(background: bool = False):
+    """
+    Initialize AI services
+    
+    Args:
+        background: Load models on a background thread and return immediately
+    """
+    global job_store
+    
+    try:
+        print("🔧 Initializing AI services...")
+        upload_storage.observer = metrics
+        
+        # Job store: jobs from a previous process can't resume (their images were in memory)
+        job_store = JobStore(JOB_DB_PATH)
+        interrupted = job_store.fail_interrupted()
+        job_store.release_pending_responses()
+        purged = job_store.purge(JOB_RETENTION_HOURS * 3600)
+        job_store.start_purging(JOB_RETENTION_HOURS * 3600, JOB_PURGE_INTERVAL_SECONDS)
+        print(f"✅ Job store ready ({interrupted} interrupted, {purged} expired jobs cleaned up)")
+        
+        init_providers()
+        
+        if background:
+            threading.Thread(target=load_models, name='model-loader', daemon=True).start()
+            print("⏳ Loading models in the background (see /health)")
+            return True
+        return load_models()
     except Exception as e:
         print(f"❌ Error initializing services: {e}")
         traceback.print_exc()
         return False
 
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request_latency(response):
+    """Observe request latency once the response (including streamed bodies) has been sent"""
+    start = g.get('request_start')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        method = request.method
+        status = response.status_code
+        response.call_on_close(
+            lambda: metrics.observe_request(endpoint, method, status, time.perf_counter() - start)
+        )
+    return response
+
+def _requires(*models: str):
+    """Answer 503 (with Retry-After while loading) until the named models are ready"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(*args, **kwargs):
+            for name in models:
+                status = model_status[name]['status']
+                if status == 'ready':
+                    continue
+                loading = status in ('pending', 'loading', 'warming')
+                response = jsonify({
+                    'success': False,
+                    'error': f"{name} model is {'still loading' if loading else 'not available'}",
+                    'model_status': model_status[name]
+                })
+                response.status_code = 503
+                if loading:
+                    response.headers['Retry-After'] = '5'
+                return response
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+def _admin_only(view):
+    """Require an X-Admin-Token header matching ADMIN_TOKEN (404 when no token is configured)"""
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'success': False, 'error': 'Admin endpoints are disabled'}), 404
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+            return jsonify({'success': False, 'error': 'Invalid admin token'}), 401
+        return view(*args, **kwargs)
+    return wrapped
+
+def _admitted(view):
+    """Bound the endpoint's concurrency (slot held until the response body is sent)"""
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        if admission is None:
+            return view(*args, **kwargs)
+        pool = admission.pool(f'endpoint:{request.endpoint}')
+        pool.acquire()
+        start = time.perf_counter()
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except BaseException:
+            pool.release(time.perf_counter() - start)
+            raise
+        response.call_on_close(lambda: pool.release(time.perf_counter() - start))
+        return response
+    return wrapped
+
+@app.errorhandler(AdmissionRejected)
+def _handle_admission_rejected(e):
+    response = jsonify({'success': False, 'error': str(e), 'retry_after': e.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+# Content types accepted as a raw image request body
+RAW_IMAGE_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/bmp': '.bmp',
+    'application/octet-stream': '.jpg'
+}
+
+def _is_raw_upload() -> bool:
+    """Whether the request body is the image itself (no multipart or JSON wrapper)"""
+    return request.mimetype in RAW_IMAGE_EXTENSIONS
+
+def _raw_param(name: str, default=None):
+    """
+    Parameter of a raw-body request, from the query string or an X-* header
+    
+    e.g. ``time_of_day`` is read from ``?time_of_day=`` or ``X-Time-Of-Day``.
+    """
+    header = 'X-' + '-'.join(part.capitalize() for part in name.split('_'))
+    return request.args.get(name, request.headers.get(header, default))
+
+def _read_upload(default_name: str):
+    """
+    Read the uploaded image into memory
+    
+    Accepts a raw image body (Content-Type image/* or application/octet-stream),
+    a multipart ``file`` or a base64 ``image`` field in a JSON body.
+    
+    Returns:
+        (image_bytes, filename), or (None, None) when no image was sent
+    """
+    if _is_raw_upload():
+        image_bytes = request.get_data(cache=False)
+        if not image_bytes:
+            return None, None
+        return image_bytes, 'upload' + RAW_IMAGE_EXTENSIONS[request.mimetype]
+    if 'file' in request.files:
+        file = request.files['file']
+        return file.read(), file.filename or default_name
+    if request.is_json and 'image' in request.json:
+        return base64.b64decode(request.json['image']), default_name
+    return None, None
+
+def _decode_upload(image_bytes: bytes, image_path: str):
+    """Decode upload bytes into an ImageContext (timed as upload_decode)"""
+    with metrics.time_stage('upload_decode'):
+        return ImageContext.from_bytes(image_bytes, source_path=image_path)
+
+def _call_provider(provider: str, detector, image_path: str, image_bytes: bytes):
+    """Call a third-party provider, counting the call and its outcome"""
+    try:
+        with (admission.slot('provider') if admission else contextlib.nullcontext()):
+            with metrics.time_stage(f'provider_{provider}'):
+                result = detector.detect_food(image_path, image_bytes=image_bytes)
+    except AdmissionRejected:
+        raise
+    except Exception:
+        metrics.provider_call(provider, False)
+        raise
+    success = result.get('success', False) if isinstance(result, dict) else True
+    metrics.provider_call(provider, success)
+    return result
+
+def _persist_upload(image_bytes: bytes, filename: str) -> str:
+    """
+    Store an upload under UPLOAD_FOLDER, named by its content hash
+    
+    In in-memory mode the write is queued on the storage writer thread (or
+    skipped entirely when PERSIST_UPLOADS is off); otherwise it is written
+    synchronously so the file can be read back by path.
+    
+    Returns:
+        Path the upload is (or will be) stored at
+    """
+    if not IN_MEMORY_UPLOADS:
+        return upload_storage.store(image_bytes, filename, wait=True)
+    if PERSIST_UPLOADS:
+        return upload_storage.store(image_bytes, filename)
+    return upload_storage.path_for(image_bytes, filename)
+
+def _load_upload(default_name: str):
+    """
+    Read, decode and store the uploaded image
+    
+    Returns:
+        (image_bytes, image_path, image) where image is an ImageContext
+        holding the decoded upload in in-memory mode and None otherwise.
+        All three are None when no image was sent.
+    """
+    image_bytes, filename = _read_upload(default_name)
+    if image_bytes is None:
+        return None, None, None
+    image_path = _persist_upload(image_bytes, filename)
+    image = _decode_upload(image_bytes, image_path) if IN_MEMORY_UPLOADS else None
+    return image_bytes, image_path, image
+
+def _load_uploads():
+    """
+    Read, decode and store every image of a multi-image request
+    
+    Accepts repeated multipart ``files`` (or ``file``) fields, or a JSON body
+    with a list of base64 strings under ``images``. Every image is decoded
+    here (in both upload modes) so one bad file only fails its own entry.
+    
+    Returns:
+        List of (image_path, image, error) in request order: image is the
+        decoded ImageContext, or None with an error message when the
+        upload could not be decoded
+    """
+    uploads = []
+    if request.files:
+        for file in request.files.getlist('files') + request.files.getlist('file'):
+            uploads.append((file.read(), file.filename))
+    elif request.is_json:
+        for encoded in request.json.get('images', []):
+            uploads.append((encoded, None))
+    
+    loaded = []
+    for image_bytes, filename in uploads:
+        try:
+            if isinstance(image_bytes, str):
+                image_bytes = base64.b64decode(image_bytes)
+            image = _decode_upload(image_bytes, None)
+        except (ValueError, TypeError) as e:
+            loaded.append((None, None, f"Invalid image: {e}"))
+            continue
+        image_path = _persist_upload(image_bytes, filename)
+        image.source_path = image_path
+        loaded.append((image_path, image, None))
+    return loaded
+
+def _batch_results(uploads, results) -> list:
+    """Per-image results in request order, with an error entry for each undecodable upload"""
+    results = iter(results)
+    return [
+        {'success': False, 'error': error} if error else next(results)
+        for _, _, error in uploads
+    ]
+
+def _scan_params() -> dict:
+    """Meal context sent with a scan, from form fields, the JSON body or raw-body query/headers"""
+    if _is_raw_upload():
+        return {
+            'time_of_day': _raw_param('time_of_day', 'afternoon'),
+            'last_glucose_reading': float(_raw_param('last_glucose_reading', 100)),
+            'hours_since_last_meal': float(_raw_param('hours_since_last_meal', 4)),
+            'user_profile': json.loads(_raw_param('user_profile', '{}'))
+        }
+    if request.files:
+        return {
+            'time_of_day': request.form.get('time_of_day', 'afternoon'),
+            'last_glucose_reading': float(request.form.get('last_glucose_reading', 100)),
+            'hours_since_last_meal': float(request.form.get('hours_since_last_meal', 4)),
+            'user_profile': json.loads(request.form.get('user_profile', '{}'))
+        }
+    data = request.json if request.is_json else {}
+    return {
+        'time_of_day': data.get('time_of_day', 'afternoon'),
+        'last_glucose_reading': data.get('last_glucose_reading', 100),
+        'hours_since_last_meal': data.get('hours_since_last_meal', 4),
+        'user_profile': data.get('user_profile', {})
+    }
+
+def _build_meal_data(food_result: dict, params: dict) -> dict:
+    """Glucose model input for an analyzed meal"""
+    nutrition = food_result['nutrition']
+    return {
+        'total_carbs': nutrition['total_carbs'],
+        'total_protein': nutrition['total_protein'],
+        'total_fat': nutrition['total_fat'],
+        'total_fiber': nutrition['total_fiber'],
+        'glycemic_load': nutrition['glycemic_load'],
+        'total_calories': nutrition['total_calories'],
+        'time_of_day': params['time_of_day'],
+        'last_glucose_reading': params['last_glucose_reading'],
+        'hours_since_last_meal': params['hours_since_last_meal'],
+        'foods_detected': food_result['foods_detected'],
+        **params['user_profile']
+    }
+
+def _build_scan_response(
+    food_result: dict,
+    glucose_prediction: dict,
+    advice: dict,
+    glucose_model_version: str = None
+) -> dict:
+    """Flat scan-and-predict response the Node backend consumes"""
+    nutrition = food_result['nutrition']
+    return {
+        'success': True,
+        'timestamp': food_result['timestamp'],
+        'foods_detected': food_result['foods_detected'],
+        'detections': food_result['detections'],
+        'total_carbs': nutrition['total_carbs'],
+        'total_protein': nutrition['total_protein'],
+        'total_fat': nutrition['total_fat'],
+        'total_fiber': nutrition['total_fiber'],
+        'total_calories': nutrition['total_calories'],
+        'glycemic_load': nutrition['glycemic_load'],
+        'predicted_glucose_1h': glucose_prediction['predicted_glucose_1h'],
+        'predicted_glucose_2h': glucose_prediction['predicted_glucose_2h'],
+        'glucose_spike_1h': glucose_prediction['glucose_spike_1h'],
+        'glucose_spike_2h': glucose_prediction['glucose_spike_2h'],
+        'peak_time': glucose_prediction['peak_time'],
+        'risk_level': advice['risk_level'],
+        'icon': advice['icon'],
+        'message': advice['message'],
+        'suggestions': advice['suggestions'],
+        'time_advice': advice['time_advice'],
+        'annotated_image': food_result.get('annotated_image'),
+        'model_version': food_result.get('model_version'),
+        'glucose_model_version': glucose_model_version
+    }
+
+def _request_fingerprint(kind: str, image_path: str, image, *params) -> str:
+    """Identity of a request: upload content hash, parameters and model version"""
+    content = image.content_hash if image is not None and image.content_hash else os.path.basename(image_path)
+    raw = json.dumps([kind, content, food_service.model_version, params], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _coalesced(kind: str, image_path: str, image, params, fn):
+    """Run fn once per identical in-flight request (double taps, client retries)"""
+    result, shared = single_flight.do(_request_fingerprint(kind, image_path, image, params), fn)
+    if shared:
+        metrics.event('coalesced_request')
+    return result
+
+def _idempotent(endpoint: str, fingerprint: str, compute):
+    """
+    Honour an Idempotency-Key header: replay the stored response for a
+    repeated key instead of recomputing it
+    
+    Args:
+        endpoint: Namespace for keys
+        fingerprint: Request identity; reusing a key for a different request is a 422
+        compute: Returns (response dict, HTTP status)
+    """
+    key = request.headers.get('Idempotency-Key')
+    if not key:
+        response, status = compute()
+        return jsonify(response), status
+    
+    conflict = jsonify({
+        'success': False,
+        'error': 'Idempotency-Key was already used for a different request'
+    }), 422
+    
+    # Cheap pre-check: a finished or in-flight claim with another fingerprint
+    stored = job_store.get_response(key, endpoint)
+    if stored is not None and stored['fingerprint'] != fingerprint:
+        return conflict
+    
+    def claim_and_compute():
+        # Runs on the single-flight leader only: claim the key, then compute
+        existing = job_store.reserve_response(key, endpoint, fingerprint)
+        if existing is not None:
+            return {**existing, 'replayed': True}
+        try:
+            response, status = compute()
+        except BaseException:
+            job_store.release_response(key, endpoint)
+            raise
+        if status < 500:
+            job_store.save_response(key, endpoint, status, response)
+        else:
+            job_store.release_response(key, endpoint)
+        return {
+            'fingerprint': fingerprint, 'pending': False, 'replayed': False,
+            'status_code': status, 'response': response
+        }
+    
+    # Retries that arrive while the first attempt is running wait for it
+    outcome, shared = single_flight.do(f'idempotency:{endpoint}:{key}', claim_and_compute)
+    if outcome['fingerprint'] != fingerprint:
+        return conflict
+    if outcome['pending']:
+        # Claimed by another server process that is still computing
+        busy = jsonify({
+            'success': False,
+            'error': 'A request with this Idempotency-Key is still in progress'
+        })
+        busy.status_code = 409
+        busy.headers['Retry-After'] = '1'
+        return busy
+    
+    result = jsonify(outcome['response'])
+    result.status_code = outcome['status_code']
+    if shared or outcome['replayed']:
+        result.headers['Idempotent-Replayed'] = 'true'
+    return result
+
+def _run_scan_pipeline(image_path: str, image, params: dict):
+    """
+    Scan food → analyze nutrition → predict glucose for one image
+    
+    Identical requests in flight at the same time are computed once.
+    
+    Returns:
+        (response dict, HTTP status)
+    """
+    return _coalesced(
+        'scan-and-predict', image_path, image, params,
+        lambda: _compute_scan(image_path, image, params)
+    )
+
+def _compute_scan(image_path: str, image, params: dict):
+    """Scan pipeline without coalescing (see _run_scan_pipeline)"""
+    # Models are read once so a hot swap mid-request can't mix versions
+    service, predictor = food_service, glucose_model
+    
+    # Step 1: Analyze food
+    food_result = service.process_image(
+        image_path=image_path,
+        time_of_day=params['time_of_day'],
+        user_profile=params['user_profile'],
+        save_annotated=True,
+        image=image
+    )
+    
+    if not food_result['success']:
+        return food_result, 400
+    
+    # Step 2: Prepare meal data for glucose prediction
+    meal_data = _build_meal_data(food_result, params)
+    
+    # Step 3: Predict glucose
+    with metrics.time_stage('glucose_predict'):
+        glucose_prediction = predictor.predict(meal_data)
+    
+    # Step 4: Get updated advice with glucose prediction
+    with metrics.time_stage('advice'):
+        advice = service.get_advice(food_result['nutrition'], glucose_prediction)
+    
+    # Step 5: Combine everything
+    response = _build_scan_response(food_result, glucose_prediction, advice, predictor.model_version)
+    return response, 200
+
+def _run_scan_job(job_id: str, image_path: str, image, params: dict, release=None):
+    """Background worker body for a submitted scan job (release frees its backlog slot)"""
+    try:
+        job_store.mark_running(job_id)
+        response, status = _run_scan_pipeline(image_path, image, params)
+        response['http_status'] = status
+        job_store.complete(job_id, response)
+    except Exception as e:
+        print(f"Error in scan job {job_id}: {e}")
+        traceback.print_exc()
+        job_store.fail(job_id, str(e))
+    finally:
+        if release is not None:
+            release()
+
+def _is_ready() -> bool:
+    return models_loaded.is_set() and model_status['food_detection']['status'] == 'ready'
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Liveness plus per-model readiness (always 200 while the process is up)"""
     return jsonify({
         'status': 'healthy',
+        'ready': _is_ready(),
         'services': {
             'food_detection': food_service is not None,
             'glucose_prediction': glucose_model is not None,
             'demo_mapper': demo_mapper is not None
+        },
+        'models': model_status
+    })
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 503 until model loading has finished and food detection is up"""
+    ready = _is_ready()
+    return jsonify({'ready': ready, 'models': model_status}), 200 if ready else 503
+
+@app.route('/api/v1/stats/inference', methods=['GET'])
+def inference_stats():
+    """Micro-batching (batch sizes, queue wait), cascade tiers, result cache and upload storage statistics"""
+    scheduler = food_service.scheduler if food_service else None
+    cascade = food_service.cascade if food_service else None
+    cache = food_service.result_cache if food_service else None
+    return jsonify({
+        'success': True,
+        'batching_enabled': scheduler is not None,
+        'stats': scheduler.stats() if scheduler else None,
+        'cascade_enabled': cascade is not None,
+        'cascade': cascade.stats() if cascade else None,
+        'cache_enabled': cache is not None,
+        'cache': cache.stats() if cache else None,
+        'uploads': upload_storage.stats(),
+        'admission': admission.stats() if admission else None,
+        'single_flight': single_flight.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request/stage latency histograms and event counters (Prometheus text format)"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/v1/admin/models', methods=['GET'])
+@_admin_only
+def admin_model_status():
+    """Live model versions and the state of the latest hot swap per model"""
+    return jsonify({'success': True, 'models': model_status})
+
+@app.route('/api/v1/admin/models/<name>', methods=['POST'])
+@_admin_only
+def admin_swap_model(name):
+    """
+    Hot-swap a model without restarting
+    
+    Request body:
+    {
+        "model_path": "models/food-recognition/indian-food-v15/weights/best.pt"
+    }
+    
+    The new weights are loaded and warmed in the background while the current
+    model keeps serving; poll GET /api/v1/admin/models for the outcome.
+    
+    Response (202):
+    {
+        "success": true,
+        "model": "food_detection",
+        "status_url": "/api/v1/admin/models"
+    }
+    """
+    if name not in SWAPPABLE_MODELS:
+        return jsonify({
+            'success': False,
+            'error': f"Unknown model '{name}' (expected one of {sorted(SWAPPABLE_MODELS)})"
+        }), 404
+    
+    model_path = (request.get_json(silent=True) or {}).get('model_path', '')
+    if not model_path.lower().endswith(SWAPPABLE_MODELS[name]) or not os.path.isfile(model_path):
+        return jsonify({
+            'success': False,
+            'error': f"model_path must be an existing {'/'.join(SWAPPABLE_MODELS[name])} file"
+        }), 400
+    
+    with _swap_lock:
+        if name in _swaps_in_progress:
+            return jsonify({'success': False, 'error': f'A swap of {name} is already in progress'}), 409
+        _swaps_in_progress.add(name)
+    
+    threading.Thread(target=_swap_model, args=(name, model_path), name=f'swap-{name}', daemon=True).start()
+    return jsonify({'success': True, 'model': name, 'status_url': '/api/v1/admin/models'}), 202
+
+@app.route('/api/v1/admin/providers/reload', methods=['POST'])
+@_admin_only
+def admin_reload_providers():
+    """Re-read .env and create clients for newly configured third-party providers"""
+    load_dotenv(override=True)
+    init_providers()
+    return jsonify({
+        'success': True,
+        'providers': {
+            'logmeal': logmeal_detector is not None,
+            'spoonacular': spoonacular_detector is not None,
+            'caloriemama': calorie_mama_detector is not None
         }
     })
 
 @app.route('/api/v1/food/detect', methods=['POST'])
+@_requires('food_detection')
+@_admitted
 def detect_food():
     """
     Detect food items in uploaded image
@@ -130,45 +1053,47 @@ def detect_food():
     """
     try:
         # Get image from request
-        if 'file' in request.files:
-            file = request.files['file']
-            image_path = os.path.join(UPLOAD_FOLDER, file.filename)
-            file.save(image_path)
-        elif request.is_json and 'image' in request.json:
-            # Decode base64 image
-            image_data = base64.b64decode(request.json['image'])
-            image = Image.open(io.BytesIO(image_data))
-            image_path = os.path.join(UPLOAD_FOLDER, 'temp_upload.jpg')
-            image.save(image_path)
-        else:
+        image_bytes, image_path, image = _load_upload('temp_upload.jpg')
+        if image_bytes is None:
             return jsonify({'success': False, 'error': 'No image provided'}), 400
         
-        # Get parameters (only if JSON request)
+        # Get parameters (JSON body, or query/headers for a raw body)
         conf_threshold = 0.25
         iou_threshold = 0.45
         if request.is_json:
             conf_threshold = request.json.get('conf_threshold', 0.25)
             iou_threshold = request.json.get('iou_threshold', 0.45)
+        elif _is_raw_upload():
+            conf_threshold = float(_raw_param('conf_threshold', 0.25))
+            iou_threshold = float(_raw_param('iou_threshold', 0.45))
         
-        # Detect foods
-        detections = food_service.detect_foods(
-            image_path,
-            conf_threshold=conf_threshold,
-            iou_threshold=iou_threshold
+        # Detect foods (identical requests in flight share one run)
+        service = food_service
+        detections = _coalesced(
+            'detect', image_path, image, (conf_threshold, iou_threshold),
+            lambda: service.detect_foods(
+                image if image is not None else image_path,
+                conf_threshold=conf_threshold,
+                iou_threshold=iou_threshold
+            )
         )
         
         return jsonify({
             'success': True,
             'detections': detections,
-            'num_foods': len(detections)
+            'num_foods': len(detections),
+            'model_version': service.model_version
         })
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         print(f"Error in detect_food: {e}")
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/v1/food/detect/logmeal', methods=['POST'])
+@_admitted
 def detect_food_logmeal():
     """
     Detect food using LogMeal API (FREE - 500 requests/month)
@@ -201,21 +1126,13 @@ def detect_food_logmeal():
             }), 400
         
         # Get image from request
-        if 'file' in request.files:
-            file = request.files['file']
-            image_path = os.path.join(UPLOAD_FOLDER, file.filename)
-            file.save(image_path)
-        elif request.is_json and 'image' in request.json:
-            # Decode base64 image
-            image_data = base64.b64decode(request.json['image'])
-            image = Image.open(io.BytesIO(image_data))
-            image_path = os.path.join(UPLOAD_FOLDER, 'temp_logmeal.jpg')
-            image.save(image_path)
-        else:
+        image_bytes, filename = _read_upload('temp_logmeal.jpg')
+        if image_bytes is None:
             return jsonify({'success': False, 'error': 'No image provided'}), 400
+        image_path = _persist_upload(image_bytes, filename)
         
         # Detect using LogMeal
-        detections = logmeal_detector.detect_food(image_path)
+        detections = _call_provider('logmeal', logmeal_detector, image_path, image_bytes)
         
         return jsonify({
             'success': True,
@@ -224,12 +1141,16 @@ def detect_food_logmeal():
             'source': 'logmeal_api'
         })
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         print(f"Error in detect_food_logmeal: {e}")
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/v1/food/analyze', methods=['POST'])
+@_requires('food_detection')
+@_admitted
 def analyze_food():
     """
     Complete food analysis: detect + calculate nutrition
@@ -260,44 +1181,38 @@ def analyze_food():
     """
     try:
         # Get image
-        if 'file' in request.files:
-            file = request.files['file']
-            image_path = os.path.join(UPLOAD_FOLDER, file.filename)
-            file.save(image_path)
-            
-            # Get other parameters from form data
-            time_of_day = request.form.get('time_of_day', 'afternoon')
-            user_profile = request.form.get('user_profile', '{}')
-            if isinstance(user_profile, str):
-                import json
-                user_profile = json.loads(user_profile)
-        else:
-            data = request.json
-            # Decode base64 image
-            image_data = base64.b64decode(data['image'])
-            image = Image.open(io.BytesIO(image_data))
-            image_path = os.path.join(UPLOAD_FOLDER, 'temp_upload.jpg')
-            image.save(image_path)
-            
-            time_of_day = data.get('time_of_day', 'afternoon')
-            user_profile = data.get('user_profile', {})
-        
-        # Process image
-        result = food_service.process_image(
-            image_path=image_path,
-            time_of_day=time_of_day,
-            user_profile=user_profile,
-            save_annotated=True
+        image_bytes, image_path, image = _load_upload('temp_upload.jpg')
+        if image_bytes is None:
+            return jsonify({'success': False, 'error': 'No image provided'}), 400
+        
+        # Get other parameters (form data, JSON body or raw-body query/headers)
+        params = _scan_params()
+        time_of_day = params['time_of_day']
+        user_profile = params['user_profile']
+        
+        # Process image (identical requests in flight share one run)
+        result = _coalesced(
+            'analyze', image_path, image, (time_of_day, user_profile),
+            lambda: food_service.process_image(
+                image_path=image_path,
+                time_of_day=time_of_day,
+                user_profile=user_profile,
+                save_annotated=True,
+                image=image
+            )
         )
         
         return jsonify(result)
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         print(f"Error in analyze_food: {e}")
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/v1/food/detect/spoonacular', methods=['POST'])
+@_admitted
 def detect_food_spoonacular():
     """
     Detect food using Spoonacular API (FREE - 150 requests/day)
@@ -326,16 +1241,7 @@ def detect_food_spoonacular():
     }
     """
     try:
-        # Safety check: re-initialize if detector is None (hot reload issue)
-        global spoonacular_detector
-        if not spoonacular_detector:
-            print("⚠️ Spoonacular detector was None, re-initializing...")
-            SPOONACULAR_API_KEY = os.getenv('SPOONACULAR_API_KEY')
-            if SPOONACULAR_API_KEY:
-                SpoonacularDetector = importlib.import_module('food-recognition.spoonacular_api').SpoonacularDetector
-                spoonacular_detector = SpoonacularDetector(SPOONACULAR_API_KEY)
-                print("✅ Spoonacular detector re-initialized")
-        
+        # Keys added after startup: POST /api/v1/admin/providers/reload
         if not spoonacular_detector:
             return jsonify({
                 'success': False, 
@@ -344,21 +1250,13 @@ def detect_food_spoonacular():
             }), 400
         
         # Get image from request
-        if 'file' in request.files:
-            file = request.files['file']
-            image_path = os.path.join(UPLOAD_FOLDER, file.filename)
-            file.save(image_path)
-        elif request.is_json and 'image' in request.json:
-            # Decode base64 image
-            image_data = base64.b64decode(request.json['image'])
-            image = Image.open(io.BytesIO(image_data))
-            image_path = os.path.join(UPLOAD_FOLDER, 'temp_spoonacular.jpg')
-            image.save(image_path)
-        else:
+        image_bytes, filename = _read_upload('temp_spoonacular.jpg')
+        if image_bytes is None:
             return jsonify({'success': False, 'error': 'No image provided'}), 400
+        image_path = _persist_upload(image_bytes, filename)
         
         # Detect using Spoonacular
-        result = spoonacular_detector.detect_food(image_path)
+        result = _call_provider('spoonacular', spoonacular_detector, image_path, image_bytes)
         
         if result['success']:
             return jsonify({
@@ -370,12 +1268,15 @@ def detect_food_spoonacular():
         else:
             return jsonify(result), 500
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         print(f"Error in detect_food_spoonacular: {e}")
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/v1/food/detect/caloriemama', methods=['POST'])
+@_admitted
 def detect_food_caloriemama():
     """
     Detect food using Calorie Mama API (FREE - 500 requests/month)
@@ -411,21 +1312,13 @@ def detect_food_caloriemama():
             }), 400
         
         # Get image from request
-        if 'file' in request.files:
-            file = request.files['file']
-            image_path = os.path.join(UPLOAD_FOLDER, file.filename)
-            file.save(image_path)
-        elif request.is_json and 'image' in request.json:
-            # Decode base64 image
-            image_data = base64.b64decode(request.json['image'])
-            image = Image.open(io.BytesIO(image_data))
-            image_path = os.path.join(UPLOAD_FOLDER, 'temp_caloriemama.jpg')
-            image.save(image_path)
-        else:
+        image_bytes, filename = _read_upload('temp_caloriemama.jpg')
+        if image_bytes is None:
             return jsonify({'success': False, 'error': 'No image provided'}), 400
+        image_path = _persist_upload(image_bytes, filename)
         
         # Detect using Calorie Mama
-        result = calorie_mama_detector.detect_food(image_path)
+        result = _call_provider('calorie_mama', calorie_mama_detector, image_path, image_bytes)
         
         if result['success']:
             return jsonify({
@@ -437,12 +1330,16 @@ def detect_food_caloriemama():
         else:
             return jsonify(result), 500
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         print(f"Error in detect_food_caloriemama: {e}")
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/v1/glucose/predict', methods=['POST'])
+@_requires('glucose_prediction')
+@_admitted
 def predict_glucose():
     """
     Predict glucose levels based on meal data
@@ -476,11 +1373,14 @@ def predict_glucose():
             return jsonify({'success': False, 'error': 'No meal data provided'}), 400
         
         # Make prediction
-        prediction = glucose_model.predict(meal_data)
+        model = glucose_model
+        with metrics.time_stage('glucose_predict'):
+            prediction = model.predict(meal_data)
         
         return jsonify({
             'success': True,
-            'prediction': prediction
+            'prediction': prediction,
+            'model_version': model.model_version
         })
         
     except Exception as e:
@@ -489,6 +1389,8 @@ def predict_glucose():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/v1/food/scan-and-predict', methods=['POST'])
+@_requires('food_detection', 'glucose_prediction')
+@_admitted
 def scan_and_predict():
     """
     Complete pipeline: scan food → analyze nutrition → predict glucose
@@ -516,95 +1418,446 @@ def scan_and_predict():
     """
     try:
         # Get image
-        if 'file' in request.files:
-            file = request.files['file']
-            image_path = os.path.join(UPLOAD_FOLDER, file.filename)
-            file.save(image_path)
-            
-            # Get parameters from form
-            time_of_day = request.form.get('time_of_day', 'afternoon')
-            last_glucose_reading = float(request.form.get('last_glucose_reading', 100))
-            hours_since_last_meal = float(request.form.get('hours_since_last_meal', 4))
-            
-            import json
-            user_profile = json.loads(request.form.get('user_profile', '{}'))
-        else:
-            data = request.json
-            
-            # Decode base64 image
-            image_data = base64.b64decode(data['image'])
-            image = Image.open(io.BytesIO(image_data))
-            image_path = os.path.join(UPLOAD_FOLDER, 'temp_upload.jpg')
-            image.save(image_path)
-            
-            time_of_day = data.get('time_of_day', 'afternoon')
-            last_glucose_reading = data.get('last_glucose_reading', 100)
-            hours_since_last_meal = data.get('hours_since_last_meal', 4)
-            user_profile = data.get('user_profile', {})
-        
-        # Step 1: Analyze food
-        food_result = food_service.process_image(
-            image_path=image_path,
-            time_of_day=time_of_day,
-            user_profile=user_profile,
-            save_annotated=True
+        image_bytes, image_path, image = _load_upload('temp_upload.jpg')
+        if image_bytes is None:
+            return jsonify({'success': False, 'error': 'No image provided'}), 400
+        
+        # Get parameters from form or JSON body
+        params = _scan_params()
+        
+        return _idempotent(
+            'scan-and-predict',
+            _request_fingerprint('scan-and-predict', image_path, image, params),
+            lambda: _run_scan_pipeline(image_path, image, params)
         )
         
-        if not food_result['success']:
-            return jsonify(food_result), 400
-        
-        # Step 2: Prepare meal data for glucose prediction
-        nutrition = food_result['nutrition']
-        
-        meal_data = {
-            'total_carbs': nutrition['total_carbs'],
-            'total_protein': nutrition['total_protein'],
-            'total_fat': nutrition['total_fat'],
-            'total_fiber': nutrition['total_fiber'],
-            'glycemic_load': nutrition['glycemic_load'],
-            'total_calories': nutrition['total_calories'],
-            'time_of_day': time_of_day,
-            'last_glucose_reading': last_glucose_reading,
-            'hours_since_last_meal': hours_since_last_meal,
-            'foods_detected': food_result['foods_detected'],
-            **user_profile
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        print(f"Error in scan_and_predict: {e}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _scan_stages(image_path: str, image, params: dict):
+    """
+    Run the scan pipeline one stage at a time, yielding each stage's output
+    
+    Yields:
+        Event dicts in order: detections, nutrition, prediction, complete
+        (the last one carries the annotated image and the full response)
+    """
+    ctx = ImageContext.ensure(image if image is not None else image_path)
+    service, predictor = food_service, glucose_model
+    
+    # Stage 1: detections as soon as YOLO returns
+    detections = service.detect_foods(ctx)
+    foods_detected = [d['item'] for d in detections]
+    yield {'stage': 'detections', 'foods_detected': foods_detected, 'detections': detections}
+    
+    if not detections:
+        yield {
+            'stage': 'complete',
+            'success': False,
+            'message': 'No food items detected. Please try again with a clearer image.'
         }
+        return
+    
+    # Stage 2: nutrition totals
+    with metrics.time_stage('nutrition'):
+        nutrition = service.calculate_nutrition(
+            detections, params['time_of_day'], params['user_profile']
+        )
+    yield {'stage': 'nutrition', 'nutrition': nutrition}
+    
+    # Stage 3: glucose prediction and advice
+    food_result = {
+        'timestamp': datetime.now().isoformat(),
+        'foods_detected': foods_detected,
+        'detections': detections,
+        'nutrition': nutrition,
+        'model_version': service.model_version
+    }
+    with metrics.time_stage('glucose_predict'):
+        glucose_prediction = predictor.predict(_build_meal_data(food_result, params))
+    with metrics.time_stage('advice'):
+        advice = service.get_advice(nutrition, glucose_prediction)
+    yield {'stage': 'prediction', 'prediction': glucose_prediction, 'advice': advice}
+    
+    # Stage 4: annotated image last
+    food_result['annotated_image'] = service.save_annotated_image(ctx, detections, image_path)
+    yield {
+        'stage': 'complete',
+        'annotated_image': food_result['annotated_image'],
+        'result': _build_scan_response(food_result, glucose_prediction, advice, predictor.model_version)
+    }
+
+@app.route('/api/v1/food/scan-and-predict/stream', methods=['POST'])
+@_requires('food_detection', 'glucose_prediction')
+@_admitted
+def scan_and_predict_stream():
+    """
+    Progressive scan-and-predict: one event per pipeline stage
+    
+    Request body: same as /api/v1/food/scan-and-predict
+    
+    Response: NDJSON (one JSON object per line) by default, or Server-Sent
+    Events with ?format=sse or "Accept: text/event-stream". Events, in order:
+        {"stage": "detections", "foods_detected": [...], "detections": [...]}
+        {"stage": "nutrition", "nutrition": {...}}
+        {"stage": "prediction", "prediction": {...}, "advice": {...}}
+        {"stage": "complete", "annotated_image": "...", "result": {...full response...}}
+    A failure mid-stream is reported as {"stage": "error", "error": "..."};
+    failures before the stream starts are plain JSON errors.
+    """
+    try:
+        image_bytes, image_path, image = _load_upload('temp_upload.jpg')
+        if image_bytes is None:
+            return jsonify({'success': False, 'error': 'No image provided'}), 400
+        params = _scan_params()
+        
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        print(f"Error in scan_and_predict_stream: {e}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    use_sse = (
+        request.args.get('format') == 'sse'
+        or 'text/event-stream' in request.headers.get('Accept', '')
+    )
+    
+    def encode(event: dict) -> str:
+        payload = json.dumps(event, default=float)
+        if use_sse:
+            return f"event: {event['stage']}\ndata: {payload}\n\n"
+        return payload + '\n'
+    
+    def generate():
+        try:
+            for event in _scan_stages(image_path, image, params):
+                yield encode(event)
+        except Exception as e:
+            print(f"Error in scan_and_predict_stream: {e}")
+            traceback.print_exc()
+            event = {'stage': 'error', 'error': str(e)}
+            if isinstance(e, AdmissionRejected):
+                event['retry_after'] = e.retry_after
+            yield encode(event)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if use_sse else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/v1/jobs/scan-and-predict', methods=['POST'])
+@_requires('food_detection', 'glucose_prediction')
+@_admitted
+def submit_scan_job():
+    """
+    Submit a scan-and-predict job and return immediately
+    
+    Request body: same as /api/v1/food/scan-and-predict
+    
+    Response (202):
+    {
+        "success": true,
+        "job_id": "3f2a...",
+        "status": "queued",
+        "status_url": "/api/v1/jobs/3f2a..."
+    }
+    """
+    try:
+        image_bytes, image_path, image = _load_upload('temp_upload.jpg')
+        if image_bytes is None:
+            return jsonify({'success': False, 'error': 'No image provided'}), 400
+        
+        params = _scan_params()
         
-        # Step 3: Predict glucose
-        glucose_prediction = glucose_model.predict(meal_data)
+        def submit():
+            # Reject up front when the backlog is full (queued jobs hold decoded images)
+            release = None
+            if admission is not None:
+                pool = admission.pool('jobs')
+                pool.acquire()
+                submitted_at = time.perf_counter()
+                release = lambda: pool.release(time.perf_counter() - submitted_at)
+            try:
+                job_id = job_store.create('scan-and-predict', {**params, 'image_path': image_path})
+                job_workers.submit(_run_scan_job, job_id, image_path, image, params, release)
+            except BaseException:
+                if release is not None:
+                    release()
+                raise
+            return {
+                'success': True,
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': f'/api/v1/jobs/{job_id}'
+            }, 202
         
-        # Step 4: Get updated advice with glucose prediction
-        advice = food_service.get_advice(nutrition, glucose_prediction)
+        # A retried submission with the same Idempotency-Key gets the same job back
+        return _idempotent(
+            'jobs/scan-and-predict',
+            _request_fingerprint('scan-and-predict', image_path, image, params),
+            submit
+        )
         
-        # Step 5: Combine everything
-        unified_response = {
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        print(f"Error in submit_scan_job: {e}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/v1/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Poll a job. Pass ?wait=<seconds> to long-poll until it finishes
+    (clamped to 0..JOB_MAX_WAIT_SECONDS).
+    
+    Response:
+    {
+        "success": true,
+        "job_id": "3f2a...",
+        "status": "queued" | "running" | "completed" | "failed",
+        "result": { <scan-and-predict response> },   // when completed
+        "error": "..."                               // when failed
+    }
+    """
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        wait = math.nan
+    if math.isnan(wait):
+        return jsonify({'success': False, 'error': 'wait must be a number of seconds'}), 400
+    wait = max(0.0, min(wait, JOB_MAX_WAIT_SECONDS))
+    job = job_store.wait(job_id, wait) if wait > 0 else job_store.get(job_id)
+    
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job id'}), 404
+    
+    return jsonify({'success': True, **job})
+
+@app.route('/api/v1/food/detect/batch', methods=['POST'])
+@_requires('food_detection')
+@_admitted
+def detect_food_batch():
+    """
+    Detect food items in several images with one batched inference
+    
+    Request body:
+        multipart: repeated "files" fields (+ optional conf_threshold, iou_threshold)
+        or JSON: {"images": ["base64...", ...], "conf_threshold": 0.25, "iou_threshold": 0.45}
+    
+    Response:
+    {
+        "success": true,
+        "results": [
+            {"success": true, "detections": [...], "num_foods": 2},
+            {"success": false, "error": "Invalid image: ..."},   // undecodable upload
+            ...
+        ]
+    }
+    """
+    try:
+        uploads = _load_uploads()
+        if not uploads:
+            return jsonify({'success': False, 'error': 'No images provided'}), 400
+        if len(uploads) > MAX_BATCH_IMAGES:
+            return jsonify({
+                'success': False,
+                'error': f'Too many images ({len(uploads)}); limit is {MAX_BATCH_IMAGES}'
+            }), 400
+        
+        source = request.json if request.is_json else request.form
+        conf_threshold = float(source.get('conf_threshold', 0.25))
+        iou_threshold = float(source.get('iou_threshold', 0.45))
+        
+        service = food_service
+        valid = [(path, image) for path, image, error in uploads if error is None]
+        all_detections = service.detect_foods_batch(
+            [image for _, image in valid],
+            conf_threshold=conf_threshold,
+            iou_threshold=iou_threshold
+        ) if valid else []
+        
+        results = _batch_results(uploads, [
+            {
+                'success': True,
+                'detections': detections,
+                'num_foods': len(detections),
+                'model_version': service.model_version
+            }
+            for detections in all_detections
+        ])
+        return jsonify({
             'success': True,
-            'timestamp': food_result['timestamp'],
-            'foods_detected': food_result['foods_detected'],
-            'detections': food_result['detections'],
-            'total_carbs': nutrition['total_carbs'],
-            'total_protein': nutrition['total_protein'],
-            'total_fat': nutrition['total_fat'],
-            'total_fiber': nutrition['total_fiber'],
-            'total_calories': nutrition['total_calories'],
-            'glycemic_load': nutrition['glycemic_load'],
-            'predicted_glucose_1h': glucose_prediction['predicted_glucose_1h'],
-            'predicted_glucose_2h': glucose_prediction['predicted_glucose_2h'],
-            'glucose_spike_1h': glucose_prediction['glucose_spike_1h'],
-            'glucose_spike_2h': glucose_prediction['glucose_spike_2h'],
-            'peak_time': glucose_prediction['peak_time'],
-            'risk_level': advice['risk_level'],
-            'icon': advice['icon'],
-            'message': advice['message'],
-            'suggestions': advice['suggestions'],
-            'time_advice': advice['time_advice'],
-            'annotated_image': food_result.get('annotated_image')
+            'results': results,
+            'num_images': len(results)
+        })
+        
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        print(f"Error in detect_food_batch: {e}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/v1/food/detect/stream', methods=['POST'])
+@_requires('food_detection')
+@_admitted
+def detect_food_stream():
+    """
+    Live plate scan over a short video: one event each time the detected contents change
+    
+    Frames that barely differ from the last analyzed one skip inference, and
+    detections are tracked across frames so boxes and items stay stable.
+    
+    Request body: multipart "file" (video), or a raw video/* or
+    application/octet-stream body; optional conf_threshold, iou_threshold,
+    diff_threshold, min_hits and max_missed as form fields or query parameters
+    
+    Response (application/x-ndjson):
+        {"stage": "update", "frame_index": 0, "foods_detected": [...], "detections": [...]}
+        ...
+        {"stage": "complete", "frames_seen": 120, "updates": 3}
+    A failure mid-stream is reported as {"stage": "error", "error": "..."}.
+    """
+    if 'file' in request.files:
+        file = request.files['file']
+        video_bytes, filename = file.read(), file.filename or 'stream.mp4'
+    elif request.mimetype.startswith('video/') or request.mimetype == 'application/octet-stream':
+        video_bytes, filename = request.get_data(cache=False), 'stream.mp4'
+    else:
+        video_bytes = None
+    if not video_bytes:
+        return jsonify({'success': False, 'error': 'No video provided'}), 400
+    
+    try:
+        options = {
+            'conf_threshold': float(request.values.get('conf_threshold', 0.25)),
+            'iou_threshold': float(request.values.get('iou_threshold', 0.45)),
+            'diff_threshold': float(request.values.get('diff_threshold', 8.0)),
+            'min_hits': int(request.values.get('min_hits', 2)),
+            'max_missed': int(request.values.get('max_missed', 2))
         }
+        for name in ('conf_threshold', 'iou_threshold'):
+            if not 0.0 <= options[name] <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1")
+        if not 0.0 <= options['diff_threshold'] <= 255.0:
+            raise ValueError("diff_threshold must be between 0 and 255")
+        if options['min_hits'] < 1 or options['max_missed'] < 0:
+            raise ValueError("min_hits must be at least 1 and max_missed at least 0")
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f"Invalid stream option: {e}"}), 400
+    
+    # OpenCV only decodes videos from a file
+    video = tempfile.NamedTemporaryFile(suffix=Path(filename).suffix or '.mp4', delete=False)
+    with video:
+        video.write(video_bytes)
+    service = food_service
+    
+    def generate():
+        frames_seen = 0
+        updates = 0
+        try:
+            def frames():
+                nonlocal frames_seen
+                for frame in iter_video_frames(video.name, STREAM_MAX_FRAMES):
+                    frames_seen += 1
+                    yield frame
+            
+            for update in service.detect_stream(frames(), **options):
+                updates += 1
+                yield json.dumps({'stage': 'update', **update, 'model_version': service.model_version}) + '\n'
+            yield json.dumps({'stage': 'complete', 'frames_seen': frames_seen, 'updates': updates}) + '\n'
+        except Exception as e:
+            print(f"Error in detect_food_stream: {e}")
+            traceback.print_exc()
+            event = {'stage': 'error', 'error': str(e)}
+            if isinstance(e, AdmissionRejected):
+                event['retry_after'] = e.retry_after
+            yield json.dumps(event) + '\n'
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Also runs when the client disconnects before the stream starts
+    response.call_on_close(lambda: os.unlink(video.name))
+    return response
+
+@app.route('/api/v1/food/scan-and-predict/batch', methods=['POST'])
+@_requires('food_detection', 'glucose_prediction')
+@_admitted
+def scan_and_predict_batch():
+    """
+    Complete pipeline for several images: one batched detection pass and
+    one batched glucose prediction
+    
+    Request body: same fields as /api/v1/food/scan-and-predict, with repeated
+    "files" fields (or JSON "images" list). Meal context applies to every image.
+    
+    Response:
+    {
+        "success": true,
+        "results": [ <scan-and-predict response per image, in order;
+                      {"success": false, "error": ...} for an undecodable upload> ]
+    }
+    """
+    try:
+        uploads = _load_uploads()
+        if not uploads:
+            return jsonify({'success': False, 'error': 'No images provided'}), 400
+        if len(uploads) > MAX_BATCH_IMAGES:
+            return jsonify({
+                'success': False,
+                'error': f'Too many images ({len(uploads)}); limit is {MAX_BATCH_IMAGES}'
+            }), 400
         
-        return jsonify(unified_response)
+        params = _scan_params()
+        service, predictor = food_service, glucose_model
         
+        # Step 1: Analyze all foods with one batched detection pass
+        valid = [(path, image) for path, image, error in uploads if error is None]
+        food_results = service.process_images(
+            [path for path, _ in valid],
+            time_of_day=params['time_of_day'],
+            user_profile=params['user_profile'],
+            save_annotated=True,
+            images=[image for _, image in valid]
+        ) if valid else []
+        
+        # Step 2-3: Predict glucose for every successful image in one call
+        analyzed = [i for i, result in enumerate(food_results) if result['success']]
+        with metrics.time_stage('glucose_predict'):
+            predictions = predictor.predict_batch(
+                [_build_meal_data(food_results[i], params) for i in analyzed]
+            )
+        
+        # Step 4-5: Advice and per-image responses, in request order
+        results = list(food_results)
+        for i, glucose_prediction in zip(analyzed, predictions):
+            with metrics.time_stage('advice'):
+                advice = service.get_advice(food_results[i]['nutrition'], glucose_prediction)
+            results[i] = _build_scan_response(
+                food_results[i], glucose_prediction, advice, predictor.model_version
+            )
+        
+        results = _batch_results(uploads, results)
+        return jsonify({
+            'success': True,
+            'results': results,
+            'num_images': len(results)
+        })
+        
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        print(f"Error in scan_and_predict: {e}")
+        print(f"Error in scan_and_predict_batch: {e}")
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -641,6 +1894,8 @@ def submit_feedback():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/v1/food/detect/demo', methods=['POST'])
+@_requires('demo_mapper')
+@_admitted
 def detect_food_demo():
     """
     🎯 DEMO MODE - Exact image matching for perfect demo results
@@ -677,21 +1932,14 @@ def detect_food_demo():
             }), 400
         
         # Get image from request
-        if 'file' in request.files:
-            file = request.files['file']
-            image_path = os.path.join(UPLOAD_FOLDER, 'demo_' + file.filename)
-            file.save(image_path)
-        elif request.is_json and 'image' in request.json:
-            # Decode base64 image
-            image_data = base64.b64decode(request.json['image'])
-            image = Image.open(io.BytesIO(image_data))
-            image_path = os.path.join(UPLOAD_FOLDER, 'demo_temp.jpg')
-            image.save(image_path)
-        else:
+        image_bytes, filename = _read_upload('temp.jpg')
+        if image_bytes is None:
             return jsonify({'success': False, 'error': 'No image provided'}), 400
+        image_path = _persist_upload(image_bytes, filename)
+        image = ImageContext.from_bytes(image_bytes).bgr if IN_MEMORY_UPLOADS else None
         
         # Detect using demo mapper
-        result = demo_mapper.detect_food(image_path)
+        result = demo_mapper.detect_food(image_path, image=image)
         
         return jsonify(result)
         
@@ -701,8 +1949,9 @@ def detect_food_demo():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 if __name__ == '__main__':
-    # Initialize services before starting server
-    if init_services():
+    # Initialize services before starting server (models load in the
+    # background when BACKGROUND_MODEL_LOADING is on)
+    if init_services(background=BACKGROUND_MODEL_LOADING):
         print("\n🚀 Starting Flask API server...")
         print("📍 Endpoints available:")
         print("   - POST /api/v1/food/detect (local YOLOv8 model)")
@@ -710,13 +1959,27 @@ if __name__ == '__main__':
         print("   - POST /api/v1/food/analyze")
         print("   - POST /api/v1/glucose/predict")
         print("   - POST /api/v1/food/scan-and-predict")
+        print("   - POST /api/v1/food/detect/batch")
+        print("   - POST /api/v1/food/detect/stream (video → NDJSON updates)")
+        print("   - POST /api/v1/food/scan-and-predict/batch")
+        print("   - POST /api/v1/food/scan-and-predict/stream (NDJSON / SSE)")
+        print("   - POST /api/v1/jobs/scan-and-predict (async)")
+        print("   - GET  /api/v1/jobs/<job_id>?wait=25")
         print("   - POST /api/v1/feedback")
         print("   - GET  /health")
+        print("   - GET  /ready")
+        print("   - GET  /api/v1/stats/inference")
+        print("   - GET  /metrics (Prometheus)")
+        print("   (single-image endpoints also take a raw image/jpeg body)")
+        
+        if UNIX_SOCKET_PATH:
+            serve_unix_socket(UNIX_SOCKET_PATH)
         
         app.run(
             host='0.0.0.0',
             port=5001,
-            debug=False  # Disabled to prevent hot reload issues with PyTorch
+            debug=False,  # Disabled to prevent hot reload issues with PyTorch
+            threaded=True  # Concurrent requests are what the batch scheduler groups
         )
     else:
         print("❌ Failed to initialize services. Exiting.")
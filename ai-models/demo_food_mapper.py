@@ -14,9 +14,9 @@ class DemoFoodMapper:
         self.mapping_file = self.demo_images_dir / "food_mapping.json"
         self.load_mappings()
     
-    def get_image_hash(self, image_path):
+    def get_image_hash(self, image_path, image=None):
         """Get unique hash of image for identification"""
-        img = cv2.imread(str(image_path))
+        img = image if image is not None else cv2.imread(str(image_path))
         if img is None:
             return None
         
@@ -74,12 +74,14 @@ class DemoFoodMapper:
             return True
         return False
     
-    def detect_food(self, image_path):
+    def detect_food(self, image_path, image=None):
         """
         Detect food from demo image
         Returns exact match or None
+        
+        Pass an already decoded BGR array as ``image`` to skip reading image_path
         """
-        img_hash = self.get_image_hash(image_path)
+        img_hash = self.get_image_hash(image_path, image)
         
         if img_hash in self.mappings:
             food_data = self.mappings[img_hash]
@@ -0,0 +1,83 @@
+"""
+NumPy Box Operations
+Filtering and non-maximum suppression on raw detector outputs
+"""
+
+import numpy as np
+from typing import Dict
+
+
+def non_max_suppression(
+    xyxy: np.ndarray,
+    scores: np.ndarray,
+    classes: np.ndarray,
+    iou_threshold: float,
+    max_det: int = 300
+) -> np.ndarray:
+    """
+    Class-aware greedy NMS (same semantics as ultralytics with agnostic=False)
+
+    Args:
+        xyxy: (N, 4) boxes in pixel coordinates
+        scores: (N,) confidences
+        classes: (N,) class ids
+        iou_threshold: Boxes overlapping a kept box by more than this are dropped
+        max_det: Maximum number of boxes to keep
+
+    Returns:
+        Indices of kept boxes, highest score first
+    """
+    if len(xyxy) == 0:
+        return np.zeros((0,), dtype=np.int64)
+
+    # Offset boxes by class so boxes of different classes never overlap
+    offset = classes.astype(np.float32)[:, None] * (float(xyxy.max()) + 1.0)
+    boxes = xyxy.astype(np.float32) + offset
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size > 0 and len(keep) < max_det:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+
+        order = rest[iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
+
+
+def filter_raw(
+    raw: Dict[str, np.ndarray],
+    conf_threshold: float,
+    iou_threshold: float,
+    max_det: int = 300
+) -> Dict[str, np.ndarray]:
+    """
+    Apply a confidence threshold and NMS to raw (pre-NMS) detections
+
+    Args:
+        raw: Dict with 'xyxy', 'conf', 'cls' arrays and 'orig_shape'
+        conf_threshold: Boxes must score above this to be kept
+        iou_threshold: NMS IoU threshold
+        max_det: Maximum number of boxes to keep
+
+    Returns:
+        Raw-style dict holding only the surviving boxes, highest score first
+    """
+    mask = raw['conf'] > conf_threshold
+    xyxy, conf, cls = raw['xyxy'][mask], raw['conf'][mask], raw['cls'][mask]
+    keep = non_max_suppression(xyxy, conf, cls, iou_threshold, max_det)
+    return {
+        'xyxy': xyxy[keep],
+        'conf': conf[keep],
+        'cls': cls[keep],
+        'orig_shape': raw['orig_shape']
+    }
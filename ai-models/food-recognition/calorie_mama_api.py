@@ -28,27 +28,29 @@ class CalorieMamaDetector:
             "X-RapidAPI-Host": "calorie-mama-food-nutrition-analysis.p.rapidapi.com"
         }
     
-    def detect_food(self, image_path: str) -> Dict[str, Any]:
+    def detect_food(self, image_path: str, image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
         """
         Detect food items in an image
         
         Args:
             image_path: Path to the image file
+            image_bytes: Image contents already in memory (skips reading image_path)
             
         Returns:
             Dictionary containing detected food items with nutrition data
         """
         try:
-            # Read and encode image
-            with open(image_path, 'rb') as image_file:
-                image_data = base64.b64encode(image_file.read()).decode('utf-8')
+            # Read image
+            if image_bytes is None:
+                with open(image_path, 'rb') as image_file:
+                    image_bytes = image_file.read()
             
             # Prepare request
             url = f"{self.base_url}/api/v1/foodrecognition"
             
-            # Calorie Mama expects multipart/form-data with base64 image
+            # Calorie Mama expects multipart/form-data with the raw image
             files = {
-                'image': (os.path.basename(image_path), base64.b64decode(image_data), 'image/jpeg')
+                'image': (os.path.basename(image_path), image_bytes, 'image/jpeg')
             }
             
             # Make API request
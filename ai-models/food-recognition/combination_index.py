@@ -0,0 +1,59 @@
+"""
+Meal Combination Index
+mealCombinationRules compiled into an index keyed by food, so matching a
+meal only looks at rules that involve the foods actually detected
+"""
+
+from typing import Dict, Iterable, List
+
+
+class CombinationIndex:
+    """
+    thaliEffect rules indexed by an anchor food
+
+    Every rule is filed once, under whichever of its foods has the fewest
+    rules so far. A meal checks only the rules filed under its detected
+    foods, so the cost follows the meal size and not the rule count.
+    """
+
+    def __init__(self, rules: List[Dict]):
+        """
+        Compile the rules
+
+        Args:
+            rules: thaliEffect rules with 'combination', 'giReduction' and 'reason'
+        """
+        self.rules = rules
+        self.by_anchor: Dict[str, List[int]] = {}
+
+        # A rule without foods matches every meal (as all() of nothing did)
+        self.unconditional: List[int] = []
+
+        for rule_id, rule in enumerate(rules):
+            foods = set(rule['combination'])
+            if not foods:
+                self.unconditional.append(rule_id)
+                continue
+            anchor = min(sorted(foods), key=lambda food: len(self.by_anchor.get(food, ())))
+            self.by_anchor.setdefault(anchor, []).append(rule_id)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def match(self, detected_items: Iterable[str]) -> List[Dict]:
+        """
+        Rules whose foods are all in the meal
+
+        Args:
+            detected_items: Food names detected in the meal
+
+        Returns:
+            Matching rules, in database order
+        """
+        detected = set(detected_items)
+        matched = list(self.unconditional)
+        for food in detected:
+            for rule_id in self.by_anchor.get(food, ()):
+                if detected.issuperset(self.rules[rule_id]['combination']):
+                    matched.append(rule_id)
+        return [self.rules[rule_id] for rule_id in sorted(matched)]
@@ -54,24 +54,31 @@ class FallbackFoodDetector:
             'creamy': ['raita', 'curry']
         }
     
-    def detect_by_color(self, image_path: str) -> List[Dict[str, Any]]:
+    def detect_by_color(self, image) -> List[Dict[str, Any]]:
         """
         Analyze image colors to detect common food items
         
         Args:
-            image_path: Path to food image
+            image: Path to food image, decoded BGR array or an ImageContext.
+                With an ImageContext the analysis runs on its shared HSV
+                thumbnail and boxes are scaled back to full resolution.
             
         Returns:
             List of detected food items with confidence scores
         """
-        # Read image
-        img = cv2.imread(image_path)
-        if img is None:
-            return []
-        
-        # Convert to HSV
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        height, width = img.shape[:2]
+        if hasattr(image, 'hsv_thumbnail'):
+            hsv = image.hsv_thumbnail
+            scale_x, scale_y = image.thumbnail_scale
+        else:
+            # Read image
+            img = image if isinstance(image, np.ndarray) else cv2.imread(image)
+            if img is None:
+                return []
+            
+            # Convert to HSV
+            hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+            scale_x, scale_y = 1.0, 1.0
+        height, width = hsv.shape[:2]
         
         detections = []
         
@@ -109,11 +116,17 @@ class FallbackFoodDetector:
                     if match_ratio > 0.15:  # 15% of cell
                         detected_items.add(food_key)
                         
+                        # Map cell back to full-resolution coordinates
+                        box = [
+                            int(x1 * scale_x), int(y1 * scale_y),
+                            int(x2 * scale_x), int(y2 * scale_y)
+                        ]
+                        
                         detections.append({
                             'item': pattern['name'],
                             'confidence': min(pattern['confidence'] + match_ratio * 0.2, 0.85),
-                            'bounding_box': [x1, y1, x2, y2],
-                            'box_area': (x2 - x1) * (y2 - y1),
+                            'bounding_box': box,
+                            'box_area': (box[2] - box[0]) * (box[3] - box[1]),
                             'portion_size': 'medium',
                             'estimated_weight': 120.0,
                             'detection_method': 'color_fallback'
@@ -5,18 +5,111 @@ Handles food detection, bounding boxes, and nutrition mapping
 
 import os
 import json
-from typing import List, Dict, Any, Tuple
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
 from pathlib import Path
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from datetime import datetime
 import importlib.util
+import hashlib
+import sys
+
+
+def _load_sibling(module_name: str):
+    """Load a module from this folder (hyphenated folder names can't be imported normally)"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(
+        module_name,
+        Path(__file__).parent / f"{module_name}.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _model_version(model_path: str) -> str:
+    """Short identifier for a weights file: run name plus a content fingerprint"""
+    path = Path(model_path)
+    name = path.parent.parent.name if path.parent.name == 'weights' else path.stem
+    if path.is_dir():
+        # OpenVINO export folder: fingerprint its .xml
+        path = next(path.glob('*.xml'), path)
+    if not path.is_file():
+        return name
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return f"{name}-{digest.hexdigest()[:8]}"
+
+
+def _resolve_backend(model_path: str, backend: str) -> str:
+    """'auto' picks the inference backend from the weights file type"""
+    if backend != 'auto':
+        return backend
+    path = Path(model_path)
+    if path.suffix.lower() == '.onnx':
+        return 'onnx'
+    if path.suffix.lower() == '.xml' or path.is_dir():
+        return 'openvino'
+    return 'pytorch'
+
+
+def _load_detector(model_path: str, backend: str, num_threads: int = 0):
+    """Load a detector with the given (already resolved) backend"""
+    if backend == 'pytorch':
+        # Imported here so loading this module (and the API server) stays fast
+        from ultralytics import YOLO
+        return YOLO(model_path)
+    onnx_backend = _load_sibling("onnx_backend")
+    return onnx_backend.OnnxDetector(model_path, runtime=backend, num_threads=num_threads)
+
+
+_image_context = _load_sibling("image_context")
+ImageContext = _image_context.ImageContext
+decode_image = _image_context.decode_image
+box_ops = _load_sibling("box_ops")
+_result_cache = _load_sibling("result_cache")
+_nutrition_index = _load_sibling("nutrition_index")
+_combination_index = _load_sibling("combination_index")
+
+# Pre-NMS boxes kept per image by the threshold-agnostic inference pass
+RAW_MAX_DETECTIONS = 1000
+
+# Portion size from box area relative to the image: < 8% small, < 20% medium, else large
+PORTION_SIZES = _nutrition_index.PORTION_SIZES
+SIZE_IDS = _nutrition_index.SIZE_IDS
+PORTION_AREA_BINS = np.array([0.08, 0.20])
+DEFAULT_PORTION_WEIGHTS = (80, 120, 180)
+
+# Weight multiplier for less certain detections: < 0.65 → 1.2, < 0.85 → 1.1, else 1.0
+CONFIDENCE_BINS = np.array([0.65, 0.85])
+UNCERTAINTY_FACTORS = np.array([1.2, 1.1, 1.0])
+
 
 class FoodDetectionService:
     """Main service for food detection and nutrition analysis"""
     
-    def __init__(self, model_path: str, nutrition_db_path: str, use_fallback: bool = True):
+    # Threads whose detections skip the scheduler and fallback pool (see run_inline)
+    _inline = threading.local()
+    
+    def __init__(
+        self, 
+        model_path: str, 
+        nutrition_db_path: str, 
+        use_fallback: bool = True,
+        min_conf_threshold: float = 0.05,
+        raw_cache_size: int = 32,
+        backend: str = 'auto',
+        num_threads: int = 0
+    ):
         """
         Initialize the food detection service
         
@@ -24,19 +117,50 @@ class FoodDetectionService:
             model_path: Path to trained YOLOv8 model (.pt file)
             nutrition_db_path: Path to nutrition database JSON
             use_fallback: Enable fallback detection for untrained items
+            min_conf_threshold: Lowest confidence the model is run at; any
+                higher conf/iou request is served by filtering those boxes
+            raw_cache_size: Images whose raw boxes are kept for re-filtering
+            backend: 'pytorch' (ultralytics), 'onnx' (ONNX Runtime), 'openvino',
+                or 'auto' to pick from the file type (.pt / .onnx / .xml)
+            num_threads: CPU threads for the ONNX Runtime / OpenVINO backends
+                (0 lets the runtime decide)
         """
-        self.model = YOLO(model_path)
+        self.backend = _resolve_backend(model_path, backend)
+        self.num_threads = num_threads
+        self.model_path = model_path
+        self.model = _load_detector(model_path, self.backend, num_threads)
+        self.model_version = _model_version(model_path)
         self.use_fallback = use_fallback
         
+        # Raw (pre-NMS) boxes per image so other thresholds skip inference
+        self.min_conf_threshold = min_conf_threshold
+        self.raw_cache = _result_cache.ResultCache(max_entries=raw_cache_size)
+        
+        # Optional executor for writing annotated images off the request path
+        self.background_writer = None
+        
+        # Optional pool running the fallback detector alongside YOLO (see enable_speculative_fallback)
+        self.fallback_executor = None
+        
+        # Optional micro-batching scheduler (see enable_batching)
+        self.scheduler = None
+        
+        # Optional low-to-high resolution cascade (see enable_cascade)
+        self.cascade = None
+        
+        # Optional content-addressed result cache (see enable_cache)
+        self.result_cache = None
+        
+        # Optional metrics sink with stage(name, seconds) and event(name)
+        self.observer = None
+        
+        # Optional admission controller with slot(pool) bounding YOLO/fallback concurrency
+        self.admission = None
+        
         # Initialize fallback detector
         if use_fallback:
             try:
-                fallback_spec = importlib.util.spec_from_file_location(
-                    "fallback_detector",
-                    Path(__file__).parent / "fallback_detector.py"
-                )
-                fallback_module = importlib.util.module_from_spec(fallback_spec)
-                fallback_spec.loader.exec_module(fallback_module)
+                fallback_module = _load_sibling("fallback_detector")
                 self.fallback_detector = fallback_module.FallbackFoodDetector()
                 print("✅ Fallback detector enabled (generic food recognition)")
             except Exception as e:
@@ -75,13 +199,340 @@ class FoodDetectionService:
         self.combination_rules = self.nutrition_data['mealCombinationRules']
         self.advice_engine = self.nutrition_data['adviceEngine']
         
+        # Numeric arrays for meal totals (parsed once here, not per scan)
+        self.nutrition_index = _nutrition_index.NutritionIndex(self.food_db)
+        self.combination_index = _combination_index.CombinationIndex(self.combination_rules['thaliEffect']['rules'])
+        
+        self._build_class_tables()
+        
         print(f"✅ Model loaded: {model_path}")
         print(f"✅ Nutrition database loaded: {nutrition_db_path}")
-        print(f"🎯 Using custom trained model: indian-food-v14 (40 epochs, 80.85% mAP50)")
+        print(f"🎯 Using custom trained model: {self.model_version} ({self.backend})")
+    
+    def _build_class_tables(self):
+        """Per-class food names and portion weights, indexed by model class id"""
+        names = self.model.names
+        num_classes = max(names) + 1 if names else 0
+        
+        self._class_food_names = [''] * num_classes
+        self._portion_weights = np.tile(np.array(DEFAULT_PORTION_WEIGHTS, dtype=np.float64), (num_classes, 1))
+        self._in_food_db = np.zeros(num_classes, dtype=bool)
+        
+        for cls_id, detected_class in names.items():
+            # Map trained model class names to nutrition database keys
+            food_name = self.indian_food_mapping.get(detected_class, detected_class.lower().replace(' ', '_'))
+            self._class_food_names[cls_id] = food_name
+            food_id = self.nutrition_index.food_ids.get(food_name)
+            if food_id is not None:
+                self._portion_weights[cls_id] = self.nutrition_index.portion_weight[food_id]
+                self._in_food_db[cls_id] = True
+    
+    def enable_batching(self, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        """
+        Route inference through a micro-batching scheduler
+        
+        Concurrent detect_foods calls are then grouped into shared
+        model.predict calls instead of running one forward pass each.
+        
+        Args:
+            max_batch_size: Largest number of images per forward pass
+            max_wait_ms: Longest time a request waits for others to join its batch
+        """
+        scheduler_module = _load_sibling("inference_scheduler")
+        self.scheduler = scheduler_module.InferenceScheduler(
+            self._predict_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms
+        )
+        print(f"✅ Micro-batching enabled (batch ≤ {max_batch_size}, wait ≤ {max_wait_ms}ms)")
+    
+    def enable_speculative_fallback(self, max_workers: int = 2):
+        """
+        Start the colour fallback on a thread pool while YOLO runs
+        
+        Once YOLO returns, the fallback result is merged if fewer than 3
+        items were found and discarded otherwise, so the fallback's latency
+        is off the critical path (OpenCV and torch release the GIL). Costs
+        CPU for the images where the fallback turns out not to be needed,
+        so an image is only speculated on when a worker and a fallback
+        admission slot are free; under load the fallback runs after YOLO,
+        and only when needed.
+        
+        Args:
+            max_workers: Fallback detections running at once
+        """
+        if not self.fallback_detector:
+            print("⚠️  Speculative fallback not enabled: no fallback detector")
+            return
+        self.fallback_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fallback')
+        self._speculation_slots = threading.BoundedSemaphore(max_workers)
+        print(f"✅ Speculative fallback enabled ({max_workers} workers)")
+    
+    @classmethod
+    def run_inline(cls, enabled: bool = True):
+        """
+        Keep the calling thread's detections on that thread
+        
+        While enabled, inference skips the batching scheduler and the
+        fallback is not started speculatively on the pool. Used for
+        profiled requests, since cProfile only sees the thread it runs on.
+        Applies to every service instance, so it survives a model swap.
+        
+        Args:
+            enabled: True to run inline, False to restore normal routing
+        """
+        cls._inline.enabled = enabled
+    
+    @classmethod
+    def _running_inline(cls) -> bool:
+        return getattr(cls._inline, 'enabled', False)
+    
+    def enable_cascade(
+        self,
+        tiers: List[Tuple[int, Optional[str]]],
+        min_confidence: float = 0.5,
+        min_boxes: int = 1,
+        max_uncovered: float = 0.8
+    ):
+        """
+        Run the detector at a low input size first and escalate only uncertain images
+        
+        Args:
+            tiers: (input size, model path) per tier, cheapest first; a None
+                path uses this service's model (PyTorch tiers get their own
+                copy of it), others are loaded with the same backend rules
+                and must have the same classes
+            min_confidence: Escalate when the best box scores below this
+            min_boxes: Escalate when fewer boxes survive default filtering
+            max_uncovered: Escalate when the boxes leave more of the image uncovered
+        """
+        cascade_module = _load_sibling("inference_cascade")
+        
+        cascade_tiers = []
+        for imgsz, model_path in tiers:
+            if model_path is None:
+                model, backend, name = self.model, self.backend, f"{imgsz}"
+                if backend == 'pytorch':
+                    # An ultralytics YOLO keeps its predictor's imgsz between calls,
+                    # so tiers can't share one (or the primary model) safely
+                    model = _load_detector(self.model_path, backend, self.num_threads)
+            else:
+                backend = _resolve_backend(model_path, 'auto')
+                model = _load_detector(model_path, backend, self.num_threads)
+                name = f"{_model_version(model_path)}@{imgsz}"
+                if dict(model.names) != dict(self.model.names):
+                    raise ValueError(f"Cascade model {model_path} has different classes than the primary model")
+            if backend != 'pytorch' and not model.dynamic_shape and model.imgsz != (imgsz, imgsz):
+                raise ValueError(
+                    f"Cascade tier {name} needs a dynamic-shape export (model input is fixed at {model.imgsz})"
+                )
+            cascade_tiers.append((name, partial(self._run_detector, model, backend, imgsz=imgsz)))
+        
+        policy = cascade_module.CascadePolicy(
+            box_ops.filter_raw,
+            min_confidence=min_confidence,
+            min_boxes=min_boxes,
+            max_uncovered=max_uncovered
+        )
+        self.cascade = cascade_module.InferenceCascade(cascade_tiers, policy)
+        print(f"✅ Inference cascade enabled ({' → '.join(name for name, _ in cascade_tiers)})")
+    
+    def enable_cache(self, max_entries: int = 256, disk_dir: str = None, ttl_seconds: float = 86400):
+        """
+        Cache detection/analysis results keyed by image content
+        
+        Keys combine the SHA-256 of the uploaded bytes with the thresholds
+        and model version, so repeat uploads skip inference entirely.
+        
+        Args:
+            max_entries: Size of the in-memory LRU tier
+            disk_dir: Folder for the optional on-disk tier
+            ttl_seconds: Lifetime of on-disk entries
+        """
+        self.result_cache = _result_cache.ResultCache(
+            max_entries=max_entries,
+            disk_dir=disk_dir,
+            ttl_seconds=ttl_seconds
+        )
+        tier = f" + disk ({disk_dir})" if disk_dir else ""
+        print(f"✅ Result cache enabled ({max_entries} entries in memory{tier})")
+    
+    def close(self):
+        """
+        Stop the batching scheduler (once its queue is drained) and the fallback pool
+        
+        Called on a service that has been swapped out; callers still holding
+        it must have finished, as new detect_foods calls will then fail.
+        """
+        if self.scheduler is not None:
+            self.scheduler.shutdown()
+        if self.fallback_executor is not None:
+            self.fallback_executor.shutdown(wait=False)
+    
+    @contextmanager
+    def _timed(self, stage: str):
+        """Report how long the with-block took to the observer (if any)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.observer is not None:
+                self.observer.stage(stage, time.perf_counter() - start)
+    
+    @contextmanager
+    def _admit(self, pool: str):
+        """Hold a slot in the named admission pool (if admission control is enabled)"""
+        if self.admission is None:
+            yield
+            return
+        with self.admission.slot(pool):
+            yield
+    
+    def _event(self, name: str):
+        """Report a pipeline event (cache hit, fallback activation, ...) to the observer"""
+        if self.observer is not None:
+            self.observer.event(name)
+    
+    def warmup(
+        self,
+        image_size: Tuple[int, int] = (1280, 960),
+        runs: int = 2,
+        batch_sizes: Tuple[int, ...] = (1,)
+    ) -> Dict[str, List[float]]:
+        """
+        Push synthetic images through YOLO (and the fallback detector) so the
+        first real request doesn't pay for graph setup and allocator growth
+        
+        Caches, admission control and the observer are bypassed.
+        
+        Args:
+            image_size: (width, height) of the synthetic photos, matching uploads
+            runs: Forward passes per batch size
+            batch_sizes: Batch sizes to warm (include the scheduler's max batch size)
+            
+        Returns:
+            Per-run durations in milliseconds, keyed by stage
+        """
+        width, height = image_size
+        image = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+        timings = {}
+        
+        observer, self.observer = self.observer, None
+        admission, self.admission = self.admission, None
+        try:
+            for batch_size in batch_sizes:
+                runs_ms = []
+                for _ in range(max(1, runs)):
+                    start = time.perf_counter()
+                    self._predict_batch([image] * batch_size)
+                    runs_ms.append(round((time.perf_counter() - start) * 1000, 1))
+                timings[f'yolo_batch_{batch_size}'] = runs_ms
+            
+            if self.fallback_detector:
+                start = time.perf_counter()
+                self.fallback_detector.detect_by_color(ImageContext(image))
+                timings['fallback'] = [round((time.perf_counter() - start) * 1000, 1)]
+        finally:
+            self.observer = observer
+            self.admission = admission
+        
+        return timings
+    
+    def _cache_key(self, kind: str, ctx: ImageContext, *params) -> str:
+        """Cache key for an image, or None when the image has no content hash"""
+        if self.result_cache is None or ctx.content_hash is None:
+            return None
+        return self.result_cache.make_key(kind, ctx.content_hash, self._inference_version(), *params)
+    
+    def _inference_version(self) -> str:
+        """Model version plus the cascade setup, which also decides the boxes"""
+        if self.cascade is None:
+            return self.model_version
+        return f"{self.model_version}|{self.cascade.signature}"
+    
+    def _predict_batch(self, images: List[np.ndarray]) -> List[Dict[str, np.ndarray]]:
+        """
+        Run one forward pass over a list of BGR images
+        
+        The model runs at min_conf_threshold with NMS effectively disabled
+        (iou=1.0); per-request thresholds are applied afterwards by
+        box_ops.filter_raw, so one pass serves every conf/iou combination.
+        
+        With a cascade enabled, images only go to the higher-resolution
+        tiers when the cheaper pass is uncertain. Callers hold the
+        'inference' admission slot; this also runs on the scheduler thread.
+        
+        Returns:
+            One raw dict ('xyxy', 'conf', 'cls', 'orig_shape') per image
+        """
+        if self.cascade is not None:
+            return self.cascade.predict_batch(images)
+        return self._run_detector(self.model, self.backend, images)
+    
+    def _run_detector(
+        self,
+        model: Any,
+        backend: str,
+        images: List[np.ndarray],
+        imgsz: int = None
+    ) -> List[Dict[str, np.ndarray]]:
+        """One forward pass of a detector (at its own input size unless imgsz is given)"""
+        with self._timed('yolo_predict'):
+            if backend != 'pytorch':
+                # Exported models decode straight into raw dicts
+                return model.predict_raw(images, self.min_conf_threshold, RAW_MAX_DETECTIONS, imgsz=imgsz)
+            options = {'imgsz': imgsz} if imgsz else {}
+            results = model.predict(
+                source=images,
+                conf=self.min_conf_threshold,
+                iou=1.0,
+                max_det=RAW_MAX_DETECTIONS,
+                verbose=False,
+                **options
+            )
+        return [self._to_raw(result) for result in results]
+    
+    @staticmethod
+    def _to_raw(result: Any) -> Dict[str, np.ndarray]:
+        """Pull the box tensors out of a YOLO result once"""
+        boxes = result.boxes
+        return {
+            'xyxy': boxes.xyxy.cpu().numpy(),
+            'conf': boxes.conf.cpu().numpy(),
+            'cls': boxes.cls.cpu().numpy().astype(np.int64),
+            'orig_shape': tuple(result.orig_shape)
+        }
+    
+    def _raw_key(self, ctx: ImageContext) -> str:
+        """Raw-box cache key, or None when the image has no content hash"""
+        if ctx.content_hash is None:
+            return None
+        return self.raw_cache.make_key('raw', ctx.content_hash, self._inference_version(), self.min_conf_threshold)
+    
+    def _predict(self, ctx: ImageContext) -> Dict[str, np.ndarray]:
+        """Raw boxes for one image: reused when cached, batched with other requests when enabled"""
+        raw_key = self._raw_key(ctx)
+        if raw_key:
+            raw = self.raw_cache.get(raw_key)
+            if raw is not None:
+                self._event('raw_cache_hit')
+                return raw
+        
+        # The inference slot is taken on the caller's thread, so requests
+        # waiting in the scheduler queue count against the pool too
+        with self._admit('inference'):
+            if self.scheduler is not None and not self._running_inline():
+                raw = self.scheduler.predict(ctx.bgr)
+            else:
+                raw = self._predict_batch([ctx.bgr])[0]
+        
+        if raw_key:
+            self.raw_cache.set(raw_key, raw)
+        return raw
     
     def detect_foods(
         self, 
-        image_path: str, 
+        image: Union[str, np.ndarray, ImageContext], 
         conf_threshold: float = 0.25,
         iou_threshold: float = 0.45
     ) -> List[Dict[str, Any]]:
@@ -89,134 +540,297 @@ class FoodDetectionService:
         Detect foods in image and return structured results
         
         Args:
-            image_path: Path to input image
-            conf_threshold: Confidence threshold (0-1)
+            image: Path to input image, decoded BGR array or ImageContext
+            conf_threshold: Confidence threshold (min_conf_threshold-1);
+                lower values are raised to min_conf_threshold
             iou_threshold: NMS IoU threshold
             
         Returns:
             List of detected foods with boxes and metadata
         """
-        # Run inference
-        results = self.model.predict(
-            source=image_path,
-            conf=conf_threshold,
-            iou=iou_threshold,
-            verbose=False
-        )
+        ctx = ImageContext.ensure(image)
+        
+        cache_key = self._cache_key('detect', ctx, conf_threshold, iou_threshold)
+        if cache_key:
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                self._event('result_cache_hit')
+                return cached
         
-        detections = []
+        # Colour fallback alongside YOLO (when speculative fallback is enabled)
+        speculative = self._speculate_fallback(ctx)
+        
+        # Run inference (or reuse raw boxes from another threshold)
+        raw = self._predict(ctx)
+        detections = self._parse_raw(raw, conf_threshold, iou_threshold)
+        
+        # Apply fallback detection if enabled
+        detections = self._apply_fallback(ctx, detections, speculative)
         
-        for result in results:
-            boxes = result.boxes
-            image_shape = result.orig_shape
+        if cache_key:
+            self.result_cache.set(cache_key, detections)
+        return detections
+    
+    def detect_foods_batch(
+        self, 
+        images: List[Union[str, np.ndarray, ImageContext]], 
+        conf_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        batch_size: int = 16
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Detect foods in several images with batched forward passes
+        
+        Args:
+            images: Paths, decoded BGR arrays or ImageContexts
+            conf_threshold: Confidence threshold (0-1)
+            iou_threshold: NMS IoU threshold
+            batch_size: Largest number of images per forward pass
             
-            for box in boxes:
-                # Extract box data
-                cls_id = int(box.cls[0])
-                confidence = float(box.conf[0])
-                xyxy = box.xyxy[0].cpu().numpy()
-                
-                # Get class name from trained model
-                detected_class = self.model.names[cls_id]
-                
-                # Map to nutrition database key
-                food_name = self.indian_food_mapping.get(detected_class, detected_class.lower().replace(' ', '_'))
-                
-                # Calculate box area
-                box_width = xyxy[2] - xyxy[0]
-                box_height = xyxy[3] - xyxy[1]
-                box_area = box_width * box_height
-                
-                # Estimate portion size
-                portion_info = self._estimate_portion(
-                    food_name, 
-                    box_area, 
-                    image_shape, 
-                    confidence
-                )
-                
-                detection = {
-                    "item": food_name,
-                    "confidence": round(confidence, 3),
-                    "bounding_box": [
-                        int(xyxy[0]), 
-                        int(xyxy[1]), 
-                        int(xyxy[2]), 
-                        int(xyxy[3])
-                    ],
-                    "box_area": int(box_area),
-                    "portion_size": portion_info['size'],
-                    "estimated_weight": portion_info['weight']
+        Returns:
+            One list of detections per input image, in input order
+        """
+        ctxs = [ImageContext.ensure(image) for image in images]
+        cache_keys = [self._cache_key('detect', ctx, conf_threshold, iou_threshold) for ctx in ctxs]
+        raw_keys = [self._raw_key(ctx) for ctx in ctxs]
+        
+        # Serve repeats from the caches; only images never seen go through the model
+        all_detections = [
+            self.result_cache.get(key) if key else None
+            for key in cache_keys
+        ]
+        raws = [
+            self.raw_cache.get(raw_keys[i]) if raw_keys[i] and all_detections[i] is None else None
+            for i in range(len(ctxs))
+        ]
+        pending = [
+            i for i in range(len(ctxs))
+            if all_detections[i] is None and raws[i] is None
+        ]
+        for detections, raw in zip(all_detections, raws):
+            if detections is not None:
+                self._event('result_cache_hit')
+            elif raw is not None:
+                self._event('raw_cache_hit')
+        
+        speculative = {i: self._speculate_fallback(ctxs[i]) for i in pending}
+        
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            with self._admit('inference'):
+                chunk_raws = self._predict_batch([ctxs[i].bgr for i in chunk])
+            for i, raw in zip(chunk, chunk_raws):
+                if raw_keys[i]:
+                    self.raw_cache.set(raw_keys[i], raw)
+                raws[i] = raw
+        
+        for i, ctx in enumerate(ctxs):
+            if all_detections[i] is not None:
+                continue
+            detections = self._parse_raw(raws[i], conf_threshold, iou_threshold)
+            detections = self._apply_fallback(ctx, detections, speculative.get(i))
+            if cache_keys[i]:
+                self.result_cache.set(cache_keys[i], detections)
+            all_detections[i] = detections
+        
+        return all_detections
+    
+    def detect_stream(
+        self,
+        frames: Iterable[Union[str, np.ndarray, ImageContext]],
+        conf_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        diff_threshold: float = 8.0,
+        min_hits: int = 2,
+        max_missed: int = 2
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Detect foods in a sequence of frames (camera preview, short video)
+        
+        Frames that barely differ from the last analyzed frame are skipped
+        without inference. Detections are tracked across analyzed frames, and
+        an update is yielded only when the tracked plate contents change.
+        
+        Args:
+            frames: Paths, decoded BGR arrays or ImageContexts, in order
+            conf_threshold: Confidence threshold (0-1)
+            iou_threshold: NMS IoU threshold
+            diff_threshold: Mean absolute thumbnail difference (0-255) above
+                which a frame is analyzed
+            min_hits: Frames an item must appear in (skipped frames count) before it is reported
+            max_missed: Analyzed frames an item may be missing from before it is dropped
+            
+        Yields:
+            {'frame_index', 'frames_seen', 'frames_analyzed', 'foods_detected',
+            'detections'} with smoothed boxes and a stable track_id per item
+        """
+        stream_module = _load_sibling("stream_tracker")
+        gate = stream_module.FrameGate(diff_threshold)
+        tracker = stream_module.DetectionTracker(min_hits=min_hits, max_missed=max_missed)
+        
+        contents = None
+        analyzed = 0
+        for index, frame in enumerate(frames):
+            ctx = ImageContext.ensure(frame)
+            if gate.changed(ctx.thumbnail):
+                analyzed += 1
+                tracker.update(self.detect_foods(ctx, conf_threshold, iou_threshold))
+            else:
+                # Same scene as the last analyzed frame: its detections still hold
+                self._event('stream_frame_skipped')
+                tracker.hold()
+            detections = tracker.confirmed()
+            
+            # Plate contents: the multiset of tracked items
+            items = sorted(d['item'] for d in detections)
+            if items != contents:
+                contents = items
+                yield {
+                    'frame_index': index,
+                    'frames_seen': index + 1,
+                    'frames_analyzed': analyzed,
+                    'foods_detected': sorted(set(items)),
+                    'detections': detections
                 }
-                
-                detections.append(detection)
+    
+    def _parse_raw(
+        self, 
+        raw: Dict[str, np.ndarray], 
+        conf_threshold: float, 
+        iou_threshold: float
+    ) -> List[Dict[str, Any]]:
+        """Apply thresholds/NMS to raw boxes and convert them into detection dicts"""
+        kept = box_ops.filter_raw(raw, conf_threshold, iou_threshold)
+        xyxy, confidences, class_ids = kept['xyxy'], kept['conf'], kept['cls']
+        if len(class_ids) == 0:
+            return []
         
-        # Apply fallback detection if enabled
-        if self.fallback_detector and len(detections) < 3:
-            try:
-                fallback_items = self.fallback_detector.detect_by_color(image_path)
-                if fallback_items:
-                    # Merge with primary detections
-                    detections = self.fallback_detector.merge_detections(detections, fallback_items)
-                    print(f"🔍 Fallback detector found {len(fallback_items)} additional items")
-            except Exception as e:
-                print(f"⚠️  Fallback detection error: {e}")
+        # Areas, portion bins and weights for every box at once
+        box_areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+        size_ids, weights = self._estimate_portions(class_ids, box_areas, kept['orig_shape'], confidences)
+        
+        food_names = self._class_food_names
+        return [
+            {
+                "item": food_names[cls_id],
+                "confidence": round(confidence, 3),
+                "bounding_box": box,
+                "box_area": int(box_area),
+                "portion_size": PORTION_SIZES[size_id],
+                "estimated_weight": round(weight, 1)
+            }
+            for cls_id, confidence, box, box_area, size_id, weight in zip(
+                class_ids.tolist(),
+                confidences.tolist(),
+                xyxy.astype(np.int64).tolist(),
+                box_areas.tolist(),
+                size_ids.tolist(),
+                weights.tolist()
+            )
+        ]
+    
+    def _run_fallback(self, ctx: ImageContext) -> List[Dict]:
+        """Colour-based detections (None if the detector failed) in a fallback admission slot"""
+        # Admission rejections propagate; detector errors only skip the fallback
+        with self._admit('fallback'):
+            return self._detect_fallback(ctx)
+    
+    def _detect_fallback(self, ctx: ImageContext) -> List[Dict]:
+        try:
+            with self._timed('fallback'):
+                return self.fallback_detector.detect_by_color(ctx)
+        except Exception as e:
+            print(f"⚠️  Fallback detection error: {e}")
+            return None
+    
+    def _speculate_fallback(self, ctx: ImageContext) -> Optional[Future]:
+        """
+        Start the fallback for an image before YOLO has run
+        
+        Returns:
+            The running fallback, or None when speculation is off or would
+            have to wait for a worker or a fallback admission slot
+        """
+        if self.fallback_executor is None or self._running_inline():
+            return None
+        if not self._speculation_slots.acquire(blocking=False):
+            return None
+        pool = self.admission.pool('fallback') if self.admission is not None else None
+        if pool is not None and not pool.try_acquire():
+            self._speculation_slots.release()
+            return None
+        
+        # Both are held until the task finishes (or is cancelled before it starts)
+        submitted_at = time.perf_counter()
+        def release(_):
+            if pool is not None:
+                pool.release(time.perf_counter() - submitted_at)
+            self._speculation_slots.release()
+        
+        try:
+            speculative = self.fallback_executor.submit(self._detect_fallback, ctx)
+        except BaseException:
+            release(None)
+            raise
+        speculative.add_done_callback(release)
+        return speculative
+    
+    def _apply_fallback(self, ctx: ImageContext, detections: List[Dict], speculative: Future = None) -> List[Dict]:
+        """
+        Add colour-based detections when the trained model found fewer than 3 items
+        
+        Args:
+            ctx: The image
+            detections: YOLO detections
+            speculative: Fallback already started alongside YOLO; its result is
+                used when needed and discarded otherwise
+        """
+        if not self.fallback_detector:
+            return detections
+        
+        if len(detections) >= 3:
+            if speculative is not None:
+                speculative.cancel()
+                self._event('fallback_discarded')
+            return detections
+        
+        self._event('fallback_activation')
+        fallback_items = speculative.result() if speculative is not None else self._run_fallback(ctx)
+        if fallback_items:
+            # Merge with primary detections
+            detections = self.fallback_detector.merge_detections(detections, fallback_items)
+            print(f"🔍 Fallback detector found {len(fallback_items)} additional items")
         
         return detections
     
-    def _estimate_portion(
+    def _estimate_portions(
         self, 
-        food_name: str, 
-        box_area: float, 
+        class_ids: np.ndarray, 
+        box_areas: np.ndarray, 
         image_shape: Tuple, 
-        confidence: float
-    ) -> Dict[str, Any]:
+        confidences: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Estimate portion size from bounding box area
+        Estimate portion sizes from bounding box areas
         
         Args:
-            food_name: Detected food item
-            box_area: Bounding box area in pixels
+            class_ids: (N,) model class ids
+            box_areas: (N,) bounding box areas in pixels
             image_shape: (height, width) of image
-            confidence: Detection confidence
+            confidences: (N,) detection confidences
             
         Returns:
-            Dictionary with portion size and estimated weight
+            (indices into PORTION_SIZES, estimated weights in grams)
         """
-        # Calculate relative area (percentage of image)
-        image_area = image_shape[0] * image_shape[1]
-        relative_area = box_area / image_area
-        
-        # Determine portion size based on relative area
-        if relative_area < 0.08:
-            size = "small"
-        elif relative_area < 0.20:
-            size = "medium"
-        else:
-            size = "large"
+        # Relative area (fraction of image) picks the portion size
+        relative_areas = box_areas.astype(np.float64) / (image_shape[0] * image_shape[1])
+        size_ids = np.digitize(relative_areas, PORTION_AREA_BINS)
         
-        # Adjust for confidence
-        if confidence < 0.65:
-            uncertainty_factor = 1.2
-        elif confidence < 0.85:
-            uncertainty_factor = 1.1
-        else:
-            uncertainty_factor = 1.0
+        # Adjust for confidence (foods missing from the database keep their default weight)
+        uncertainty = UNCERTAINTY_FACTORS[np.digitize(confidences, CONFIDENCE_BINS)]
+        uncertainty = np.where(self._in_food_db[class_ids], uncertainty, 1.0)
         
-        # Get nutrition data for this food
-        if food_name in self.food_db:
-            food_data = self.food_db[food_name]
-            weight = food_data['portionSizes'][size]['weight'] * uncertainty_factor
-        else:
-            # Default weight if food not in database
-            weight = {'small': 80, 'medium': 120, 'large': 180}[size]
-        
-        return {
-            'size': size,
-            'weight': round(weight, 1),
-            'relative_area': round(relative_area, 3),
-            'uncertainty_factor': uncertainty_factor
-        }
+        return size_ids, self._portion_weights[class_ids, size_ids] * uncertainty
     
     def calculate_nutrition(
         self, 
@@ -235,50 +849,33 @@ class FoodDetectionService:
         Returns:
             Comprehensive nutrition analysis
         """
-        total_carbs = 0.0
-        total_protein = 0.0
-        total_fat = 0.0
-        total_fiber = 0.0
-        total_calories = 0.0
-        weighted_gl = 0.0
-        
-        food_details = []
         detected_items = [d['item'] for d in detections]
         
+        known = []
         for detection in detections:
-            food_name = detection['item']
-            portion_size = detection['portion_size']
-            
-            if food_name not in self.food_db:
-                print(f"⚠️ Warning: {food_name} not in nutrition database")
+            if detection['item'] not in self.nutrition_index.food_ids:
+                print(f"⚠️ Warning: {detection['item']} not in nutrition database")
                 continue
-            
-            food_data = self.food_db[food_name]
-            portion_data = food_data['portionSizes'][portion_size]
-            
-            # Get base nutrition
-            carbs = portion_data['carbs']
-            gl = portion_data['gl']
-            
-            # Apply time-of-day multiplier
-            time_multiplier = food_data['timeImpact'].get(time_of_day, 1.0)
-            adjusted_gl = gl * time_multiplier
-            
-            # Accumulate totals
-            total_carbs += carbs
-            weighted_gl += adjusted_gl
-            total_protein += food_data['protein'] * (portion_data['weight'] / food_data['servingSize'].split('(')[1].split('g')[0].strip())
-            total_fat += food_data['fat'] * (portion_data['weight'] / float(food_data['servingSize'].split('(')[1].split('g')[0].strip()))
-            total_fiber += food_data['fiber'] * (portion_data['weight'] / float(food_data['servingSize'].split('(')[1].split('g')[0].strip()))
-            total_calories += food_data['calories'] * (portion_data['weight'] / float(food_data['servingSize'].split('(')[1].split('g')[0].strip()))
-            
-            food_details.append({
-                'name': food_name,
-                'portion': portion_size,
+            known.append(detection)
+        
+        # Gather per-portion values from the compiled index and sum them
+        food_ids = self.nutrition_index.lookup([d['item'] for d in known])
+        size_ids = np.array([SIZE_IDS[d['portion_size']] for d in known], dtype=np.int64)
+        meal = self.nutrition_index.meal(food_ids, size_ids, time_of_day)
+        weighted_gl = float(meal['total_gl'])
+        
+        food_details = [
+            {
+                'name': detection['item'],
+                'portion': detection['portion_size'],
                 'carbs': round(carbs, 1),
-                'gl': round(adjusted_gl, 1),
-                'weight': portion_data['weight']
-            })
+                'gl': round(gl, 1),
+                'weight': weight
+            }
+            for detection, carbs, gl, weight in zip(
+                known, meal['carbs'].tolist(), meal['gl'].tolist(), meal['weight'].tolist()
+            )
+        ]
         
         # Apply meal combination effects
         gl_modifier = self._calculate_combination_effect(detected_items)
@@ -289,11 +886,11 @@ class FoodDetectionService:
             adjusted_gl = self._apply_user_adjustments(adjusted_gl, user_profile)
         
         return {
-            'total_carbs': round(total_carbs, 1),
-            'total_protein': round(total_protein, 1),
-            'total_fat': round(total_fat, 1),
-            'total_fiber': round(total_fiber, 1),
-            'total_calories': round(total_calories, 0),
+            'total_carbs': round(float(meal['total_carbs']), 1),
+            'total_protein': round(float(meal['total_protein']), 1),
+            'total_fat': round(float(meal['total_fat']), 1),
+            'total_fiber': round(float(meal['total_fiber']), 1),
+            'total_calories': round(float(meal['total_calories']), 0),
             'glycemic_load': round(adjusted_gl, 1),
             'time_of_day': time_of_day,
             'food_details': food_details,
@@ -304,12 +901,10 @@ class FoodDetectionService:
         """Calculate GL reduction from food combinations"""
         modifier = 1.0
         
-        for rule in self.combination_rules['thaliEffect']['rules']:
-            combo = rule['combination']
-            # Check if all items in combination are present
-            if all(item in detected_items for item in combo):
-                modifier *= rule['giReduction']
-                print(f"✅ Combination detected: {' + '.join(combo)} → {rule['reason']}")
+        # Only rules involving the detected foods are checked
+        for rule in self.combination_index.match(detected_items):
+            modifier *= rule['giReduction']
+            print(f"✅ Combination detected: {' + '.join(rule['combination'])} → {rule['reason']}")
         
         return modifier
     
@@ -393,44 +988,131 @@ class FoodDetectionService:
         image_path: str,
         time_of_day: str = "afternoon",
         user_profile: Dict = None,
-        save_annotated: bool = True
+        save_annotated: bool = True,
+        image: Union[np.ndarray, ImageContext] = None
     ) -> Dict[str, Any]:
         """
         Complete pipeline: detect → calculate nutrition → generate advice
         
         Args:
-            image_path: Path to food image
+            image_path: Path to food image (names the annotated output when
+                an in-memory image is given)
             time_of_day: When the meal is being consumed
             user_profile: User's health profile
             save_annotated: Whether to save image with bounding boxes
+            image: Already decoded BGR array or ImageContext; skips reading image_path
             
         Returns:
             Complete analysis with detections, nutrition, and advice
         """
         print(f"\n🔍 Processing: {image_path}")
+        # Decode once; every stage below shares this context
+        ctx = ImageContext.ensure(image if image is not None else image_path)
+        
+        # Only the image-independent analysis is cached; the annotated image
+        # is named after (and written for) every upload, including repeats
+        cache_key = self._cache_key('analysis', ctx, time_of_day, user_profile or {})
+        analysis = self.result_cache.get(cache_key) if cache_key else None
+        if analysis is not None:
+            self._event('result_cache_hit')
+            print("⚡ Served from result cache")
+        else:
+            # Step 1: Detect foods
+            detections = self.detect_foods(ctx)
+            print(f"✅ Detected {len(detections)} food items")
+            
+            analysis = self._analyze_nutrition(detections, time_of_day, user_profile)
+            if cache_key:
+                self.result_cache.set(cache_key, analysis)
         
-        # Step 1: Detect foods
-        detections = self.detect_foods(image_path)
-        print(f"✅ Detected {len(detections)} food items")
+        return self._finish_analysis(ctx, image_path, analysis, save_annotated)
+    
+    def process_images(
+        self, 
+        image_paths: List[str],
+        time_of_day: str = "afternoon",
+        user_profile: Dict = None,
+        save_annotated: bool = True,
+        images: List[Union[np.ndarray, ImageContext]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run the complete pipeline on several images with one batched detection pass
         
+        Args:
+            image_paths: Paths of the food images (name annotated outputs)
+            time_of_day: When the meals are being consumed
+            user_profile: User's health profile
+            save_annotated: Whether to save images with bounding boxes
+            images: Already decoded images matching image_paths (optional)
+            
+        Returns:
+            One process_image-style result per image, in input order
+        """
+        if images is None:
+            images = [None] * len(image_paths)
+        ctxs = [
+            ImageContext.ensure(image if image is not None else path)
+            for path, image in zip(image_paths, images)
+        ]
+        
+        all_detections = self.detect_foods_batch(ctxs)
+        print(f"✅ Detected foods in {len(ctxs)} images")
+        
+        return [
+            self._finish_analysis(
+                ctx, path, self._analyze_nutrition(detections, time_of_day, user_profile), save_annotated
+            )
+            for ctx, path, detections in zip(ctxs, image_paths, all_detections)
+        ]
+    
+    def _analyze_nutrition(
+        self,
+        detections: List[Dict],
+        time_of_day: str,
+        user_profile: Dict
+    ) -> Dict[str, Any]:
+        """Nutrition and advice for already detected foods (depends only on the detections)"""
         if len(detections) == 0:
             return {
                 'success': False,
                 'message': 'No food items detected. Please try again with a clearer image.',
-                'detections': []
+                'detections': [],
+                'model_version': self.model_version
             }
         
         # Step 2: Calculate nutrition
-        nutrition = self.calculate_nutrition(detections, time_of_day, user_profile)
+        with self._timed('nutrition'):
+            nutrition = self.calculate_nutrition(detections, time_of_day, user_profile)
         print(f"📊 Total carbs: {nutrition['total_carbs']}g, GL: {nutrition['glycemic_load']}")
         
         # Step 3: Generate advice
-        advice = self.get_advice(nutrition)
+        with self._timed('advice'):
+            advice = self.get_advice(nutrition)
         print(f"{advice['icon']} Risk: {advice['risk_level']}")
         
+        return {
+            'success': True,
+            'foods_detected': [d['item'] for d in detections],
+            'detections': detections,
+            'nutrition': nutrition,
+            'advice': advice,
+            'model_version': self.model_version
+        }
+    
+    def _finish_analysis(
+        self,
+        ctx: ImageContext,
+        image_path: str,
+        analysis: Dict[str, Any],
+        save_annotated: bool
+    ) -> Dict[str, Any]:
+        """Add the per-upload parts to an analysis: timestamp and annotated image"""
+        if not analysis['success']:
+            return analysis
+        
         # Step 4: Save annotated image
         if save_annotated:
-            annotated_path = self._save_annotated_image(image_path, detections)
+            annotated_path = self.save_annotated_image(ctx, analysis['detections'], image_path)
         else:
             annotated_path = None
         
@@ -438,20 +1120,22 @@ class FoodDetectionService:
         return {
             'success': True,
             'timestamp': datetime.now().isoformat(),
-            'foods_detected': [d['item'] for d in detections],
-            'detections': detections,
-            'nutrition': nutrition,
-            'advice': advice,
-            'annotated_image': annotated_path
+            'foods_detected': analysis['foods_detected'],
+            'detections': analysis['detections'],
+            'nutrition': analysis['nutrition'],
+            'advice': analysis['advice'],
+            'annotated_image': annotated_path,
+            'model_version': analysis['model_version']
         }
     
-    def _save_annotated_image(
+    def save_annotated_image(
         self, 
-        image_path: str, 
-        detections: List[Dict]
+        ctx: ImageContext, 
+        detections: List[Dict],
+        image_path: str
     ) -> str:
         """Draw bounding boxes and save annotated image"""
-        img = cv2.imread(image_path)
+        img = ctx.bgr.copy()
         
         for det in detections:
             x1, y1, x2, y2 = det['bounding_box']
@@ -471,11 +1155,21 @@ class FoodDetectionService:
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
         
         # Save
-        output_path = image_path.replace('.jpg', '_annotated.jpg')
-        cv2.imwrite(output_path, img)
-        print(f"💾 Annotated image saved: {output_path}")
+        root, ext = os.path.splitext(image_path)
+        output_path = f"{root}_annotated{ext or '.jpg'}"
+        if self.background_writer is not None:
+            self.background_writer.submit(self._write_image, output_path, img)
+            print(f"💾 Annotated image queued: {output_path}")
+        else:
+            self._write_image(output_path, img)
+            print(f"💾 Annotated image saved: {output_path}")
         
         return output_path
+    
+    def _write_image(self, output_path: str, img: np.ndarray):
+        """Encode and write an annotated image (timed as annotation_write)"""
+        with self._timed('annotation_write'):
+            cv2.imwrite(output_path, img)
 
 
 # Example usage
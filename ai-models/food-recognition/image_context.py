@@ -0,0 +1,122 @@
+"""
+Request-scoped Image Context
+Decodes a food photo once and shares derived views (HSV, thumbnail)
+between detection, fallback detection and annotation
+"""
+
+import hashlib
+import cv2
+import numpy as np
+from typing import Tuple, Union
+
+
+def decode_image(image_bytes: bytes) -> np.ndarray:
+    """
+    Decode uploaded image bytes into a BGR array without touching disk
+
+    Args:
+        image_bytes: Raw encoded image (JPEG, PNG, ...)
+
+    Returns:
+        Decoded BGR image
+    """
+    img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image data")
+    return img
+
+
+class ImageContext:
+    """Decoded image plus lazily computed views for a single request"""
+
+    def __init__(
+        self,
+        bgr: np.ndarray,
+        source_path: str = None,
+        thumbnail_size: int = 320,
+        content_hash: str = None
+    ):
+        """
+        Wrap an already decoded image
+
+        Args:
+            bgr: Decoded BGR image
+            source_path: Where the image came from / is stored (optional)
+            thumbnail_size: Longest side of the downscaled thumbnail
+            content_hash: SHA-256 of the encoded bytes, when known (enables result caching)
+        """
+        self.bgr = bgr
+        self.source_path = source_path
+        self.thumbnail_size = thumbnail_size
+        self.content_hash = content_hash
+
+        self._hsv = None
+        self._thumbnail = None
+        self._hsv_thumbnail = None
+
+    @classmethod
+    def from_bytes(cls, image_bytes: bytes, source_path: str = None, **kwargs) -> 'ImageContext':
+        """Decode encoded image bytes into a context"""
+        return cls(
+            decode_image(image_bytes),
+            source_path=source_path,
+            content_hash=hashlib.sha256(image_bytes).hexdigest(),
+            **kwargs
+        )
+
+    @classmethod
+    def from_path(cls, image_path: str, **kwargs) -> 'ImageContext':
+        """Read and decode an image file into a context"""
+        with open(image_path, 'rb') as f:
+            return cls.from_bytes(f.read(), source_path=str(image_path), **kwargs)
+
+    @classmethod
+    def ensure(cls, image: Union[str, np.ndarray, 'ImageContext']) -> 'ImageContext':
+        """Return image as a context, decoding paths and wrapping arrays as needed"""
+        if isinstance(image, cls):
+            return image
+        if isinstance(image, np.ndarray):
+            return cls(image)
+        return cls.from_path(image)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(height, width) of the full-resolution image"""
+        return self.bgr.shape[:2]
+
+    @property
+    def hsv(self) -> np.ndarray:
+        """Full-resolution HSV conversion"""
+        if self._hsv is None:
+            self._hsv = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV)
+        return self._hsv
+
+    @property
+    def thumbnail(self) -> np.ndarray:
+        """BGR image downscaled so its longest side is at most thumbnail_size"""
+        if self._thumbnail is None:
+            height, width = self.shape
+            scale = self.thumbnail_size / max(height, width)
+            if scale < 1.0:
+                size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                self._thumbnail = cv2.resize(self.bgr, size, interpolation=cv2.INTER_AREA)
+            else:
+                self._thumbnail = self.bgr
+        return self._thumbnail
+
+    @property
+    def hsv_thumbnail(self) -> np.ndarray:
+        """HSV conversion of the thumbnail"""
+        if self._hsv_thumbnail is None:
+            if self.thumbnail is self.bgr:
+                self._hsv_thumbnail = self.hsv
+            else:
+                self._hsv_thumbnail = cv2.cvtColor(self.thumbnail, cv2.COLOR_BGR2HSV)
+        return self._hsv_thumbnail
+
+    @property
+    def thumbnail_scale(self) -> Tuple[float, float]:
+        """(x, y) factors that map thumbnail coordinates back to full resolution"""
+        height, width = self.shape
+        thumb_h, thumb_w = self.thumbnail.shape[:2]
+        return width / thumb_w, height / thumb_h
@@ -0,0 +1,193 @@
+"""
+Resolution-Adaptive Inference Cascade
+Runs the detector at a low input size first and re-runs only the images
+whose low-resolution result is uncertain at a higher size (or with a
+larger model)
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Cells per side of the grid box coverage is measured on
+COVERAGE_GRID = 32
+
+
+def parse_tiers(spec: str) -> List[Tuple[int, Optional[str]]]:
+    """
+    Parse a tier list such as "320,640" or "320,640,models/x/best_m.pt@640"
+
+    Returns:
+        (input size, model path or None for the primary model) per tier, cheapest first
+    """
+    tiers = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        model_path, _, imgsz = entry.rpartition('@')
+        tiers.append((int(imgsz), model_path or None))
+    return tiers
+
+
+def box_coverage(xyxy: np.ndarray, orig_shape: Tuple[int, int], grid: int = COVERAGE_GRID) -> float:
+    """Fraction of the image covered by the union of the boxes (on a grid x grid raster)"""
+    if len(xyxy) == 0:
+        return 0.0
+    height, width = orig_shape[:2]
+    cells = np.clip(xyxy / np.array([width, height, width, height], dtype=np.float64) * grid, 0, grid)
+    x1, y1 = np.floor(cells[:, :2]).astype(np.int64).T
+    x2, y2 = np.ceil(cells[:, 2:]).astype(np.int64).T
+    covered = np.zeros((grid, grid), dtype=bool)
+    for bx1, by1, bx2, by2 in zip(x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist()):
+        covered[by1:by2, bx1:bx2] = True
+    return float(covered.mean())
+
+
+class CascadePolicy:
+    """
+    Decides whether a tier's raw boxes are certain enough to serve
+
+    A result is escalated when its best box scores below min_confidence,
+    it has fewer than min_boxes boxes, or the boxes leave more than
+    max_uncovered of the image uncovered. Boxes are counted after the
+    API's default filtering (box_conf / box_iou).
+    """
+
+    def __init__(
+        self,
+        filter_raw: Callable[[Dict[str, np.ndarray], float, float], Dict[str, np.ndarray]],
+        min_confidence: float = 0.5,
+        min_boxes: int = 1,
+        max_uncovered: float = 0.8,
+        box_conf: float = 0.25,
+        box_iou: float = 0.45
+    ):
+        """
+        Args:
+            filter_raw: The service's box filter, (raw, conf, iou) -> kept raw dict
+        """
+        self.filter_raw = filter_raw
+        self.min_confidence = min_confidence
+        self.min_boxes = min_boxes
+        self.max_uncovered = max_uncovered
+        self.box_conf = box_conf
+        self.box_iou = box_iou
+
+    def escalation_reasons(self, raw: Dict[str, np.ndarray]) -> List[str]:
+        """Why a result should go to the next tier (empty when it can be served)"""
+        kept = self.filter_raw(raw, self.box_conf, self.box_iou)
+        reasons = []
+        if len(kept['conf']) < self.min_boxes:
+            reasons.append('few_boxes')
+        best_confidence = float(raw['conf'].max()) if len(raw['conf']) else 0.0
+        if best_confidence < self.min_confidence:
+            reasons.append('low_confidence')
+        if 1.0 - box_coverage(kept['xyxy'], kept['orig_shape']) > self.max_uncovered:
+            reasons.append('uncovered_area')
+        return reasons
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'min_confidence': self.min_confidence,
+            'min_boxes': self.min_boxes,
+            'max_uncovered': self.max_uncovered,
+            'box_conf': self.box_conf,
+            'box_iou': self.box_iou
+        }
+
+
+class InferenceCascade:
+    """
+    Tiers of detector calls, cheapest first
+
+    Every image goes through the first tier; images whose result the policy
+    finds uncertain are re-run, together, on the next tier. The last tier's
+    result is always served.
+    """
+
+    def __init__(
+        self,
+        tiers: List[Tuple[str, Callable[[List[np.ndarray]], List[Dict[str, np.ndarray]]]]],
+        policy: CascadePolicy
+    ):
+        """
+        Args:
+            tiers: (name, predict_batch) pairs; predict_batch returns one raw
+                dict ('xyxy', 'conf', 'cls', 'orig_shape') per image
+            policy: Escalation policy
+        """
+        if not tiers:
+            raise ValueError("A cascade needs at least one tier")
+        self.tiers = tiers
+        self.policy = policy
+
+        self._stats_lock = threading.Lock()
+        self._tier_stats = [
+            {'images': 0, 'served': 0, 'escalated': 0, 'reasons': {}, 'seconds': 0.0}
+            for _ in tiers
+        ]
+
+    @property
+    def signature(self) -> str:
+        """Identifies the tiers and policy (results differ between cascades)"""
+        policy = self.policy
+        return '>'.join(name for name, _ in self.tiers) + (
+            f"|conf<{policy.min_confidence},boxes<{policy.min_boxes},uncovered>{policy.max_uncovered}"
+        )
+
+    def predict_batch(self, images: List[np.ndarray]) -> List[Dict[str, np.ndarray]]:
+        """Raw boxes per image, each from the first tier that was certain enough"""
+        raws: List[Optional[Dict[str, np.ndarray]]] = [None] * len(images)
+        pending = list(range(len(images)))
+
+        for tier_id, (_, predict_batch) in enumerate(self.tiers):
+            if not pending:
+                break
+            start = time.perf_counter()
+            results = predict_batch([images[i] for i in pending])
+            elapsed = time.perf_counter() - start
+
+            last_tier = tier_id == len(self.tiers) - 1
+            escalate, reason_counts = [], {}
+            for i, raw in zip(pending, results):
+                reasons = [] if last_tier else self.policy.escalation_reasons(raw)
+                if reasons:
+                    escalate.append(i)
+                    for reason in reasons:
+                        reason_counts[reason] = reason_counts.get(reason, 0) + 1
+                else:
+                    raws[i] = raw
+
+            with self._stats_lock:
+                stats = self._tier_stats[tier_id]
+                stats['images'] += len(pending)
+                stats['served'] += len(pending) - len(escalate)
+                stats['escalated'] += len(escalate)
+                stats['seconds'] += elapsed
+                for reason, count in reason_counts.items():
+                    stats['reasons'][reason] = stats['reasons'].get(reason, 0) + count
+            pending = escalate
+
+        return raws
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-tier traffic, hit rates (share of a tier's images it served) and latency"""
+        with self._stats_lock:
+            total = self._tier_stats[0]['images']
+            tiers = []
+            for (name, _), stats in zip(self.tiers, self._tier_stats):
+                images = stats['images']
+                tiers.append({
+                    'tier': name,
+                    'images': images,
+                    'served': stats['served'],
+                    'escalated': stats['escalated'],
+                    'hit_rate': round(stats['served'] / images, 3) if images else 0.0,
+                    'share_of_traffic': round(stats['served'] / total, 3) if total else 0.0,
+                    'escalation_reasons': dict(stats['reasons']),
+                    'avg_ms_per_image': round(stats['seconds'] / images * 1000, 2) if images else 0.0
+                })
+        return {'images': total, 'policy': self.policy.to_dict(), 'tiers': tiers}
@@ -0,0 +1,155 @@
+"""
+Dynamic Micro-Batching Scheduler
+Groups concurrent detection requests into batched model calls
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class _PendingRequest:
+    """One queued image waiting for a batched forward pass"""
+
+    __slots__ = ('image', 'params', 'future', 'enqueued_at')
+
+    def __init__(self, image: Any, params: Tuple):
+        self.image = image
+        self.params = params
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceScheduler:
+    """
+    Queue images from request threads and run them through the model in batches
+
+    A single worker thread takes the first waiting request, then keeps
+    collecting requests until either max_batch_size is reached or max_wait_ms
+    has passed since that first request was queued. Requests are grouped by
+    their inference parameters (e.g. conf/iou thresholds) because one model
+    call can only use one set of parameters.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[..., List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0
+    ):
+        """
+        Start the scheduler worker
+
+        Args:
+            predict_batch: Called as predict_batch(images, *params) and must
+                return one result per image, in order
+            max_batch_size: Largest number of images per model call
+            max_wait_ms: Longest time the first request of a batch waits
+                for others to join
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: Dict[int, int] = {}
+        self._requests = 0
+        self._batches = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+        self._running = True
+        # Held while checking _running and queueing, so nothing lands behind the stop sentinel
+        self._submit_lock = threading.Lock()
+
+        self._worker = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+        self._worker.start()
+
+    def submit(self, image: Any, *params) -> Future:
+        """Queue an image and return a Future resolving to its own result"""
+        request = _PendingRequest(image, params)
+        with self._submit_lock:
+            if not self._running:
+                raise RuntimeError("Inference scheduler has been shut down")
+            self._queue.put(request)
+        return request.future
+
+    def predict(self, image: Any, *params, timeout: float = None) -> Any:
+        """Queue an image and block until its result is ready"""
+        return self.submit(image, *params).result(timeout=timeout)
+
+    def shutdown(self):
+        """Stop accepting work; the worker exits once the queue is drained"""
+        with self._submit_lock:
+            if not self._running:
+                return
+            self._running = False
+            self._queue.put(None)
+
+    def _collect_batch(self, first: _PendingRequest) -> Tuple[List[_PendingRequest], bool]:
+        """Gather requests until the batch is full or the wait window closes"""
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, False
+            batch.append(request)
+        return batch, True
+
+    def _run(self):
+        """Worker loop"""
+        keep_going = True
+        while keep_going:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, keep_going = self._collect_batch(first)
+
+            # One model call per distinct parameter set
+            groups: Dict[Tuple, List[_PendingRequest]] = {}
+            for request in batch:
+                groups.setdefault(request.params, []).append(request)
+
+            for params, requests in groups.items():
+                self._record(requests)
+                try:
+                    results = self.predict_batch([r.image for r in requests], *params)
+                    for request, result in zip(requests, results):
+                        request.future.set_result(result)
+                except Exception as e:
+                    for request in requests:
+                        request.future.set_exception(e)
+
+    def _record(self, requests: List[_PendingRequest]):
+        """Update batch-size and queue-wait statistics"""
+        now = time.perf_counter()
+        waits = [now - r.enqueued_at for r in requests]
+        with self._stats_lock:
+            size = len(requests)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._batches += 1
+            self._requests += size
+            self._total_wait += sum(waits)
+            self._max_wait_seen = max(self._max_wait_seen, max(waits))
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch-size and queue-wait statistics since startup"""
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': round(self.max_wait * 1000, 2),
+                'queue_depth': self._queue.qsize(),
+                'requests': self._requests,
+                'batches': self._batches,
+                'avg_batch_size': round(self._requests / self._batches, 2) if self._batches else 0.0,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+                'avg_queue_wait_ms': round(self._total_wait / self._requests * 1000, 2) if self._requests else 0.0,
+                'max_queue_wait_ms': round(self._max_wait_seen * 1000, 2)
+            }
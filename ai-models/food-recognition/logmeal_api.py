@@ -6,7 +6,7 @@ Best for Indian food recognition
 
 import requests
 import base64
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 
 class LogMealDetector:
@@ -25,19 +25,22 @@ class LogMealDetector:
             "Authorization": f"Bearer {api_token}"
         }
     
-    def detect_food(self, image_path: str) -> List[Dict[str, Any]]:
+    def detect_food(self, image_path: str, image_bytes: Optional[bytes] = None) -> List[Dict[str, Any]]:
         """
         Detect food items in image using LogMeal API
         
         Args:
             image_path: Path to food image
+            image_bytes: Image contents already in memory (skips reading image_path)
             
         Returns:
             List of detected food items with confidence and nutrition
         """
         # Read and encode image
-        with open(image_path, 'rb') as f:
-            image_data = base64.b64encode(f.read()).decode('utf-8')
+        if image_bytes is None:
+            with open(image_path, 'rb') as f:
+                image_bytes = f.read()
+        image_data = base64.b64encode(image_bytes).decode('utf-8')
         
         # Call LogMeal recognition API
         endpoint = f"{self.base_url}/image/recognition/complete"
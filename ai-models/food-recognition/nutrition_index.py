@@ -0,0 +1,117 @@
+"""
+Compiled Nutrition Index
+The nutrition database flattened into NumPy arrays indexed by food id, so
+meal totals are a gather-and-sum instead of per-detection dict lookups and
+serving-size string parsing
+"""
+
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+PORTION_SIZES = ('small', 'medium', 'large')
+SIZE_IDS = {size: i for i, size in enumerate(PORTION_SIZES)}
+
+# Per-serving values scaled by portion weight / serving grams
+MACROS = ('protein', 'fat', 'fiber', 'calories')
+
+# Grams in a serving description such as "1 bowl (150g cooked)"
+_SERVING_GRAMS = re.compile(r'\(\s*(\d+(?:\.\d+)?)\s*g', re.IGNORECASE)
+
+
+def parse_serving_grams(serving_size: str) -> float:
+    """Grams in a servingSize string, or None when it doesn't state them"""
+    match = _SERVING_GRAMS.search(serving_size or '')
+    return float(match.group(1)) if match else None
+
+
+class NutritionIndex:
+    """
+    Read-only arrays compiled from the nutritionDatabase section
+
+    Row i of every array describes food_names[i]; portion arrays have one
+    column per PORTION_SIZES entry and time multipliers one column per
+    time of day (1.0 where a food has no entry).
+    """
+
+    def __init__(self, food_db: Dict[str, Dict]):
+        """
+        Compile the database
+
+        Args:
+            food_db: nutritionDatabase mapping of food key → food data
+        """
+        self.food_names: List[str] = list(food_db)
+        self.food_ids: Dict[str, int] = {name: i for i, name in enumerate(self.food_names)}
+        num_foods = len(self.food_names)
+
+        self.times_of_day: Dict[str, int] = {}
+        for food_data in food_db.values():
+            for time_of_day in food_data.get('timeImpact', {}):
+                self.times_of_day.setdefault(time_of_day, len(self.times_of_day))
+
+        self.serving_grams = np.zeros(num_foods)
+        self.macros = np.zeros((num_foods, len(MACROS)))
+        self.portion_weight = np.zeros((num_foods, len(PORTION_SIZES)))
+        self.portion_carbs = np.zeros((num_foods, len(PORTION_SIZES)))
+        self.portion_gl = np.zeros((num_foods, len(PORTION_SIZES)))
+        self.time_multipliers = np.ones((num_foods, len(self.times_of_day)))
+
+        for i, (name, food_data) in enumerate(food_db.items()):
+            for size, column in SIZE_IDS.items():
+                portion = food_data['portionSizes'][size]
+                self.portion_weight[i, column] = portion['weight']
+                self.portion_carbs[i, column] = portion['carbs']
+                self.portion_gl[i, column] = portion['gl']
+
+            grams = parse_serving_grams(food_data.get('servingSize'))
+            if grams is None:
+                grams = self.portion_weight[i, SIZE_IDS['medium']]
+                print(f"⚠️ {name}: no grams in servingSize, using the medium portion ({grams}g)")
+            self.serving_grams[i] = grams
+
+            self.macros[i] = [food_data[macro] for macro in MACROS]
+            for time_of_day, multiplier in food_data.get('timeImpact', {}).items():
+                self.time_multipliers[i, self.times_of_day[time_of_day]] = multiplier
+
+    def __len__(self) -> int:
+        return len(self.food_names)
+
+    def lookup(self, food_names: Sequence[str]) -> np.ndarray:
+        """Food ids for names (-1 where a name is not in the database)"""
+        return np.array([self.food_ids.get(name, -1) for name in food_names], dtype=np.int64)
+
+    def meal(self, food_ids: np.ndarray, size_ids: np.ndarray, time_of_day: str) -> Dict[str, np.ndarray]:
+        """
+        Per-item and total nutrition for a meal
+
+        Args:
+            food_ids: (N,) ids of known foods
+            size_ids: (N,) indices into PORTION_SIZES
+            time_of_day: Key of timeImpact (unknown times use 1.0)
+
+        Returns:
+            Per-item 'weight', 'carbs' and time-adjusted 'gl' arrays, plus
+            meal totals under 'total_<name>' for carbs, gl and each macro
+        """
+        weight = self.portion_weight[food_ids, size_ids]
+        carbs = self.portion_carbs[food_ids, size_ids]
+        gl = self.portion_gl[food_ids, size_ids]
+
+        column = self.times_of_day.get(time_of_day)
+        if column is not None:
+            gl = gl * self.time_multipliers[food_ids, column]
+
+        # Per-serving values scaled to the detected portion
+        macros = self.macros[food_ids] * (weight / self.serving_grams[food_ids])[:, None]
+
+        totals = {f'total_{macro}': macros[:, j].sum() for j, macro in enumerate(MACROS)}
+        return {
+            'weight': weight,
+            'carbs': carbs,
+            'gl': gl,
+            'total_carbs': carbs.sum(),
+            'total_gl': gl.sum(),
+            **totals
+        }
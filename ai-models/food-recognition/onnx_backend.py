@@ -0,0 +1,238 @@
+"""
+ONNX Runtime / OpenVINO Detector Backend
+Runs an exported YOLOv8 detector on CPU without PyTorch; letterboxing, box
+decoding and rescaling are done in NumPy
+"""
+
+import ast
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+# Padding colour ultralytics uses when letterboxing
+LETTERBOX_COLOR = (114, 114, 114)
+
+RUNTIMES = ('onnx', 'openvino')
+
+
+def letterbox(image: np.ndarray, new_shape: Tuple[int, int]) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize keeping the aspect ratio, then pad to new_shape (ultralytics LetterBox, auto=False)
+
+    Args:
+        image: BGR image (H, W, 3)
+        new_shape: (height, width) of the network input
+
+    Returns:
+        (padded image, scale gain, (pad_left, pad_top))
+    """
+    height, width = image.shape[:2]
+    gain = min(new_shape[0] / height, new_shape[1] / width)
+    new_unpad = (int(round(width * gain)), int(round(height * gain)))
+    dw = (new_shape[1] - new_unpad[0]) / 2
+    dh = (new_shape[0] - new_unpad[1]) / 2
+
+    if (width, height) != new_unpad:
+        image = cv2.resize(image, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return image, gain, (left, top)
+
+
+def preprocess(image: np.ndarray, imgsz: Tuple[int, int]) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Letterbox a BGR image into the network's (3, H, W) float32 RGB input in [0, 1]
+
+    Returns:
+        (input tensor, scale gain, (pad_left, pad_top))
+    """
+    padded, gain, pad = letterbox(image, imgsz)
+    tensor = padded[:, :, ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(tensor, dtype=np.float32) / 255.0, gain, pad
+
+
+def decode_output(
+    output: np.ndarray,
+    conf_threshold: float,
+    max_det: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode one image's YOLOv8 head output into pre-NMS boxes
+
+    Matches ultralytics' post-processing at iou=1.0: best class per anchor,
+    boxes above conf_threshold, highest max_det scores first.
+
+    Args:
+        output: (4 + num_classes, num_anchors) array of cx, cy, w, h and class scores
+        conf_threshold: Boxes must score above this
+        max_det: Maximum number of boxes to keep
+
+    Returns:
+        (xyxy in network-input pixels, conf, cls)
+    """
+    boxes = output[:4].T
+    scores = output[4:]
+    cls = scores.argmax(axis=0)
+    conf = scores.max(axis=0)
+
+    mask = conf > conf_threshold
+    boxes, conf, cls = boxes[mask], conf[mask], cls[mask]
+    order = np.argsort(-conf, kind='stable')[:max_det]
+    boxes, conf, cls = boxes[order], conf[order], cls[order]
+
+    half_wh = boxes[:, 2:4] / 2
+    xyxy = np.concatenate([boxes[:, :2] - half_wh, boxes[:, :2] + half_wh], axis=1)
+    return xyxy.astype(np.float32), conf.astype(np.float32), cls.astype(np.int64)
+
+
+def scale_boxes(
+    xyxy: np.ndarray,
+    gain: float,
+    pad: Tuple[int, int],
+    orig_shape: Tuple[int, int]
+) -> np.ndarray:
+    """Map boxes from the letterboxed input back onto the original image (clipped to it)"""
+    xyxy = (xyxy - np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)) / gain
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, orig_shape[1])
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, orig_shape[0])
+    return xyxy
+
+
+def _parse_names(names: Any) -> Dict[int, str]:
+    """Class names from export metadata (a dict, a list, or their string repr)"""
+    if isinstance(names, str):
+        names = ast.literal_eval(names)
+    if isinstance(names, (list, tuple)):
+        names = dict(enumerate(names))
+    return {int(k): str(v) for k, v in names.items()}
+
+
+def parse_imgsz(imgsz: Any) -> Tuple[int, int]:
+    if isinstance(imgsz, str):
+        imgsz = ast.literal_eval(imgsz)
+    if isinstance(imgsz, int):
+        return imgsz, imgsz
+    return int(imgsz[0]), int(imgsz[1])
+
+
+class OnnxDetector:
+    """
+    Exported YOLOv8 detector on ONNX Runtime or OpenVINO (CPU)
+
+    Exposes ``names`` like an ultralytics model, and ``predict_raw`` which
+    returns the same raw dicts ('xyxy', 'conf', 'cls', 'orig_shape') as the
+    PyTorch path, so thresholds, NMS and parsing stay shared.
+    """
+
+    def __init__(self, model_path: str, runtime: str = 'onnx', num_threads: int = 0):
+        """
+        Load the exported model
+
+        Args:
+            model_path: .onnx file, or an OpenVINO .xml (or the *_openvino_model folder)
+            runtime: 'onnx' or 'openvino'
+            num_threads: CPU threads per inference (0 lets the runtime decide)
+        """
+        if runtime not in RUNTIMES:
+            raise ValueError(f"Unknown runtime '{runtime}' (expected one of {RUNTIMES})")
+        self.runtime = runtime
+
+        if runtime == 'onnx':
+            metadata, input_shape = self._load_onnx(model_path, num_threads)
+        else:
+            metadata, input_shape = self._load_openvino(model_path, num_threads)
+
+        if 'names' not in metadata:
+            raise ValueError(f"No class names in the metadata of {model_path}; re-export it with ultralytics")
+        self.names = _parse_names(metadata['names'])
+
+        # Fixed spatial dims win; dynamic exports use the size they were exported at
+        batch, _, height, width = input_shape
+        self.dynamic_shape = not (isinstance(height, int) and isinstance(width, int))
+        if self.dynamic_shape:
+            self.imgsz = parse_imgsz(metadata.get('imgsz', 640))
+        else:
+            self.imgsz = (height, width)
+        self.dynamic_batch = not isinstance(batch, int)
+
+        print(f"✅ {runtime} detector loaded: {model_path} (input {self.imgsz[0]}x{self.imgsz[1]})")
+
+    def _load_onnx(self, model_path: str, num_threads: int):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+
+        model_input = session.get_inputs()[0]
+        input_name = model_input.name
+        self._run = lambda batch: session.run(None, {input_name: batch})[0]
+        shape = [dim if isinstance(dim, int) else None for dim in model_input.shape]
+        return dict(session.get_modelmeta().custom_metadata_map), shape
+
+    def _load_openvino(self, model_path: str, num_threads: int):
+        import openvino as ov
+        import yaml
+
+        path = Path(model_path)
+        if path.is_dir():
+            path = next(path.glob('*.xml'))
+        config = {'INFERENCE_NUM_THREADS': num_threads} if num_threads else {}
+        compiled = ov.Core().compile_model(str(path), 'CPU', config)
+
+        output = compiled.output(0)
+        self._run = lambda batch: compiled([batch])[output]
+        shape = [dim.get_length() if dim.is_static else None for dim in compiled.input(0).partial_shape]
+
+        metadata = {}
+        metadata_path = path.parent / 'metadata.yaml'
+        if metadata_path.is_file():
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                metadata = yaml.safe_load(f) or {}
+        return metadata, shape
+
+    def predict_raw(
+        self,
+        images: List[np.ndarray],
+        conf_threshold: float,
+        max_det: int = 300,
+        imgsz: int = None
+    ) -> List[Dict[str, np.ndarray]]:
+        """
+        Pre-NMS boxes for a list of BGR images
+
+        Args:
+            images: BGR images, any sizes
+            conf_threshold: Boxes must score above this
+            max_det: Maximum boxes per image
+            imgsz: Square input size to run at instead of the export size
+                (dynamic-shape exports only)
+
+        Returns:
+            One raw dict ('xyxy', 'conf', 'cls', 'orig_shape') per image
+        """
+        input_shape = (imgsz, imgsz) if imgsz else self.imgsz
+        prepared = [preprocess(image, input_shape) for image in images]
+        tensors = [tensor for tensor, _, _ in prepared]
+
+        if self.dynamic_batch:
+            outputs = list(self._run(np.stack(tensors)))
+        else:
+            outputs = [self._run(tensor[None])[0] for tensor in tensors]
+
+        raws = []
+        for image, (_, gain, pad), output in zip(images, prepared, outputs):
+            orig_shape = image.shape[:2]
+            xyxy, conf, cls = decode_output(output, conf_threshold, max_det)
+            raws.append({
+                'xyxy': scale_boxes(xyxy, gain, pad, orig_shape),
+                'conf': conf,
+                'cls': cls,
+                'orig_shape': tuple(orig_shape)
+            })
+        return raws
@@ -0,0 +1,126 @@
+"""
+Content-Addressed Result Cache
+Bounded in-memory LRU tier with an optional on-disk tier (TTL based)
+for detection and analysis results
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class ResultCache:
+    """Two-tier cache for JSON-serializable results keyed by content hashes"""
+
+    def __init__(self, max_entries: int = 256, disk_dir: str = None, ttl_seconds: float = 86400):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Size of the in-memory LRU tier
+            disk_dir: Folder for the on-disk tier (None disables it)
+            ttl_seconds: How long on-disk entries stay valid
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.disk_dir = disk_dir
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a cache key from hashable parts (content hash, thresholds, model version, ...)"""
+        raw = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a copy of the cached value, or None on a miss"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return copy.deepcopy(self._memory[key])
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            self._store_memory(key, value)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any):
+        """Store a value in memory and, when enabled, on disk"""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._store_memory(key, value)
+        self._write_disk(key, value)
+
+    def _store_memory(self, key: str, value: Any):
+        """Insert into the LRU tier (caller holds the lock)"""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Any]:
+        """Load an entry from the disk tier, dropping it if it has expired"""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, value: Any):
+        """Atomically write an entry to the disk tier"""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, default=float)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️  Result cache write failed: {e}")
+
+    def clear(self):
+        """Drop every in-memory entry (disk entries expire via TTL)"""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                'memory_entries': len(self._memory),
+                'max_entries': self.max_entries,
+                'disk_enabled': bool(self.disk_dir),
+                'memory_hits': self._hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': round((self._hits + self._disk_hits) / lookups, 3) if lookups else 0.0
+            }
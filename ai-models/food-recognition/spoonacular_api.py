@@ -42,30 +42,33 @@ class SpoonacularDetector:
             self.base_url = "https://api.spoonacular.com"
             self.headers = {}
     
-    def detect_food(self, image_path: str) -> Dict[str, Any]:
+    def detect_food(self, image_path: str, image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
         """
         Detect food items in an image using Spoonacular's image analysis
         
         Args:
             image_path: Path to the image file
+            image_bytes: Image contents already in memory (skips reading image_path)
             
         Returns:
             Dictionary containing detected food items with nutrition data
         """
         try:
             # Spoonacular uses multipart file upload
-            with open(image_path, 'rb') as image_file:
-                files = {'file': (os.path.basename(image_path), image_file, 'image/jpeg')}
-                
-                if self.use_rapidapi:
-                    # RapidAPI endpoint
-                    url = f"{self.base_url}/food/images/analyze"
-                    response = requests.post(url, headers=self.headers, files=files, timeout=30)
-                else:
-                    # Direct Spoonacular endpoint
-                    url = f"{self.base_url}/food/images/analyze"
-                    params = {'apiKey': self.api_key}
-                    response = requests.post(url, params=params, files=files, timeout=30)
+            if image_bytes is None:
+                with open(image_path, 'rb') as image_file:
+                    image_bytes = image_file.read()
+            files = {'file': (os.path.basename(image_path), image_bytes, 'image/jpeg')}
+            
+            if self.use_rapidapi:
+                # RapidAPI endpoint
+                url = f"{self.base_url}/food/images/analyze"
+                response = requests.post(url, headers=self.headers, files=files, timeout=30)
+            else:
+                # Direct Spoonacular endpoint
+                url = f"{self.base_url}/food/images/analyze"
+                params = {'apiKey': self.api_key}
+                response = requests.post(url, params=params, files=files, timeout=30)
             
             response.raise_for_status()
             result = response.json()
@@ -0,0 +1,183 @@
+"""
+Camera-Stream Helpers
+Frame-difference gating and IoU tracking for FoodDetectionService.detect_stream
+"""
+
+from typing import Any, Dict, Iterator, List
+
+import cv2
+import numpy as np
+
+# Width of the grayscale thumbnail frames are compared on
+GATE_THUMBNAIL_WIDTH = 64
+
+
+def iter_video_frames(video_path: str, max_frames: int = None) -> Iterator[np.ndarray]:
+    """BGR frames of a video file (or camera index / stream URL OpenCV can open)"""
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    try:
+        count = 0
+        while max_frames is None or count < max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            count += 1
+            yield frame
+    finally:
+        capture.release()
+
+
+def _iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+class FrameGate:
+    """
+    Passes a frame only when it differs enough from the last frame that passed
+
+    Frames are compared as small grayscale thumbnails by mean absolute
+    pixel difference (0-255), so camera noise stays below the threshold
+    while a moved camera or a changed plate goes above it. Comparing
+    against the last analyzed frame (not the previous one) also catches
+    slow drift.
+    """
+
+    def __init__(self, diff_threshold: float = 8.0, thumbnail_width: int = GATE_THUMBNAIL_WIDTH):
+        self.diff_threshold = diff_threshold
+        self.thumbnail_width = thumbnail_width
+        self._reference = None
+
+    def _small_gray(self, bgr: np.ndarray) -> np.ndarray:
+        height, width = bgr.shape[:2]
+        size = (self.thumbnail_width, max(1, round(height * self.thumbnail_width / width)))
+        gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY) if bgr.ndim == 3 else bgr
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def changed(self, bgr: np.ndarray) -> bool:
+        """True (and the frame becomes the new reference) if the frame should be analyzed"""
+        small = self._small_gray(bgr)
+        if (
+            self._reference is not None
+            and self._reference.shape == small.shape
+            and np.abs(small - self._reference).mean() <= self.diff_threshold
+        ):
+            return False
+        self._reference = small
+        return True
+
+
+class _Track:
+    """One food item followed across frames"""
+
+    __slots__ = ('track_id', 'item', 'box', 'confidence', 'detection', 'hits', 'missed')
+
+    def __init__(self, track_id: int, detection: Dict[str, Any]):
+        self.track_id = track_id
+        self.item = detection['item']
+        self.box = np.array(detection['bounding_box'], dtype=np.float64)
+        self.confidence = float(detection['confidence'])
+        self.detection = detection
+        self.hits = 1
+        self.missed = 0
+
+
+class DetectionTracker:
+    """
+    Greedy IoU tracker over per-frame detections
+
+    A detection continues the best-overlapping track of the same item;
+    boxes and confidences are exponentially smoothed. Tracks are reported
+    once seen in min_hits frames (analyzed, or skipped as unchanged) and
+    dropped after missing from more than max_missed analyzed frames in a
+    row, so one-frame flickers neither add nor remove items.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        min_hits: int = 2,
+        max_missed: int = 2,
+        smoothing: float = 0.6
+    ):
+        """
+        Args:
+            iou_threshold: Least box overlap for a detection to continue a track
+            min_hits: Frames (analyzed or held) a track needs before it is reported
+            max_missed: Consecutive analyzed frames a track may be missing from
+            smoothing: Weight of the track's previous box/confidence (0 = no smoothing)
+        """
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.max_missed = max_missed
+        self.smoothing = smoothing
+        self.tracks: List[_Track] = []
+        self._next_id = 1
+
+    def update(self, detections: List[Dict[str, Any]]):
+        """Match one analyzed frame's detections to the tracks"""
+        matched_tracks, matched_detections = set(), set()
+
+        if self.tracks and detections:
+            track_boxes = np.array([track.box for track in self.tracks])
+            detection_boxes = np.array([d['bounding_box'] for d in detections], dtype=np.float64)
+            ious = _iou_matrix(track_boxes, detection_boxes)
+            same_item = np.array([[track.item == d['item'] for d in detections] for track in self.tracks])
+            ious[~same_item] = 0.0
+
+            # Highest-overlap pairs first
+            for t, d in zip(*np.unravel_index(np.argsort(-ious, axis=None), ious.shape)):
+                if ious[t, d] < self.iou_threshold:
+                    break
+                if t in matched_tracks or d in matched_detections:
+                    continue
+                matched_tracks.add(t)
+                matched_detections.add(d)
+                self._continue(self.tracks[t], detections[d])
+
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        for d, detection in enumerate(detections):
+            if d not in matched_detections:
+                self.tracks.append(_Track(self._next_id, detection))
+                self._next_id += 1
+
+    def hold(self):
+        """
+        Count a frame that was skipped as unchanged as another sighting of the
+        currently visible tracks (a static plate still confirms its items)
+        """
+        for track in self.tracks:
+            if track.missed == 0:
+                track.hits += 1
+
+    def _continue(self, track: _Track, detection: Dict[str, Any]):
+        keep = self.smoothing
+        track.box = keep * track.box + (1 - keep) * np.array(detection['bounding_box'], dtype=np.float64)
+        track.confidence = keep * track.confidence + (1 - keep) * float(detection['confidence'])
+        track.detection = detection
+        track.hits += 1
+        track.missed = 0
+
+    def confirmed(self) -> List[Dict[str, Any]]:
+        """Reported tracks as detection dicts with smoothed boxes and a track_id"""
+        return [
+            {
+                **track.detection,
+                'bounding_box': track.box.round().astype(np.int64).tolist(),
+                'confidence': round(track.confidence, 3),
+                'track_id': track.track_id
+            }
+            for track in self.tracks
+            if track.hits >= self.min_hits
+        ]
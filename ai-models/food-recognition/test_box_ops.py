@@ -0,0 +1,91 @@
+"""
+Test Box Operations
+Checks filter_raw (confidence threshold + class-aware NMS) on hand-made boxes
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Run from any directory
+sys.path.insert(0, str(Path(__file__).parent))
+
+from box_ops import filter_raw
+
+
+def make_raw(boxes):
+    """Raw dict from (x1, y1, x2, y2, conf, cls) rows"""
+    rows = np.array(boxes, dtype=np.float32).reshape(-1, 6)
+    return {
+        'xyxy': rows[:, :4],
+        'conf': rows[:, 4],
+        'cls': rows[:, 5].astype(np.int64),
+        'orig_shape': (480, 640)
+    }
+
+
+def test_confidence_threshold():
+    """Only boxes scoring above the threshold survive"""
+    raw = make_raw([
+        (0, 0, 10, 10, 0.9, 0),
+        (100, 100, 110, 110, 0.25, 0),
+        (200, 200, 210, 210, 0.1, 0),
+    ])
+    kept = filter_raw(raw, 0.25, 0.45)
+    assert np.allclose(kept['conf'], [0.9])
+    assert kept['orig_shape'] == (480, 640)
+    print("✅ Confidence threshold is exclusive")
+
+
+def test_nms_is_class_aware():
+    """Overlapping boxes of one class are suppressed, of different classes kept"""
+    raw = make_raw([
+        (0, 0, 100, 100, 0.6, 0),
+        (5, 5, 105, 105, 0.8, 0),   # IoU ~0.82 with the first box
+        (5, 5, 105, 105, 0.7, 1),   # same place, other class
+        (300, 300, 400, 400, 0.5, 0),
+    ])
+    kept = filter_raw(raw, 0.25, 0.45)
+    assert kept['cls'].tolist() == [0, 1, 0]
+    assert np.allclose(kept['conf'], [0.8, 0.7, 0.5])
+    assert kept['xyxy'][0].tolist() == [5, 5, 105, 105]
+    print("✅ NMS keeps the best box per class, highest score first")
+
+
+def test_iou_threshold_and_max_det():
+    """A looser IoU keeps overlapping boxes; max_det caps the result"""
+    raw = make_raw([
+        (0, 0, 100, 100, 0.9, 0),
+        (50, 0, 150, 100, 0.8, 0),  # IoU 1/3 with the first box
+        (300, 0, 400, 100, 0.7, 0),
+    ])
+    assert len(filter_raw(raw, 0.25, 0.3)['conf']) == 2
+    assert len(filter_raw(raw, 0.25, 0.45)['conf']) == 3
+    assert len(filter_raw(raw, 0.25, 0.45, max_det=1)['conf']) == 1
+    print("✅ IoU threshold and max_det are honoured")
+
+
+def test_empty():
+    """No boxes in, no boxes out (with the right shapes)"""
+    kept = filter_raw(make_raw([]), 0.25, 0.45)
+    assert kept['xyxy'].shape == (0, 4)
+    assert len(kept['conf']) == 0 and len(kept['cls']) == 0
+    kept = filter_raw(make_raw([(0, 0, 10, 10, 0.1, 0)]), 0.25, 0.45)
+    assert kept['xyxy'].shape == (0, 4)
+    print("✅ Empty inputs give empty outputs")
+
+
+def main():
+    print("=" * 60)
+    print("🧪 Box Operations Tests")
+    print("=" * 60)
+    test_confidence_threshold()
+    test_nms_is_class_aware()
+    test_iou_threshold_and_max_det()
+    test_empty()
+    print("\n✅ All box operation tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Test Combination Index
+Checks CombinationIndex.match against a plain scan over every rule
+"""
+
+import json
+import random
+import sys
+from pathlib import Path
+
+# Run from any directory
+sys.path.insert(0, str(Path(__file__).parent))
+
+from combination_index import CombinationIndex
+
+NUTRITION_DB_PATH = Path(__file__).parent / 'nutrition_database.json'
+
+
+def rule(*foods, reduction=0.9):
+    return {'combination': list(foods), 'giReduction': reduction, 'reason': ' + '.join(foods)}
+
+
+def scan(rules, detected_items):
+    """Reference: every rule whose foods were all detected, in database order"""
+    detected = set(detected_items)
+    return [r for r in rules if all(food in detected for food in r['combination'])]
+
+
+def test_matches_whole_combinations_only():
+    rules = [rule('rice', 'dal'), rule('roti', 'sabzi'), rule('rice', 'dal', 'ghee')]
+    index = CombinationIndex(rules)
+    assert index.match(['rice']) == []
+    assert index.match(['dal', 'rice', 'papad']) == [rules[0]]
+    assert index.match(['ghee', 'dal', 'rice', 'roti', 'sabzi']) == rules
+    # Repeated detections of a food count once
+    assert index.match(['rice', 'rice', 'dal']) == [rules[0]]
+    print("✅ Rules match only when all their foods are detected")
+
+
+def test_rule_without_foods_always_matches():
+    rules = [rule('rice', 'dal'), rule()]
+    index = CombinationIndex(rules)
+    assert index.match([]) == [rules[1]]
+    assert index.match(['dal', 'rice']) == rules
+    print("✅ A rule without foods matches every meal")
+
+
+def test_agrees_with_scan():
+    """Random rule sets and meals give the same matches as scanning every rule"""
+    rng = random.Random(0)
+    foods = [f'food{i}' for i in range(30)]
+    rules = [rule(*rng.sample(foods, rng.randint(1, 4))) for _ in range(200)]
+    index = CombinationIndex(rules)
+    for _ in range(500):
+        meal = rng.sample(foods, rng.randint(0, 10))
+        assert index.match(meal) == scan(rules, meal)
+    print("✅ Matches agree with a full scan on 500 random meals")
+
+
+def test_nutrition_database_rules():
+    with open(NUTRITION_DB_PATH, 'r', encoding='utf-8') as f:
+        rules = json.load(f)['mealCombinationRules']['thaliEffect']['rules']
+    index = CombinationIndex(rules)
+    assert len(index) == len(rules)
+    for r in rules:
+        assert r in index.match(r['combination'])
+    print(f"✅ Every thaliEffect rule in nutrition_database.json matches its own meal ({len(rules)} rules)")
+
+
+def main():
+    print("=" * 60)
+    print("🧪 Combination Index Tests")
+    print("=" * 60)
+    test_matches_whole_combinations_only()
+    test_rule_without_foods_always_matches()
+    test_agrees_with_scan()
+    test_nutrition_database_rules()
+    print("\n✅ All combination index tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Test Nutrition Index
+Checks the compiled arrays and meal totals against hand-computed values
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Run from any directory
+sys.path.insert(0, str(Path(__file__).parent))
+
+from nutrition_index import NutritionIndex, SIZE_IDS, parse_serving_grams
+
+NUTRITION_DB_PATH = Path(__file__).parent / 'nutrition_database.json'
+
+
+def food(serving_size, weights, carbs, gl, protein, fat, fiber, calories, time_impact=None):
+    """nutritionDatabase entry from per-portion (small, medium, large) values"""
+    return {
+        'servingSize': serving_size,
+        'portionSizes': {
+            size: {'weight': weights[i], 'carbs': carbs[i], 'gl': gl[i]}
+            for size, i in SIZE_IDS.items()
+        },
+        'protein': protein,
+        'fat': fat,
+        'fiber': fiber,
+        'calories': calories,
+        'timeImpact': time_impact or {}
+    }
+
+
+FOOD_DB = {
+    'idli': food('2 pieces (100g)', (50, 100, 150), (10, 20, 30), (5, 10, 15), 4, 1, 2, 120,
+                 {'morning': 0.9, 'night': 1.2}),
+    'sambar': food('1 bowl', (100, 200, 300), (6, 12, 18), (2, 4, 6), 6, 3, 4, 150),
+}
+
+
+def test_parse_serving_grams():
+    assert parse_serving_grams('1 bowl (150g cooked)') == 150.0
+    assert parse_serving_grams('1 plate ( 250.5 G )') == 250.5
+    assert parse_serving_grams('1 bowl') is None
+    assert parse_serving_grams(None) is None
+    print("✅ Serving grams are parsed from servingSize")
+
+
+def test_compiled_arrays():
+    index = NutritionIndex(FOOD_DB)
+    assert len(index) == 2
+    assert index.lookup(['sambar', 'idli', 'vada']).tolist() == [1, 0, -1]
+    assert index.portion_carbs[0].tolist() == [10, 20, 30]
+    # No grams in "1 bowl": the medium portion weight is used
+    assert index.serving_grams.tolist() == [100, 200]
+    assert set(index.times_of_day) == {'morning', 'night'}
+    assert index.time_multipliers[1].tolist() == [1.0, 1.0]
+    print("✅ Arrays are compiled per food, portion and time of day")
+
+
+def test_meal_totals():
+    index = NutritionIndex(FOOD_DB)
+    food_ids = index.lookup(['idli', 'sambar'])
+    size_ids = np.array([SIZE_IDS['large'], SIZE_IDS['small']])
+
+    meal = index.meal(food_ids, size_ids, 'night')
+    assert meal['weight'].tolist() == [150, 100]
+    assert meal['total_carbs'] == 30 + 6
+    # Time impact applies per food (sambar has none)
+    assert np.isclose(meal['total_gl'], 15 * 1.2 + 2)
+    # Macros scale with portion weight / serving grams
+    assert np.isclose(meal['total_protein'], 4 * 1.5 + 6 * 0.5)
+    assert np.isclose(meal['total_calories'], 120 * 1.5 + 150 * 0.5)
+
+    unknown_time = index.meal(food_ids, size_ids, 'brunch')
+    assert np.isclose(unknown_time['total_gl'], 15 + 2)
+    print("✅ Meal totals match hand-computed values")
+
+
+def test_nutrition_database_compiles():
+    """The shipped database compiles and every food is reachable by name"""
+    with open(NUTRITION_DB_PATH, 'r', encoding='utf-8') as f:
+        food_db = json.load(f)['nutritionDatabase']
+    index = NutritionIndex(food_db)
+    assert (index.lookup(list(food_db)) >= 0).all()
+    assert (index.serving_grams > 0).all()
+    print(f"✅ nutrition_database.json compiles ({len(index)} foods)")
+
+
+def main():
+    print("=" * 60)
+    print("🧪 Nutrition Index Tests")
+    print("=" * 60)
+    test_parse_serving_grams()
+    test_compiled_arrays()
+    test_meal_totals()
+    test_nutrition_database_compiles()
+    print("\n✅ All nutrition index tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Test Result Cache
+Checks the LRU tier, copy-on-read/write and the on-disk TTL tier
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Run from any directory
+sys.path.insert(0, str(Path(__file__).parent))
+
+from result_cache import ResultCache
+
+
+def test_make_key():
+    """Keys depend on every part and on dict contents, not their order"""
+    key = ResultCache.make_key('detect', 'abc', 0.25, {'a': 1, 'b': 2})
+    assert key == ResultCache.make_key('detect', 'abc', 0.25, {'b': 2, 'a': 1})
+    assert key != ResultCache.make_key('detect', 'abc', 0.3, {'a': 1, 'b': 2})
+    assert key != ResultCache.make_key('analysis', 'abc', 0.25, {'a': 1, 'b': 2})
+    print("✅ make_key is stable and part-sensitive")
+
+
+def test_lru_eviction():
+    """The least recently used entry goes first"""
+    cache = ResultCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the oldest
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+    stats = cache.stats()
+    assert stats['memory_entries'] == 2
+    assert stats['memory_hits'] == 3 and stats['misses'] == 1
+    print("✅ LRU tier evicts the least recently used entry")
+
+
+def test_values_are_copied():
+    """Callers can't change cached values through the objects they pass in or get back"""
+    cache = ResultCache()
+    value = {'items': ['idli']}
+    cache.set('k', value)
+    value['items'].append('dosa')
+    assert cache.get('k') == {'items': ['idli']}
+
+    cache.get('k')['items'].append('vada')
+    assert cache.get('k') == {'items': ['idli']}
+    print("✅ Values are copied on set and get")
+
+
+def test_disk_tier():
+    """Entries survive the memory tier and expire after the TTL"""
+    with tempfile.TemporaryDirectory() as disk_dir:
+        writer = ResultCache(disk_dir=disk_dir, ttl_seconds=60)
+        writer.set('k', {'carbs': 42.5})
+
+        # A fresh cache (e.g. after a restart) reads it from disk
+        reader = ResultCache(disk_dir=disk_dir, ttl_seconds=60)
+        assert reader.get('k') == {'carbs': 42.5}
+        assert reader.stats()['disk_hits'] == 1
+
+        path = os.path.join(disk_dir, 'k.json')
+        old = time.time() - 120
+        os.utime(path, (old, old))
+        expired = ResultCache(disk_dir=disk_dir, ttl_seconds=60)
+        assert expired.get('k') is None
+        assert not os.path.exists(path)
+    print("✅ Disk tier persists entries and drops expired ones")
+
+
+def main():
+    print("=" * 60)
+    print("🧪 Result Cache Tests")
+    print("=" * 60)
+    test_make_key()
+    test_lru_eviction()
+    test_values_are_copied()
+    test_disk_tier()
+    print("\n✅ All result cache tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Test Stream Tracker
+Checks DetectionTracker confirmation, smoothing and expiry, and FrameGate
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Run from any directory
+sys.path.insert(0, str(Path(__file__).parent))
+
+from stream_tracker import DetectionTracker, FrameGate
+
+
+def det(item, box, confidence=0.8):
+    return {'item': item, 'bounding_box': list(box), 'confidence': confidence}
+
+
+def test_tracks_confirm_after_min_hits():
+    tracker = DetectionTracker(min_hits=2)
+    tracker.update([det('idli', (0, 0, 100, 100))])
+    assert tracker.confirmed() == []
+
+    tracker.update([det('idli', (4, 4, 104, 104))])
+    confirmed = tracker.confirmed()
+    assert len(confirmed) == 1
+    assert confirmed[0]['item'] == 'idli' and confirmed[0]['track_id'] == 1
+    print("✅ Tracks are reported after min_hits frames")
+
+
+def test_hold_counts_unchanged_frames():
+    """A static plate (skipped frames) still confirms its items"""
+    tracker = DetectionTracker(min_hits=2)
+    tracker.update([det('dosa', (0, 0, 100, 100))])
+    tracker.hold()
+    assert [d['item'] for d in tracker.confirmed()] == ['dosa']
+    print("✅ Held frames count as sightings")
+
+
+def test_smoothing():
+    tracker = DetectionTracker(min_hits=1, smoothing=0.5)
+    tracker.update([det('idli', (0, 0, 100, 100), 1.0)])
+    tracker.update([det('idli', (10, 10, 110, 110), 0.5)])
+    confirmed = tracker.confirmed()[0]
+    assert confirmed['bounding_box'] == [5, 5, 105, 105]
+    assert confirmed['confidence'] == 0.75
+    print("✅ Boxes and confidences are smoothed")
+
+
+def test_items_and_overlap_keep_tracks_apart():
+    """Different items, or same item far away, start new tracks"""
+    tracker = DetectionTracker(min_hits=1)
+    tracker.update([det('idli', (0, 0, 100, 100))])
+    tracker.update([
+        det('idli', (2, 2, 102, 102)),
+        det('sambar', (0, 0, 100, 100)),
+        det('idli', (300, 300, 400, 400)),
+    ])
+    tracks = {(d['item'], d['track_id']) for d in tracker.confirmed()}
+    assert tracks == {('idli', 1), ('sambar', 2), ('idli', 3)}
+    print("✅ Only overlapping detections of the same item continue a track")
+
+
+def test_flicker_and_expiry():
+    """One missed frame keeps a track; more than max_missed drops it"""
+    tracker = DetectionTracker(min_hits=1, max_missed=1)
+    tracker.update([det('vada', (0, 0, 50, 50))])
+    tracker.update([])
+    assert len(tracker.confirmed()) == 1
+    tracker.update([])
+    assert tracker.confirmed() == []
+    print("✅ Tracks survive a flicker and expire after max_missed")
+
+
+def test_frame_gate():
+    gate = FrameGate(diff_threshold=8.0)
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 200, (240, 320, 3), dtype=np.uint8)
+    assert gate.changed(frame)
+
+    noisy = np.clip(frame.astype(np.int16) + rng.integers(-3, 4, frame.shape), 0, 255).astype(np.uint8)
+    assert not gate.changed(noisy)
+
+    assert gate.changed(255 - frame)
+    print("✅ FrameGate passes changed frames and skips camera noise")
+
+
+def main():
+    print("=" * 60)
+    print("🧪 Stream Tracker Tests")
+    print("=" * 60)
+    test_tracks_confirm_after_min_hits()
+    test_hold_counts_unchanged_frames()
+    test_smoothing()
+    test_items_and_overlap_keep_tracks_apart()
+    test_flicker_and_expiry()
+    test_frame_gate()
+    print("\n✅ All stream tracker tests passed")
+
+
+if __name__ == '__main__':
+    main()
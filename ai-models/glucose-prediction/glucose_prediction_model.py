@@ -5,11 +5,10 @@ Predicts blood sugar levels 1h and 2h after meal
 
 import numpy as np
 import pandas as pd
-import xgboost as xgb
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 import json
+import os
+import time
 from datetime import datetime
 from typing import Dict, List, Any, Tuple
 
@@ -27,6 +26,7 @@ class GlucosePredictionModel:
         self.model_2h = None
         self.feature_names = []
         self.feature_importance = {}
+        self.model_version = None
         
         if model_path:
             self.load_model(model_path)
@@ -41,6 +41,22 @@ class GlucosePredictionModel:
         Returns:
             DataFrame with features ready for prediction
         """
+        return pd.DataFrame([self._feature_row(meal_data)])
+    
+    def prepare_features_batch(self, meal_data_list: List[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Convert several meals to one feature matrix (one row per meal)
+        
+        Args:
+            meal_data_list: List of meal_data dictionaries
+            
+        Returns:
+            DataFrame with one row of features per meal, in input order
+        """
+        return pd.DataFrame([self._feature_row(meal_data) for meal_data in meal_data_list])
+    
+    def _feature_row(self, meal_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Feature values for a single meal"""
         features = {
             # Meal composition
             'total_carbs': meal_data.get('total_carbs', 0),
@@ -90,7 +106,7 @@ class GlucosePredictionModel:
                                        for f in meal_data.get('foods_detected', [])) else 0,
         }
         
-        return pd.DataFrame([features])
+        return features
     
     def _encode_time(self, time_of_day: str) -> int:
         """Encode time of day as hour"""
@@ -153,6 +169,10 @@ class GlucosePredictionModel:
         Returns:
             Training metrics and performance
         """
+        # Training-only dependencies are imported here to keep serving startup light
+        import xgboost as xgb
+        from sklearn.model_selection import train_test_split
+        
         print("📚 Loading training data...")
         df = pd.read_csv(data_path)
         
@@ -236,6 +256,8 @@ class GlucosePredictionModel:
         y_2h_test: pd.Series
     ) -> Dict[str, Any]:
         """Evaluate model performance"""
+        from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+        
         # 1-hour predictions
         y_1h_pred = self.model_1h.predict(X_test)
         mae_1h = mean_absolute_error(y_1h_test, y_1h_pred)
@@ -307,40 +329,86 @@ class GlucosePredictionModel:
         Returns:
             Predictions with confidence intervals
         """
+        return self.predict_batch([meal_data])[0]
+    
+    def predict_batch(self, meal_data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Predict glucose levels for several meals with one model call per horizon
+        
+        Args:
+            meal_data_list: List of meal_data dictionaries
+            
+        Returns:
+            One prediction per meal, in input order
+        """
         if not self.model_1h or not self.model_2h:
             raise ValueError("Models not trained. Train or load models first.")
         
+        if not meal_data_list:
+            return []
+        
         # Prepare features
-        X = self.prepare_features(meal_data)
+        X = self.prepare_features_batch(meal_data_list)
         
         # Predict
-        glucose_1h = self.model_1h.predict(X)[0]
-        glucose_2h = self.model_2h.predict(X)[0]
-        
-        # Calculate risk level
-        baseline = meal_data.get('last_glucose_reading', 100)
-        spike_1h = glucose_1h - baseline
-        spike_2h = glucose_2h - baseline
-        
-        # Risk classification
-        if glucose_2h < 140:
-            risk = "low"
-        elif glucose_2h < 180:
-            risk = "moderate"
-        else:
-            risk = "high"
-        
-        return {
-            'baseline_glucose': round(baseline, 0),
-            'predicted_glucose_1h': round(glucose_1h, 0),
-            'predicted_glucose_2h': round(glucose_2h, 0),
-            'glucose_spike_1h': round(spike_1h, 0),
-            'glucose_spike_2h': round(spike_2h, 0),
-            'peak_time': '1 hour' if glucose_1h > glucose_2h else '2 hours',
-            'risk_level': risk,
-            'confidence': self._calculate_confidence(X),
-            'timestamp': datetime.now().isoformat()
+        glucose_1h_all = self.model_1h.predict(X)
+        glucose_2h_all = self.model_2h.predict(X)
+        
+        predictions = []
+        for i, meal_data in enumerate(meal_data_list):
+            glucose_1h = glucose_1h_all[i]
+            glucose_2h = glucose_2h_all[i]
+            
+            # Calculate risk level
+            baseline = meal_data.get('last_glucose_reading', 100)
+            spike_1h = glucose_1h - baseline
+            spike_2h = glucose_2h - baseline
+            
+            # Risk classification
+            if glucose_2h < 140:
+                risk = "low"
+            elif glucose_2h < 180:
+                risk = "moderate"
+            else:
+                risk = "high"
+            
+            predictions.append({
+                'baseline_glucose': round(baseline, 0),
+                'predicted_glucose_1h': round(glucose_1h, 0),
+                'predicted_glucose_2h': round(glucose_2h, 0),
+                'glucose_spike_1h': round(spike_1h, 0),
+                'glucose_spike_2h': round(spike_2h, 0),
+                'peak_time': '1 hour' if glucose_1h > glucose_2h else '2 hours',
+                'risk_level': risk,
+                'confidence': self._calculate_confidence(X.iloc[[i]]),
+                'timestamp': datetime.now().isoformat()
+            })
+        
+        return predictions
+    
+    def warmup(self, runs: int = 2) -> List[float]:
+        """
+        Run synthetic meals through both horizons so the first real
+        prediction doesn't pay one-time setup costs
+        
+        Args:
+            runs: Number of warmup predictions
+            
+        Returns:
+            Duration of each run in milliseconds
+        """
+        meal_data = {
+            'total_carbs': 55, 'total_protein': 12, 'total_fat': 10,
+            'total_fiber': 5, 'glycemic_load': 28, 'total_calories': 380,
+            'time_of_day': 'afternoon', 'last_glucose_reading': 110,
+            'hours_since_last_meal': 4
         }
+        timings = []
+        for _ in range(max(1, runs)):
+            start = time.perf_counter()
+            self.predict(meal_data)
+            timings.append(round((time.perf_counter() - start) * 1000, 1))
+        return timings
     
     def _calculate_confidence(self, X: pd.DataFrame) -> str:
         """Estimate prediction confidence based on feature values"""
@@ -374,6 +442,10 @@ class GlucosePredictionModel:
         self.feature_names = model_data['feature_names']
         self.feature_importance = model_data['feature_importance']
         
+        # File name plus training date, reported with every prediction response
+        name = os.path.splitext(os.path.basename(path))[0]
+        self.model_version = f"{name}@{model_data.get('trained_date', 'unknown')}"
+        
         print(f"✅ Models loaded from: {path}")
         print(f"   Version: {model_data.get('version', 'unknown')}")
         print(f"   Trained: {model_data.get('trained_date', 'unknown')}")
@@ -0,0 +1,298 @@
+"""
+Persistent Job Store for Asynchronous Scans
+SQLite-backed job records with in-process long-poll support, plus stored
+responses for Idempotency-Key retries
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+FINISHED_STATES = (COMPLETED, FAILED)
+
+# status_code of an Idempotency-Key claimed by a request that is still running
+PENDING_STATUS = 0
+
+
+class JobStore:
+    """Stores job status and results in a local SQLite database"""
+
+    def __init__(self, db_path: str = 'jobs.db'):
+        """
+        Open (or create) the job database
+
+        Args:
+            db_path: Path to the SQLite file
+        """
+        self.db_path = db_path
+        self._finished = threading.Condition()
+        self._purger = None
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS idempotency (
+                    key TEXT NOT NULL,
+                    endpoint TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    status_code INTEGER NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (key, endpoint)
+                )
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection per call (SQLite handles cross-thread locking)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, kind: str, params: Dict[str, Any] = None) -> str:
+        """
+        Record a new queued job
+
+        Args:
+            kind: Pipeline name (e.g. "scan-and-predict")
+            params: JSON-serializable request parameters
+
+        Returns:
+            Job id
+        """
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, status, params, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, kind, QUEUED, json.dumps(params or {}), time.time())
+            )
+        return job_id
+
+    def mark_running(self, job_id: str):
+        """Record that a worker picked the job up"""
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, started_at = ? WHERE id = ?',
+                (RUNNING, time.time(), job_id)
+            )
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        """Store a job's result"""
+        self._finish(job_id, COMPLETED, result=json.dumps(result, default=float))
+
+    def fail(self, job_id: str, error: str):
+        """Store a job's error"""
+        self._finish(job_id, FAILED, error=error)
+
+    def _finish(self, job_id: str, status: str, result: str = None, error: str = None):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?',
+                (status, result, error, time.time(), job_id)
+            )
+        with self._finished:
+            self._finished.notify_all()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job record as a dict, or None if unknown"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT id, kind, status, result, error, created_at, started_at, finished_at '
+                'FROM jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            'job_id': row[0],
+            'kind': row[1],
+            'status': row[2],
+            'created_at': row[5],
+            'started_at': row[6],
+            'finished_at': row[7]
+        }
+        if row[3] is not None:
+            job['result'] = json.loads(row[3])
+        if row[4] is not None:
+            job['error'] = row[4]
+        return job
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Long-poll: return the job once it has finished or timeout seconds pass
+
+        Args:
+            job_id: Job to wait for
+            timeout: Longest time to block, in seconds
+
+        Returns:
+            Latest job record (None if unknown)
+        """
+        deadline = time.monotonic() + timeout
+        job = self.get(job_id)
+        while job is not None and job['status'] not in FINISHED_STATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            with self._finished:
+                # Wake on any finished job; re-check ours (1 s cap covers other processes)
+                self._finished.wait(timeout=min(remaining, 1.0))
+            job = self.get(job_id)
+        return job
+
+    def fail_interrupted(self) -> int:
+        """
+        Mark jobs left queued/running by a previous process as failed
+
+        Returns:
+            Number of jobs updated
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status IN (?, ?)',
+                (FAILED, 'Interrupted by server restart', time.time(), QUEUED, RUNNING)
+            )
+            return cursor.rowcount
+
+    def purge(self, older_than_seconds: float) -> int:
+        """
+        Delete finished jobs (and stored idempotent responses) older than the given age
+
+        Returns:
+            Number of jobs deleted
+        """
+        cutoff = time.time() - older_than_seconds
+        with self._connect() as conn:
+            # Claims of requests still running are left alone
+            conn.execute(
+                'DELETE FROM idempotency WHERE created_at < ? AND status_code != ?',
+                (cutoff, PENDING_STATUS)
+            )
+            cursor = conn.execute(
+                'DELETE FROM jobs WHERE created_at < ? AND status IN (?, ?)',
+                (cutoff, COMPLETED, FAILED)
+            )
+            return cursor.rowcount
+
+    def reserve_response(self, key: str, endpoint: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim an Idempotency-Key before computing its response
+
+        Inserts a pending row carrying the request fingerprint, so a retry
+        (or a different request under the same key) sees the claim while the
+        first attempt is still running.
+
+        Returns:
+            None if this caller claimed the key, else the existing entry
+            (as get_response; 'pending' is True while it has no response yet)
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO idempotency '
+                '(key, endpoint, fingerprint, status_code, response, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, endpoint, fingerprint, PENDING_STATUS, 'null', time.time())
+            )
+        if cursor.rowcount == 1:
+            return None
+        return self.get_response(key, endpoint)
+
+    def release_response(self, key: str, endpoint: str):
+        """Drop a pending claim (the attempt failed; a retry may compute again)"""
+        with self._connect() as conn:
+            conn.execute(
+                'DELETE FROM idempotency WHERE key = ? AND endpoint = ? AND status_code = ?',
+                (key, endpoint, PENDING_STATUS)
+            )
+
+    def release_pending_responses(self) -> int:
+        """
+        Drop claims left pending by a previous process
+
+        Returns:
+            Number of claims dropped
+        """
+        with self._connect() as conn:
+            cursor = conn.execute('DELETE FROM idempotency WHERE status_code = ?', (PENDING_STATUS,))
+            return cursor.rowcount
+
+    def start_purging(self, older_than_seconds: float, interval_seconds: float = 3600):
+        """
+        Purge on a daemon thread every interval_seconds (for long-running servers)
+
+        Args:
+            older_than_seconds: Age passed to purge
+            interval_seconds: Time between purges
+        """
+        if self._purger is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    purged = self.purge(older_than_seconds)
+                    if purged:
+                        print(f"🧹 Job retention removed {purged} expired jobs")
+                except Exception as e:
+                    print(f"⚠️  Job purge failed: {e}")
+
+        self._purger = threading.Thread(target=run, name='job-purger', daemon=True)
+        self._purger.start()
+
+    def get_response(self, key: str, endpoint: str) -> Optional[Dict[str, Any]]:
+        """
+        Stored response for an Idempotency-Key
+
+        Returns:
+            Dict with fingerprint, pending, status_code and response, or None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT fingerprint, status_code, response FROM idempotency WHERE key = ? AND endpoint = ?',
+                (key, endpoint)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'fingerprint': row[0],
+            'pending': row[1] == PENDING_STATUS,
+            'status_code': row[1],
+            'response': json.loads(row[2])
+        }
+
+    def save_response(self, key: str, endpoint: str, status_code: int, response: Dict[str, Any]):
+        """Store the response for a key claimed with reserve_response"""
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE idempotency SET status_code = ?, response = ? '
+                'WHERE key = ? AND endpoint = ? AND status_code = ?',
+                (status_code, json.dumps(response, default=float), key, endpoint, PENDING_STATUS)
+            )
@@ -0,0 +1,196 @@
+"""
+Latency Metrics for the AI API
+Thread-safe histograms and counters rendered in the Prometheus text format
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Tuple
+
+# Latency buckets in seconds (Prometheus defaults plus a 30 s bucket for cold starts)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: LabelValues, extra: Tuple[str, str] = None) -> str:
+    """Render label pairs as {a="x",b="y"} (empty string when there are none)"""
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    rendered = ','.join(f'{key}="{_escape(value)}"' for key, value in pairs)
+    return '{' + rendered + '}'
+
+
+def _escape(value: str) -> str:
+    """Escape a label value (backslash, double quote and newline)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, one series per label set"""
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        """Record one observation"""
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), running sum
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = [(key, list(counts), total) for key, (counts, total) in sorted(self._series.items())]
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = ('le', _format_value(bound))
+                lines.append(f'{self.name}_bucket{_format_labels(key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {cumulative}')
+        return '\n'.join(lines)
+
+
+class Counter:
+    """Monotonic counter, one series per label set"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._series: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        """Increase the counter"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            snapshot = sorted(self._series.items())
+        for key, value in snapshot:
+            lines.append(f'{self.name}{_format_labels(key)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class CallbackGauge:
+    """Gauge (or counter) whose series are read from a callback at scrape time"""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        collect: Callable[[], Dict[LabelValues, float]],
+        metric_type: str = 'gauge'
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.collect = collect
+        self.metric_type = metric_type
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.metric_type}']
+        for key, value in sorted(self.collect().items()):
+            lines.append(f'{self.name}{_format_labels(key)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Metrics:
+    """
+    Registry for the API's request, stage and event metrics
+
+    Also serves as the FoodDetectionService observer: the service reports
+    stage timings through stage() and notable events through event().
+    """
+
+    def __init__(self, prefix: str = 'glucosage'):
+        self.request_latency = Histogram(
+            f'{prefix}_request_duration_seconds',
+            'HTTP request latency by endpoint, method and status'
+        )
+        self.stage_latency = Histogram(
+            f'{prefix}_stage_duration_seconds',
+            'Pipeline stage latency (upload_decode, disk_save, yolo_predict, fallback, '
+            'nutrition, glucose_predict, advice, annotation_write)'
+        )
+        self.events = Counter(
+            f'{prefix}_events_total',
+            'Pipeline events (cache hits, fallback activations)'
+        )
+        self.provider_calls = Counter(
+            f'{prefix}_provider_calls_total',
+            'Third-party food recognition API calls by provider and outcome'
+        )
+        self.prefix = prefix
+        self._gauges = []
+
+    def stage(self, name: str, seconds: float):
+        """Record how long a pipeline stage took"""
+        self.stage_latency.observe(seconds, stage=name)
+
+    def event(self, name: str):
+        """Count a pipeline event"""
+        self.events.inc(event=name)
+
+    @contextmanager
+    def time_stage(self, name: str):
+        """Time the body of a with-block as a pipeline stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage(name, time.perf_counter() - start)
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float):
+        """Record one finished HTTP request"""
+        self.request_latency.observe(seconds, endpoint=endpoint, method=method, status=str(status))
+
+    def provider_call(self, provider: str, success: bool):
+        """Count a call to a third-party provider"""
+        self.provider_calls.inc(provider=provider, outcome='success' if success else 'error')
+
+    def add_gauge(
+        self,
+        name: str,
+        help_text: str,
+        collect: Callable[[], Dict[LabelValues, float]],
+        metric_type: str = 'gauge'
+    ):
+        """
+        Register a metric read at scrape time
+
+        Args:
+            name: Metric name without the prefix
+            help_text: HELP line
+            collect: Returns {label pairs: value}, e.g. {(('pool', 'inference'),): 3}
+            metric_type: 'gauge' or 'counter'
+        """
+        self._gauges.append(CallbackGauge(f'{self.prefix}_{name}', help_text, collect, metric_type))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        metrics = [self.request_latency, self.stage_latency, self.events, self.provider_calls] + self._gauges
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
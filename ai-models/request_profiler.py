@@ -0,0 +1,154 @@
+"""
+On-Demand Request Profiling
+Captures a cProfile profile of individual requests (by header or sampling)
+and writes it to a rotating profile directory
+"""
+
+import cProfile
+import glob
+import hmac
+import os
+import random
+import re
+import threading
+import uuid
+from typing import Callable, Optional
+
+from flask import Flask, g, request
+
+# Client-supplied request ids become file names; anything else gets a fresh id
+_SAFE_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+class RequestProfiler:
+    """
+    Profile selected requests end to end, including streamed response bodies
+
+    A request is profiled when it carries an ``X-Profile`` header equal to
+    the configured token, or when it is picked by the sample rate. Only one
+    request is profiled at a time (cProfile can't run concurrently on newer
+    Pythons); requests arriving while another is being profiled run normally.
+
+    cProfile only sees the thread it was enabled on. on_start/on_stop run on
+    that thread so the app can keep the profiled request's work there (e.g.
+    skip batching); work handed to other threads anyway, such as async jobs
+    or an identical request computed by another thread, shows up only as
+    the wait for it.
+    """
+
+    HEADER = 'X-Profile'
+
+    def __init__(
+        self,
+        profile_dir: str = 'profiles',
+        sample_rate: float = 0.0,
+        token: Optional[str] = None,
+        keep: int = 50,
+        on_start: Optional[Callable[[], None]] = None,
+        on_stop: Optional[Callable[[], None]] = None
+    ):
+        """
+        Configure the profiler
+
+        Args:
+            profile_dir: Folder the .prof files are written to
+            sample_rate: Fraction of requests (0-1) profiled without a header
+            token: Value the X-Profile header must carry (None disables the header)
+            keep: Number of most recent profiles kept on disk
+            on_start: Called on the request's thread when profiling starts
+            on_stop: Called on the same thread when profiling stops
+        """
+        self.profile_dir = profile_dir
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.token = token
+        self.keep = max(1, int(keep))
+        self.on_start = on_start
+        self.on_stop = on_stop
+        self._active = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or bool(self.token)
+
+    def init_app(self, app: Flask):
+        """Register the request hooks (no-op when neither trigger is configured)"""
+        if not self.enabled:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._abandon)
+
+    def _wanted(self) -> bool:
+        header = request.headers.get(self.HEADER)
+        if header is not None and self.token and hmac.compare_digest(header, self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _start(self):
+        if not self._wanted() or not self._active.acquire(blocking=False):
+            return
+        request_id = request.headers.get('X-Request-ID', '')
+        g.profile_id = request_id if _SAFE_ID.fullmatch(request_id) else uuid.uuid4().hex
+        g.profiler = cProfile.Profile()
+        try:
+            g.profiler.enable()
+        except ValueError:
+            # Another profiling tool is active in this process
+            g.profiler = None
+            self._active.release()
+            return
+        if self.on_start:
+            self.on_start()
+
+    def _finish(self, response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profile_id = g.pop('profile_id')
+        endpoint = request.url_rule.rule if request.url_rule else request.path
+        response.headers['X-Profile-Id'] = profile_id
+        # Stop once the body has been sent so streamed stages are included
+        response.call_on_close(lambda: self._save(profiler, profile_id, endpoint))
+        return response
+
+    def _abandon(self, exc=None):
+        """Stop a profile whose response never reached _finish (its lock would otherwise stay held)"""
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        g.pop('profile_id', None)
+        self._stop(profiler)
+
+    def _stop(self, profiler: cProfile.Profile):
+        profiler.disable()
+        try:
+            if self.on_stop:
+                self.on_stop()
+        finally:
+            self._active.release()
+
+    def _save(self, profiler: cProfile.Profile, profile_id: str, endpoint: str):
+        try:
+            profiler.disable()
+            path = os.path.join(self.profile_dir, f"{profile_id}.prof")
+            profiler.dump_stats(path)
+            print(f"🔬 Profile for {endpoint} saved: {path}")
+            self._rotate()
+        except Exception as e:
+            print(f"⚠️  Could not save profile {profile_id}: {e}")
+        finally:
+            self._stop(profiler)
+
+    def _rotate(self):
+        """Delete the oldest profiles beyond the keep limit"""
+        profiles = sorted(
+            glob.glob(os.path.join(self.profile_dir, '*.prof')),
+            key=os.path.getmtime,
+            reverse=True
+        )
+        for path in profiles[self.keep:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Export the Food Detector for CPU Inference
+Converts trained YOLOv8 weights to ONNX or OpenVINO IR for the
+FoodDetectionService onnx/openvino backends
+"""
+
+from pathlib import Path
+import argparse
+import sys
+
+DEFAULT_WEIGHTS = 'models/food-recognition/indian-food-v14/weights/best.pt'
+
+
+def export_detector(weights: str, export_format: str, imgsz: int, dynamic: bool) -> str:
+    """
+    Export weights with ultralytics
+
+    Args:
+        weights: Trained .pt file
+        export_format: 'onnx' or 'openvino'
+        imgsz: Square input size the model is exported (and letterboxed) at
+        dynamic: Dynamic batch/spatial axes, so micro-batches run as one call
+
+    Returns:
+        Path of the exported model (.onnx file or *_openvino_model folder)
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    options = {'format': export_format, 'imgsz': imgsz, 'dynamic': dynamic}
+    if export_format == 'onnx':
+        options['simplify'] = True
+    return model.export(**options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the food detector to ONNX / OpenVINO')
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS, help='Trained YOLOv8 weights (.pt)')
+    parser.add_argument('--format', choices=('onnx', 'openvino'), default='onnx')
+    parser.add_argument('--imgsz', type=int, default=640, help='Input size (use the training imgsz)')
+    parser.add_argument('--static', action='store_true', help='Fixed batch size 1 (no micro-batching)')
+    args = parser.parse_args()
+
+    # Run from ai-models/ so relative model paths match the API server's
+    base_path = Path(__file__).parent.parent
+    weights = Path(args.weights)
+    if not weights.is_absolute():
+        weights = base_path / weights
+    if not weights.exists():
+        print(f"❌ Weights not found: {weights}")
+        sys.exit(1)
+
+    print(f"📦 Exporting {weights} to {args.format} ({args.imgsz}px, {'static' if args.static else 'dynamic'} shape)...")
+    exported = export_detector(str(weights), args.format, args.imgsz, not args.static)
+
+    print()
+    print(f"✅ Exported: {exported}")
+    print()
+    print("🎯 Next Steps:")
+    print(f"   1. Check parity: python scripts/test_onnx_parity.py --weights {args.weights} --exported {exported}")
+    print(f"   2. Serve it:     FOOD_MODEL_PATH={exported} python api_server.py")
+    print("      (or hot-swap it via POST /api/v1/admin/models/food_detection)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+INT8 Quantization: Food Detector
+Post-training static INT8 quantization of the ONNX-exported detector,
+calibrated on the train split and gated on mAP50 (valid split) against best.pt
+"""
+
+from pathlib import Path
+import argparse
+import importlib.util
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+# Add parent directory to path
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+os.chdir(str(parent_dir))
+
+spec = importlib.util.spec_from_file_location(
+    "food_detection_service",
+    parent_dir / "food-recognition" / "food_detection_service.py"
+)
+food_rec_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(food_rec_module)
+FoodDetectionService = food_rec_module.FoodDetectionService
+box_ops = food_rec_module.box_ops
+onnx_backend = food_rec_module._load_sibling("onnx_backend")
+
+from export_detector import export_detector
+
+NUTRITION_DB_PATH = 'food-recognition/nutrition_database.json'
+DATASET_PATH = Path('dataset/roboflow-export')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Evaluation settings (ultralytics val defaults)
+EVAL_CONF = 0.001
+EVAL_IOU = 0.7
+
+
+def list_images(split: str):
+    image_dir = DATASET_PATH / split / 'images'
+    return sorted(p for p in image_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+class CalibrationReader:
+    """Feeds letterboxed train images to onnxruntime's static quantizer"""
+
+    def __init__(self, image_paths, input_name: str, imgsz):
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self._index = 0
+
+    def get_next(self):
+        while self._index < len(self.image_paths):
+            image = cv2.imread(str(self.image_paths[self._index]))
+            self._index += 1
+            if image is not None:
+                tensor, _, _ = onnx_backend.preprocess(image, self.imgsz)
+                return {self.input_name: tensor[None]}
+        return None
+
+    def rewind(self):
+        self._index = 0
+
+
+def quantize(fp32_path: str, int8_path: str, calibration_images, per_channel: bool):
+    """Static QDQ quantization (INT8 weights, UINT8 activations) calibrated on the given images"""
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    source = onnx.load(fp32_path)
+    input_name = source.graph.input[0].name
+    metadata = {prop.key: prop.value for prop in source.metadata_props}
+    imgsz = onnx_backend.parse_imgsz(metadata.get('imgsz', 640))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = os.path.join(tmp, 'prepared.onnx')
+        quant_pre_process(fp32_path, prepared, skip_symbolic_shape=True)
+
+        quantize_static(
+            prepared,
+            int8_path,
+            CalibrationReader(calibration_images, input_name, imgsz),
+            quant_format=QuantFormat.QDQ,
+            per_channel=per_channel,
+            weight_type=QuantType.QInt8,
+            activation_type=QuantType.QUInt8,
+            calibrate_method=CalibrationMethod.MinMax
+        )
+
+    # Keep the class names / input size the backend reads from the metadata
+    quantized = onnx.load(int8_path)
+    del quantized.metadata_props[:]
+    for key, value in metadata.items():
+        quantized.metadata_props.add(key=key, value=value)
+    onnx.save(quantized, int8_path)
+
+
+def read_labels(image_path: Path, image_shape):
+    """Ground-truth boxes (YOLO txt: class cx cy w h, normalized) in pixels"""
+    label_path = image_path.parent.parent / 'labels' / f"{image_path.stem}.txt"
+    height, width = image_shape[:2]
+    boxes, classes = [], []
+    if label_path.exists():
+        for line in label_path.read_text().splitlines():
+            values = line.split()
+            if len(values) < 5:
+                continue
+            cls, cx, cy, w, h = int(values[0]), *map(float, values[1:5])
+            boxes.append([(cx - w / 2) * width, (cy - h / 2) * height, (cx + w / 2) * width, (cy + h / 2) * height])
+            classes.append(cls)
+    return np.array(boxes, dtype=np.float32).reshape(-1, 4), np.array(classes, dtype=np.int64)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """Area under the interpolated PR curve, sampled at 101 recall points (as ultralytics)"""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    y = np.interp(x, mrec, mpre)
+    return float(np.sum((y[1:] + y[:-1]) * np.diff(x)) / 2)
+
+
+def evaluate_map50(service, image_paths) -> float:
+    """mAP@0.5 of a detection service's model (fallback detector off) over labelled images"""
+    scores, hits, pred_classes = [], [], []
+    gt_counts = {}
+
+    for image_path in image_paths:
+        image = cv2.imread(str(image_path))
+        if image is None:
+            continue
+        gt_boxes, gt_classes = read_labels(image_path, image.shape)
+        for cls in gt_classes:
+            gt_counts[int(cls)] = gt_counts.get(int(cls), 0) + 1
+
+        raw = service._predict_batch([image])[0]
+        kept = box_ops.filter_raw(raw, EVAL_CONF, EVAL_IOU)
+
+        # Greedy matching, highest confidence first, one prediction per ground-truth box
+        matched = np.zeros(len(gt_boxes), dtype=bool)
+        ious = iou_matrix(kept['xyxy'], gt_boxes) if len(gt_boxes) else None
+        for i, (conf, cls) in enumerate(zip(kept['conf'], kept['cls'])):
+            hit = False
+            if ious is not None:
+                candidates = np.where((gt_classes == cls) & ~matched & (ious[i] >= 0.5))[0]
+                if len(candidates):
+                    matched[candidates[np.argmax(ious[i][candidates])]] = True
+                    hit = True
+            scores.append(float(conf))
+            hits.append(hit)
+            pred_classes.append(int(cls))
+
+    scores, hits, pred_classes = np.array(scores), np.array(hits, dtype=bool), np.array(pred_classes)
+    aps = []
+    for cls, num_gt in gt_counts.items():
+        order = np.argsort(-scores[pred_classes == cls], kind='stable')
+        tp = hits[pred_classes == cls][order]
+        tp_cum, fp_cum = np.cumsum(tp), np.cumsum(~tp)
+        recall = tp_cum / num_gt
+        precision = tp_cum / np.maximum(tp_cum + fp_cum, 1)
+        aps.append(average_precision(recall, precision))
+    return float(np.mean(aps)) if aps else 0.0
+
+
+def load_service(model_path: str, backend: str):
+    return FoodDetectionService(
+        model_path,
+        NUTRITION_DB_PATH,
+        use_fallback=False,
+        min_conf_threshold=EVAL_CONF,
+        backend=backend
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Quantize the food detector to INT8 with an mAP50 gate')
+    parser.add_argument('--weights', default='models/food-recognition/indian-food-v14/weights/best.pt')
+    parser.add_argument('--onnx', help='FP32 ONNX export to quantize (exported from --weights when omitted)')
+    parser.add_argument('--output', help='Published INT8 model (default: <weights dir>/best_int8.onnx)')
+    parser.add_argument('--calibration-images', type=int, default=300, help='Train images used for calibration')
+    parser.add_argument('--max-map-drop', type=float, default=0.01,
+                        help='Largest allowed mAP50 drop vs best.pt (absolute, e.g. 0.01 = 1 point)')
+    parser.add_argument('--per-tensor', action='store_true', help='Per-tensor instead of per-channel weights')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗜️  INT8 Quantization: Food Detector")
+    print("=" * 60)
+    print()
+
+    weights = Path(args.weights)
+    if not weights.exists():
+        print(f"❌ Weights not found: {weights}")
+        sys.exit(1)
+    output = Path(args.output) if args.output else weights.with_name(f"{weights.stem}_int8.onnx")
+
+    fp32_path = args.onnx or export_detector(str(weights), 'onnx', 640, dynamic=True)
+    print(f"✅ FP32 ONNX model: {fp32_path}")
+
+    calibration = list_images('train')
+    random.Random(args.seed).shuffle(calibration)
+    calibration = calibration[:args.calibration_images]
+    print(f"📐 Calibrating on {len(calibration)} train images...")
+
+    # Quantize to a scratch file; it only becomes the published artifact if it passes the gate
+    candidate = output.with_name(f"{output.stem}.candidate.onnx")
+    quantize(fp32_path, str(candidate), calibration, per_channel=not args.per_tensor)
+    print(f"✅ Quantized: {candidate} ({candidate.stat().st_size / 1e6:.1f} MB, "
+          f"FP32 {Path(fp32_path).stat().st_size / 1e6:.1f} MB)")
+    print()
+
+    valid_images = list_images('valid')
+    print(f"📊 Evaluating mAP50 on {len(valid_images)} valid images...")
+    reference_map = evaluate_map50(load_service(str(weights), 'pytorch'), valid_images)
+    int8_map = evaluate_map50(load_service(str(candidate), 'onnx'), valid_images)
+    drop = reference_map - int8_map
+
+    print()
+    print(f"   best.pt mAP50: {reference_map:.4f}")
+    print(f"   INT8 mAP50:    {int8_map:.4f} (drop {drop:+.4f}, allowed {args.max_map_drop:.4f})")
+    print()
+
+    report = {
+        'weights': str(weights),
+        'fp32_onnx': str(fp32_path),
+        'calibration_images': len(calibration),
+        'valid_images': len(valid_images),
+        'reference_map50': round(reference_map, 4),
+        'int8_map50': round(int8_map, 4),
+        'max_map_drop': args.max_map_drop,
+        'published': drop <= args.max_map_drop
+    }
+
+    if drop > args.max_map_drop:
+        candidate.unlink()
+        print("❌ mAP50 drop exceeds the tolerance; INT8 model NOT published")
+        print(json.dumps(report, indent=2))
+        sys.exit(1)
+
+    shutil.move(str(candidate), str(output))
+    with open(output.with_suffix('.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"✅ Published: {output}")
+    print()
+    print("🎯 Next Steps:")
+    print(f"   FOOD_MODEL_PATH={output} python api_server.py")
+    print("   (or hot-swap it via POST /api/v1/admin/models/food_detection)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Parity Test: Exported Detector vs PyTorch
+Runs the roboflow-export test split through FoodDetectionService with the
+PyTorch weights and with the ONNX / OpenVINO export, and checks that both
+produce the same detections
+"""
+
+from pathlib import Path
+import argparse
+import importlib.util
+import sys
+import os
+
+import numpy as np
+
+# Add parent directory to path
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+os.chdir(str(parent_dir))
+
+spec = importlib.util.spec_from_file_location(
+    "food_detection_service",
+    parent_dir / "food-recognition" / "food_detection_service.py"
+)
+food_rec_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(food_rec_module)
+FoodDetectionService = food_rec_module.FoodDetectionService
+
+NUTRITION_DB_PATH = 'food-recognition/nutrition_database.json'
+TEST_IMAGES = Path('dataset/roboflow-export/test/images')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def box_iou(a, b) -> float:
+    """IoU of two [x1, y1, x2, y2] boxes"""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_detections(reference, candidate, min_iou: float, max_conf_diff: float):
+    """
+    Greedily pair detections of the same item by IoU
+
+    Returns:
+        (matched pairs, unmatched reference detections, unmatched candidate detections)
+    """
+    unmatched = list(candidate)
+    pairs = []
+    missing = []
+    for ref in reference:
+        best, best_iou = None, min_iou
+        for cand in unmatched:
+            if cand['item'] != ref['item']:
+                continue
+            iou = box_iou(ref['bounding_box'], cand['bounding_box'])
+            if iou >= best_iou and abs(cand['confidence'] - ref['confidence']) <= max_conf_diff:
+                best, best_iou = cand, iou
+        if best is None:
+            missing.append(ref)
+        else:
+            unmatched.remove(best)
+            pairs.append((ref, best, best_iou))
+    return pairs, missing, unmatched
+
+
+def test_parity(args) -> bool:
+    print("=" * 60)
+    print("🧪 Exported Detector Parity Test")
+    print("=" * 60)
+    print()
+
+    images = sorted(p for p in TEST_IMAGES.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if args.limit:
+        images = images[:args.limit]
+    if not images:
+        print(f"❌ No test images in {TEST_IMAGES}")
+        return False
+
+    # No fallback detector: only the model outputs are compared
+    reference = FoodDetectionService(args.weights, NUTRITION_DB_PATH, use_fallback=False, backend='pytorch')
+    candidate = FoodDetectionService(args.exported, NUTRITION_DB_PATH, use_fallback=False, backend=args.backend)
+    print()
+
+    total_ref = total_matched = total_extra = 0
+    conf_diffs, ious = [], []
+    mismatched_images = []
+
+    for image_path in images:
+        ref = reference.detect_foods(str(image_path), args.conf, args.iou)
+        cand = candidate.detect_foods(str(image_path), args.conf, args.iou)
+        pairs, missing, extra = match_detections(ref, cand, args.min_iou, args.max_conf_diff)
+
+        total_ref += len(ref)
+        total_matched += len(pairs)
+        total_extra += len(extra)
+        conf_diffs.extend(abs(r['confidence'] - c['confidence']) for r, c, _ in pairs)
+        ious.extend(iou for _, _, iou in pairs)
+        if missing or extra:
+            mismatched_images.append((image_path.name, len(missing), len(extra)))
+
+    recall = total_matched / total_ref if total_ref else 1.0
+    precision = total_matched / (total_matched + total_extra) if total_matched + total_extra else 1.0
+
+    print("=" * 60)
+    print("📊 Parity Results")
+    print("=" * 60)
+    print(f"   Images:              {len(images)}")
+    print(f"   PyTorch detections:  {total_ref}")
+    print(f"   Matched:             {total_matched} ({recall:.1%} of PyTorch, {precision:.1%} of exported)")
+    if conf_diffs:
+        print(f"   Confidence diff:     mean {np.mean(conf_diffs):.4f}, max {np.max(conf_diffs):.4f}")
+        print(f"   Box IoU:             mean {np.mean(ious):.4f}, min {np.min(ious):.4f}")
+    for name, missing, extra in mismatched_images[:10]:
+        print(f"   ⚠️  {name}: {missing} missing, {extra} extra")
+    print()
+
+    passed = recall >= args.min_match and precision >= args.min_match
+    if passed:
+        print(f"✅ Parity OK (≥ {args.min_match:.0%} of detections match)")
+    else:
+        print(f"❌ Parity FAILED (need ≥ {args.min_match:.0%} of detections to match)")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare an exported detector with the PyTorch weights')
+    parser.add_argument('--weights', default='models/food-recognition/indian-food-v14/weights/best.pt')
+    parser.add_argument('--exported', default='models/food-recognition/indian-food-v14/weights/best.onnx')
+    parser.add_argument('--backend', default='auto', help='onnx, openvino or auto (from the file type)')
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--iou', type=float, default=0.45)
+    parser.add_argument('--min-iou', type=float, default=0.9, help='Box IoU for two detections to match')
+    parser.add_argument('--max-conf-diff', type=float, default=0.03, help='Confidence tolerance per match')
+    parser.add_argument('--min-match', type=float, default=0.97, help='Fraction of detections that must match')
+    parser.add_argument('--limit', type=int, default=0, help='Only the first N test images')
+    args = parser.parse_args()
+
+    sys.exit(0 if test_parity(args) else 1)
+
+
+if __name__ == '__main__':
+    main()
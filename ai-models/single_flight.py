@@ -0,0 +1,65 @@
+"""
+Single-Flight Request Coalescing
+Identical concurrent work (same image bytes and parameters) runs once;
+every caller that arrives while it is in flight shares the result
+"""
+
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """Deduplicate in-flight calls by key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn unless an identical call is already running, then share its outcome
+
+        Args:
+            key: Identity of the work (e.g. content hash + parameters)
+            fn: Zero-argument callable producing the result
+
+        Returns:
+            (result, shared) where shared is True when this caller joined an
+            existing call. Every caller gets its own copy of the result;
+            exceptions are re-raised in every caller.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self._leaders += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            return copy.deepcopy(future.result()), True
+
+        try:
+            result = fn()
+            # Followers copy from a snapshot the leader's caller can't mutate
+            future.set_result(copy.deepcopy(result))
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'in_flight': len(self._in_flight),
+                'executions': self._leaders,
+                'coalesced': self._coalesced
+            }
@@ -0,0 +1,120 @@
+"""
+Test Admission Control
+Checks AdmissionPool limits, queueing, rejection and non-blocking acquisition
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Run from any directory
+sys.path.insert(0, str(Path(__file__).parent))
+
+from admission import AdmissionController, AdmissionPool, AdmissionRejected
+
+
+def test_rejects_when_full_without_queue():
+    """With no queue, a caller beyond max_concurrent is rejected at once"""
+    pool = AdmissionPool('inference', max_concurrent=2, max_queue=0)
+    pool.acquire()
+    pool.acquire()
+    start = time.perf_counter()
+    try:
+        pool.acquire()
+        assert False, "third acquire should be rejected"
+    except AdmissionRejected as e:
+        assert e.pool == 'inference' and e.retry_after >= 1
+    assert time.perf_counter() - start < 0.5
+
+    pool.release()
+    pool.acquire()
+    stats = pool.stats()
+    assert stats['in_flight'] == 2 and stats['admitted'] == 3 and stats['rejected'] == 1
+    print("✅ Full pool without a queue rejects immediately")
+
+
+def test_queued_caller_gets_released_slot():
+    """A queued caller takes the slot as soon as it is released"""
+    pool = AdmissionPool('jobs', max_concurrent=1, max_queue=1, queue_timeout=5)
+    pool.acquire()
+    acquired = threading.Event()
+
+    def waiter():
+        pool.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.1)
+    assert pool.stats()['queue_depth'] == 1 and not acquired.is_set()
+
+    # The queue is full too: the next caller is rejected
+    try:
+        pool.acquire()
+        assert False, "acquire beyond the queue should be rejected"
+    except AdmissionRejected:
+        pass
+
+    pool.release(held_seconds=0.1)
+    thread.join(timeout=2)
+    assert acquired.is_set()
+    assert pool.stats()['queue_depth'] == 0
+    print("✅ Queued caller is admitted when a slot frees up")
+
+
+def test_queue_timeout():
+    """A queued caller is rejected once queue_timeout passes"""
+    pool = AdmissionPool('fallback', max_concurrent=1, max_queue=1, queue_timeout=0.1)
+    pool.acquire()
+    try:
+        pool.acquire()
+        assert False, "acquire should time out"
+    except AdmissionRejected:
+        pass
+    assert pool.stats()['queue_depth'] == 0
+    print("✅ Queued caller times out")
+
+
+def test_try_acquire():
+    """try_acquire never queues and doesn't count as a rejection"""
+    pool = AdmissionPool('fallback', max_concurrent=1, max_queue=4)
+    assert pool.try_acquire()
+    assert not pool.try_acquire()
+    assert pool.stats()['rejected'] == 0 and pool.stats()['queue_depth'] == 0
+    pool.release()
+    assert pool.try_acquire()
+    print("✅ try_acquire takes only free slots")
+
+
+def test_slot_and_controller():
+    """slot() releases on exceptions; unconfigured pools get the default limits"""
+    admission = AdmissionController(default_limits=(3, 0))
+    admission.configure('inference', 1, 0)
+    try:
+        with admission.slot('inference'):
+            raise RuntimeError('boom')
+    except RuntimeError:
+        pass
+    assert admission.pool('inference').stats()['in_flight'] == 0
+
+    pool = admission.pool('detect')
+    assert pool.max_concurrent == 3 and pool.max_queue == 0
+    assert set(admission.stats()) == {'inference', 'detect'}
+    print("✅ slot() releases on error; default pools use default limits")
+
+
+def main():
+    print("=" * 60)
+    print("🧪 Admission Control Tests")
+    print("=" * 60)
+    test_rejects_when_full_without_queue()
+    test_queued_caller_gets_released_slot()
+    test_queue_timeout()
+    test_try_acquire()
+    test_slot_and_controller()
+    print("\n✅ All admission tests passed")
+
+
+if __name__ == '__main__':
+    main()
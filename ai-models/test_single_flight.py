@@ -0,0 +1,97 @@
+"""
+Test Single-Flight Coalescing
+Checks that concurrent calls with one key run once and share the outcome
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Run from any directory
+sys.path.insert(0, str(Path(__file__).parent))
+
+from single_flight import SingleFlight
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Call flight.do(key, fn) from several threads; returns each (result, shared) or exception"""
+    outcomes = [None] * callers
+    start = threading.Barrier(callers)
+
+    def call(i):
+        start.wait()
+        try:
+            outcomes[i] = flight.do(key, fn)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return outcomes
+
+
+def test_concurrent_calls_run_once():
+    """One leader computes; followers share copies of its result"""
+    flight = SingleFlight()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'foods': ['idli']}
+
+    outcomes = run_concurrently(flight, 'img', compute, 4)
+    assert len(calls) == 1
+    assert [shared for _, shared in outcomes].count(False) == 1
+    assert all(result == {'foods': ['idli']} for result, _ in outcomes)
+
+    # Each caller has its own copy
+    results = [result for result, _ in outcomes]
+    results[0]['foods'].append('dosa')
+    assert all(result == {'foods': ['idli']} for result in results[1:])
+
+    assert flight.stats() == {'in_flight': 0, 'executions': 1, 'coalesced': 3}
+    print("✅ Concurrent calls with one key compute once")
+
+
+def test_exceptions_reach_every_caller():
+    """A failing leader's exception is raised in every caller, and the key is freed"""
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError('bad image')
+
+    outcomes = run_concurrently(flight, 'img', fail, 3)
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+
+    # Nothing is remembered once the call has finished
+    assert flight.do('img', lambda: 'retried') == ('retried', False)
+    print("✅ Exceptions are re-raised in every caller")
+
+
+def test_different_keys_run_separately():
+    """Calls with different keys don't wait for each other"""
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == (1, False)
+    assert flight.do('b', lambda: 2) == (2, False)
+    assert flight.do('a', lambda: 3) == (3, False)
+    print("✅ Different keys (and later calls) are computed separately")
+
+
+def main():
+    print("=" * 60)
+    print("🧪 Single-Flight Tests")
+    print("=" * 60)
+    test_concurrent_calls_run_once()
+    test_exceptions_reach_every_caller()
+    test_different_keys_run_separately()
+    print("\n✅ All single-flight tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Managed Upload Storage
+Content-addressed upload files written by a background thread, with
+retention by age and total folder size
+"""
+
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+# Extensions kept from the client's file name; anything else is stored as .jpg
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+# Files this class manages: <sha256><ext> uploads and their <sha256>_annotated<ext> copies.
+# Anything else in the folder (e.g. committed demo images) is never evicted.
+_MANAGED_FILE = re.compile(
+    r'[0-9a-f]{64}(?:_annotated)?(?:' + '|'.join(re.escape(ext) for ext in IMAGE_EXTENSIONS) + r')'
+)
+
+
+class UploadStorage:
+    """
+    Stores uploads as <sha256><ext> under one folder
+
+    Identical uploads map to the same file, so repeats cost no disk I/O and
+    concurrent requests never overwrite each other's images. Writes (and any
+    other submitted disk work, such as annotated images) run on a single
+    background thread; that thread also evicts stored files older than
+    max_age_hours and the oldest ones once they exceed max_total_mb.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_age_hours: float = 168,
+        max_total_mb: float = 2048,
+        sweep_interval_seconds: float = 300,
+        max_queue: int = 256
+    ):
+        """
+        Create the folder and start the writer thread
+
+        Args:
+            root: Upload folder
+            max_age_hours: Files not written or re-uploaded for this long are deleted (0 disables)
+            max_total_mb: Oldest files are deleted beyond this folder size (0 disables)
+            sweep_interval_seconds: How often the retention policy runs
+            max_queue: Pending writes beyond this are dropped instead of blocking requests
+        """
+        self.root = root
+        self.max_age = max_age_hours * 3600
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024)
+        self.sweep_interval = sweep_interval_seconds
+
+        # Optional metrics sink with stage(name, seconds) and event(name)
+        self.observer = None
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._counts = {'writes': 0, 'dedup_hits': 0, 'dropped': 0, 'evicted': 0, 'errors': 0}
+        self._last_sweep = time.monotonic()
+
+        os.makedirs(root, exist_ok=True)
+        self._worker = threading.Thread(target=self._run, name='upload-writer', daemon=True)
+        self._worker.start()
+
+    @staticmethod
+    def content_hash(image_bytes: bytes) -> str:
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def path_for(self, image_bytes: bytes, filename: str = None, content_hash: str = None) -> str:
+        """Storage path for an upload (its content hash plus the client's image extension)"""
+        ext = os.path.splitext(filename or '')[1].lower()
+        if ext not in IMAGE_EXTENSIONS:
+            ext = '.jpg'
+        return os.path.join(self.root, f"{content_hash or self.content_hash(image_bytes)}{ext}")
+
+    def store(
+        self,
+        image_bytes: bytes,
+        filename: str = None,
+        content_hash: str = None,
+        wait: bool = False
+    ) -> str:
+        """
+        Store an upload
+
+        Args:
+            image_bytes: Encoded image
+            filename: Client file name (only its extension is used)
+            content_hash: SHA-256 of image_bytes, when already known
+            wait: Write synchronously so the file can be read back immediately
+
+        Returns:
+            Path the upload is (or will shortly be) stored at
+        """
+        path = self.path_for(image_bytes, filename, content_hash)
+        if wait:
+            self._write(path, image_bytes)
+            return path
+
+        with self._lock:
+            if path in self._pending:
+                self._counts['dedup_hits'] += 1
+                return path
+            self._pending.add(path)
+        try:
+            self._queue.put_nowait((self._write, (path, image_bytes), None))
+        except queue.Full:
+            with self._lock:
+                self._pending.discard(path)
+                self._counts['dropped'] += 1
+            print(f"⚠️  Upload write queue full, not persisting {path}")
+        return path
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Run other disk work (e.g. annotated image writes) on the writer thread"""
+        future = Future()
+        try:
+            self._queue.put_nowait((fn, args, future))
+        except queue.Full:
+            with self._lock:
+                self._counts['dropped'] += 1
+            future.set_exception(RuntimeError("Upload write queue full"))
+        return future
+
+    def _write(self, path: str, image_bytes: bytes):
+        """Write one upload atomically, or refresh its timestamp if it already exists"""
+        try:
+            if os.path.exists(path):
+                os.utime(path)
+                with self._lock:
+                    self._counts['dedup_hits'] += 1
+                return
+            start = time.perf_counter()
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(image_bytes)
+            os.replace(tmp_path, path)
+            if self.observer is not None:
+                self.observer.stage('disk_save', time.perf_counter() - start)
+            with self._lock:
+                self._counts['writes'] += 1
+        finally:
+            with self._lock:
+                self._pending.discard(path)
+
+    def _run(self):
+        """Writer loop: queued disk work, plus the retention sweep every sweep_interval"""
+        while True:
+            try:
+                fn, args, future = self._queue.get(timeout=self.sweep_interval)
+            except queue.Empty:
+                fn = None
+            if fn is not None:
+                try:
+                    result = fn(*args)
+                    if future is not None:
+                        future.set_result(result)
+                except Exception as e:
+                    with self._lock:
+                        self._counts['errors'] += 1
+                    print(f"⚠️  Background write failed: {e}")
+                    if future is not None:
+                        future.set_exception(e)
+            if time.monotonic() - self._last_sweep >= self.sweep_interval:
+                self.enforce_retention()
+
+    def enforce_retention(self) -> int:
+        """
+        Delete expired uploads, then the oldest ones until they fit max_total_mb
+
+        Only content-addressed files written by this class count; other
+        files in the folder are neither deleted nor counted.
+
+        Returns:
+            Number of files deleted
+        """
+        self._last_sweep = time.monotonic()
+        files = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and _MANAGED_FILE.fullmatch(entry.name):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+
+        now = time.time()
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for mtime, size, path in files:
+            expired = self.max_age > 0 and now - mtime > self.max_age
+            over_budget = self.max_total_bytes > 0 and total > self.max_total_bytes
+            if not (expired or over_budget):
+                break
+            try:
+                os.remove(path)
+                total -= size
+                evicted += 1
+            except OSError:
+                pass
+
+        if evicted:
+            with self._lock:
+                self._counts['evicted'] += evicted
+            print(f"🧹 Upload retention removed {evicted} files")
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        """Write/dedup/eviction counters and queue depth"""
+        with self._lock:
+            return {
+                **self._counts,
+                'queue_depth': self._queue.qsize(),
+                'max_age_hours': self.max_age / 3600,
+                'max_total_mb': round(self.max_total_bytes / (1024 * 1024), 1)
+            }
@@ -2,15 +2,34 @@
 const axios = require('axios');
 const FormData = require('form-data');
 const fs = require('fs');
+const path = require('path');
 
 // AI Backend configuration
 const AI_BACKEND_URL = process.env.AI_BACKEND_URL || 'http://localhost:5001';
 const USE_MOCK_DATA = process.env.USE_MOCK_DATA === 'true';
+// Submit scans as background jobs and long-poll for the result instead of
+// holding one HTTP request open for the whole pipeline
+const USE_JOB_API = process.env.AI_USE_JOB_API === 'true';
+const AI_JOB_TIMEOUT_MS = parseInt(process.env.AI_JOB_TIMEOUT_MS || '120000', 10);
+// Send the image itself as the request body (parameters in the query string)
+// instead of multipart form data
+const USE_RAW_UPLOADS = process.env.AI_RAW_UPLOADS === 'true';
+// Reach a co-located AI backend over its Unix domain socket (UNIX_SOCKET_PATH)
+const AI_BACKEND_SOCKET = process.env.AI_BACKEND_SOCKET;
+const transport = AI_BACKEND_SOCKET ? { socketPath: AI_BACKEND_SOCKET } : {};
+
+const RAW_CONTENT_TYPES = {
+  '.png': 'image/png',
+  '.webp': 'image/webp',
+  '.bmp': 'image/bmp'
+};
 
 /**
  * Analyze food image using YOLOv8 + XGBoost AI backend
  * @param {string} imagePath - Path to uploaded image
- * @param {Object} options - Additional options (timeOfDay, userProfile, etc.)
+ * @param {Object} options - Additional options (timeOfDay, userProfile, etc.).
+ *   Pass the same options.idempotencyKey when retrying a scan so the AI
+ *   backend returns the stored result instead of recomputing it.
  * @returns {Promise<Object>} Analysis result
  */
 exports.analyzeFoodImage = async (imagePath, options = {}) => {
@@ -20,44 +39,184 @@ exports.analyzeFoodImage = async (imagePath, options = {}) => {
   }
 
   try {
-    // Prepare form data
+    const params = {
+      time_of_day: options.timeOfDay || getTimeOfDay(),
+      last_glucose_reading: options.lastGlucoseReading || 100,
+      hours_since_last_meal: options.hoursSinceLastMeal || 4
+    };
+
+    if (options.userProfile) {
+      params.user_profile = JSON.stringify(options.userProfile);
+    }
+
+    const idempotencyHeaders = options.idempotencyKey
+      ? { 'Idempotency-Key': options.idempotencyKey }
+      : {};
+
+    // Call Python AI backend
+    let aiResult;
+    if (USE_JOB_API) {
+      aiResult = await runScanJob(buildScanForm(imagePath, params), idempotencyHeaders);
+    } else if (USE_RAW_UPLOADS) {
+      aiResult = await postRawScan(imagePath, params, idempotencyHeaders);
+    } else {
+      const formData = buildScanForm(imagePath, params);
+      const response = await axios.post(
+        `${AI_BACKEND_URL}/api/v1/food/scan-and-predict`,
+        formData,
+        {
+          ...transport,
+          headers: {
+            ...formData.getHeaders(),
+            ...idempotencyHeaders
+          },
+          timeout: 30000 // 30 second timeout
+        }
+      );
+      aiResult = response.data;
+    }
+
+    if (!aiResult.success) {
+      throw new Error(aiResult.error || 'AI analysis failed');
+    }
+
+    // Transform AI backend response to match our schema
+    return transformAIResponse(aiResult);
+
+  } catch (error) {
+    console.error('AI Backend Error:', error.message);
+    
+    // Fallback to mock data if AI backend is unavailable
+    console.log('Falling back to mock data...');
+    return await analyzeFoodImageMock(imagePath);
+  }
+};
+
+/**
+ * Multipart form for /api/v1/food/scan-and-predict
+ * @param {string} imagePath - Path to uploaded image
+ * @param {Object} params - Scan parameters (time_of_day, last_glucose_reading, ...)
+ * @returns {FormData} Form with the image as `file` plus one field per parameter
+ */
+function buildScanForm(imagePath, params) {
+  const formData = new FormData();
+  formData.append('file', fs.createReadStream(imagePath));
+  Object.entries(params).forEach(([name, value]) => formData.append(name, value));
+  return formData;
+}
+
+/**
+ * Post the image bytes as the request body, with parameters in the query string
+ * (no multipart encoding on our side or parsing on the AI backend)
+ * @param {string} imagePath - Path to uploaded image
+ * @param {Object} params - Scan parameters (time_of_day, last_glucose_reading, ...)
+ * @param {Object} extraHeaders - e.g. Idempotency-Key
+ * @returns {Promise<Object>} scan-and-predict response
+ */
+async function postRawScan(imagePath, params, extraHeaders = {}) {
+  const image = await fs.promises.readFile(imagePath);
+  const contentType = RAW_CONTENT_TYPES[path.extname(imagePath).toLowerCase()] || 'image/jpeg';
+
+  const response = await axios.post(
+    `${AI_BACKEND_URL}/api/v1/food/scan-and-predict`,
+    image,
+    {
+      ...transport,
+      params,
+      headers: {
+        'Content-Type': contentType,
+        ...extraHeaders
+      },
+      timeout: 30000
+    }
+  );
+  return response.data;
+}
+
+/**
+ * Submit a scan job to the AI backend and long-poll until it finishes
+ * @param {FormData} formData - Same fields as /api/v1/food/scan-and-predict
+ * @param {Object} extraHeaders - e.g. Idempotency-Key, so a retried submit returns the same job
+ * @returns {Promise<Object>} scan-and-predict response
+ */
+async function runScanJob(formData, extraHeaders = {}) {
+  const submit = await axios.post(
+    `${AI_BACKEND_URL}/api/v1/jobs/scan-and-predict`,
+    formData,
+    {
+      ...transport,
+      headers: {
+        ...formData.getHeaders(),
+        ...extraHeaders
+      },
+      timeout: 10000
+    }
+  );
+
+  const jobId = submit.data.job_id;
+  const deadline = Date.now() + AI_JOB_TIMEOUT_MS;
+
+  while (Date.now() < deadline) {
+    const { data } = await axios.get(`${AI_BACKEND_URL}/api/v1/jobs/${jobId}`, {
+      ...transport,
+      params: { wait: 20 },
+      timeout: 30000
+    });
+
+    if (data.status === 'completed') return data.result;
+    if (data.status === 'failed') throw new Error(data.error || 'AI scan job failed');
+  }
+
+  throw new Error(`AI scan job ${jobId} timed out`);
+}
+
+/**
+ * Analyze several food images in one request (one batched model pass)
+ * @param {string[]} imagePaths - Paths to uploaded images
+ * @param {Object} options - Additional options shared by all images (timeOfDay, userProfile, etc.)
+ * @returns {Promise<Object[]>} Analysis result per image, in input order
+ */
+exports.analyzeFoodImagesBatch = async (imagePaths, options = {}) => {
+  if (USE_MOCK_DATA) {
+    return await Promise.all(imagePaths.map(analyzeFoodImageMock));
+  }
+
+  try {
     const formData = new FormData();
-    formData.append('file', fs.createReadStream(imagePath));
+    imagePaths.forEach(imagePath => formData.append('files', fs.createReadStream(imagePath)));
     formData.append('time_of_day', options.timeOfDay || getTimeOfDay());
     formData.append('last_glucose_reading', options.lastGlucoseReading || 100);
     formData.append('hours_since_last_meal', options.hoursSinceLastMeal || 4);
-    
+
     if (options.userProfile) {
       formData.append('user_profile', JSON.stringify(options.userProfile));
     }
 
-    // Call Python AI backend
     const response = await axios.post(
-      `${AI_BACKEND_URL}/api/v1/food/scan-and-predict`,
+      `${AI_BACKEND_URL}/api/v1/food/scan-and-predict/batch`,
       formData,
       {
+        ...transport,
         headers: {
           ...formData.getHeaders()
         },
-        timeout: 30000 // 30 second timeout
+        timeout: 30000 + 5000 * imagePaths.length // Scale timeout with batch size
       }
     );
 
-    const aiResult = response.data;
-
-    if (!aiResult.success) {
-      throw new Error(aiResult.error || 'AI analysis failed');
+    if (!response.data.success) {
+      throw new Error(response.data.error || 'AI batch analysis failed');
     }
 
-    // Transform AI backend response to match our schema
-    return transformAIResponse(aiResult);
+    // Images where no food was found fall back to mock data, like single scans
+    return await Promise.all(response.data.results.map((aiResult, i) =>
+      aiResult.success ? transformAIResponse(aiResult) : analyzeFoodImageMock(imagePaths[i])
+    ));
 
   } catch (error) {
     console.error('AI Backend Error:', error.message);
-    
-    // Fallback to mock data if AI backend is unavailable
     console.log('Falling back to mock data...');
-    return await analyzeFoodImageMock(imagePath);
+    return await Promise.all(imagePaths.map(analyzeFoodImageMock));
   }
 };
 
@@ -307,7 +466,7 @@ exports.submitFeedback = async (feedback) => {
     const response = await axios.post(
       `${AI_BACKEND_URL}/api/v1/feedback`,
       feedback,
-      { timeout: 5000 }
+      { ...transport, timeout: 5000 }
     );
 
     return response.data;